@@ -544,6 +544,17 @@ namespace zzub {
     // same as player except during initialization
     zzub::song* plugin_player;
     zzub_plugin_t* _plugin;
+    // set once the plugin reads or changes other plugins through the peer
+    // control methods. the work scheduler never runs such a plugin
+    // alongside other plugins.
+    bool controls_peers;
+    // set once the plugin uses the audio driver channels, which all such
+    // plugins share. the work scheduler runs them in work_order.
+    bool uses_driver;
+    // set once process_stereo() has been called. until then the work
+    // scheduler runs the plugin alone, so the flags above are known before
+    // the plugin runs alongside other plugins.
+    bool processed;
 
     host(zzub::player*, zzub_plugin_t*);
     ~host();
@@ -60,6 +60,7 @@
 #define NO_ZZUB_WAVELEVEL_TYPE
 #define NO_ZZUB_ENVELOPE_TYPE
 #define NO_ZZUB_WAVE_TYPE
+#define NO_ZZUB_WAVEDATA_TYPE
 #define NO_ZZUB_RECORDER_TYPE
 #define NO_ZZUB_PLAYER_TYPE
 
@@ -80,6 +81,7 @@ namespace zzub {
   struct recorder;
   struct pluginlib;
   struct mem_archive;
+  struct importwave_data;
   struct audiodriver;
   struct mididriver;
   struct instream;
@@ -98,6 +100,7 @@ typedef zzub::sequence_proxy zzub_sequence_t;
 typedef zzub::event_connection_binding zzub_event_connection_binding_t;
 typedef zzub::wave_proxy zzub_wave_t;
 typedef zzub::wavelevel_proxy zzub_wavelevel_t;
+typedef zzub::importwave_data zzub_wavedata_t;
 typedef zzub::parameter zzub_parameter_t;
 typedef zzub::attribute zzub_attribute_t;
 typedef zzub::envelope_entry zzub_envelope_t;
@@ -120,6 +123,7 @@ typedef zzub::outstream zzub_output_t;
 #include "master.h"
 #include "recorder.h"
 #include "graph.h"
+#include "scheduler.h"
 #include "song.h"
 #include "undo.h"
 #include "operations.h"
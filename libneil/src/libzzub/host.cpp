@@ -32,6 +32,9 @@ namespace zzub {
   host::host(zzub::player* play, zzub_plugin_t* plug) {
     _player = play;
     _plugin = plug;
+    controls_peers = false;
+    uses_driver = false;
+    processed = false;
 
     aux_buffer.resize(2);
     for (unsigned int c = 0; c < aux_buffer.size(); ++c) {
@@ -330,6 +333,7 @@ namespace zzub {
   // direct calls to audiodriver, used by WaveInput and WaveOutput
   // shouldn't be used for anything else
   int host::audio_driver_get_channel_count(bool input) {
+    uses_driver = true;
     if (input) {
       return _player->work_in_device!=0 ? _player->work_in_device->in_channels : 0;
     } else {
@@ -338,10 +342,12 @@ namespace zzub {
   }
 
   void host::audio_driver_write(int channel, float *psamples, int numsamples) {
+    uses_driver = true;
     memcpy(_player->front.outputBuffer[channel], psamples, sizeof(float) * numsamples);
   }
 
   void host::audio_driver_read(int channel, float *psamples, int numsamples) {
+    uses_driver = true;
     if (_player->front.inputBuffer[channel] == 0) return ;
 
     memcpy(psamples, _player->front.inputBuffer[channel], sizeof(float) * numsamples);
@@ -357,6 +363,8 @@ namespace zzub {
 	
     if (group == 2 && track >= m.tracks) return ;
 
+    if (pmac->id != _plugin->id) controls_peers = true;
+
     plugin_player->plugin_set_parameter_direct(pmac->id, group, track, param, value, record);
 
     char* param_ptr = 0;
@@ -382,14 +390,17 @@ namespace zzub {
 
   // peerctrl extensions
   int host::get_parameter(metaplugin_proxy* _metaplugin, int group, int track, int param) {
+    if (_metaplugin->id != _plugin->id) controls_peers = true;
     return plugin_player->plugin_get_parameter(_metaplugin->id, group, track, param);
   }
 
   void host::set_parameter(metaplugin_proxy* _metaplugin, int group, int track, int param, int value) {
+    if (_metaplugin->id != _plugin->id) controls_peers = true;
     plugin_player->plugin_set_parameter_direct(_metaplugin->id, group, track, param, value, false);
   }
 
   plugin *host::get_plugin(metaplugin_proxy* _metaplugin) {
+    if (_metaplugin->id != _plugin->id) controls_peers = true;
     return plugin_player->plugins[_metaplugin->id]->plugin;//_metaplugin->plugin;
   }
 
@@ -475,6 +486,7 @@ namespace zzub {
     plugin_descriptor plugindesc = plugin_player->get_plugin_descriptor(name);
     if (plugindesc == graph_traits<plugin_map>::null_vertex()) return 0;
     int id = plugin_player->get_plugin_id(plugindesc);
+    if (id != _plugin->id) controls_peers = true;
     return plugin_player->plugins[id]->proxy;
   }
 
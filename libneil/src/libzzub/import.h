@@ -11,6 +11,12 @@ namespace zzub {
 
   typedef importwave_info exportwave_info;
 
+  // a decoded sample file, see zzub_wavedata_decode_file()
+  struct importwave_data {
+    importwave_info info;
+    char* samples;
+  };
+
   struct importplugin {
     virtual ~importplugin() { }
     virtual bool open(zzub::instream* datastream) = 0;
@@ -75,6 +81,9 @@ namespace zzub {
     void read_wave_level_samples(int i, int level, void* buffer);
     void close();
 
+    // reads the first level of a file into a new[]'ed buffer, 0 on failure
+    char* decode(std::string filename, zzub::instream* inf, importwave_info& info);
+
     importplugin* get_importer(std::string filename);
   };
 
@@ -79,6 +79,9 @@ struct zzub_flatapi_player : zzub::player {
 #include "archive.h"
 #include "tools.h"
 
+#include <mpg123.h>
+#include "import.h"
+
 using namespace zzub;
 using namespace std;
 
@@ -273,18 +276,13 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_graph = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return player->back.get_plugin_count();
+    return s.get_plugin_count();
   }
 
   void zzub_player_get_new_plugin_name(zzub_player_t *player, const char* uri, char* name, int maxLen) {
 
-    operation_copy_flags flags;
-    flags.copy_plugins = true;
-    flags.copy_graph = true;
-    player->merge_backbuffer_flags(flags);
-
     std::string newname = player->plugin_get_new_name(uri);
     strncpy(name, newname.c_str(), maxLen);
   }
@@ -294,11 +292,11 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_plugins = true;
     flags.copy_graph = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    plugin_descriptor plugindesc = player->back.get_plugin_descriptor(name);
+    plugin_descriptor plugindesc = s.get_plugin_descriptor(name);
     if (plugindesc == graph_traits<plugin_map>::null_vertex()) return 0;
-    int id = player->back.graph[plugindesc].id;
+    int id = s.graph[plugindesc].id;
     return zzub_player_get_plugin_by_id(player, id);
   }
 
@@ -306,9 +304,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return player->back.plugins[id]->proxy;
+    return s.plugins[id]->proxy;
   }
 
   zzub_plugin_t* zzub_player_get_plugin(zzub_player_t *player, int index) {
@@ -316,10 +314,10 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    int id = player->back.graph[index].id;
-    return player->back.plugins[id]->proxy;
+    int id = s.graph[index].id;
+    return s.plugins[id]->proxy;
   }
 
   int zzub_plugin_set_midi_connection_device(zzub_plugin_t *to_plugin, zzub_plugin_t* from_plugin, const char* name) {
@@ -409,18 +407,18 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_sequencer_tracks = true;
     flags.copy_plugins = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return (int)player->back.sequencer_tracks.size();
+    return (int)s.sequencer_tracks.size();
   }
 
   zzub_sequence_t* zzub_player_get_sequence(zzub_player_t *player, int index) {
 
     operation_copy_flags flags;
     flags.copy_sequencer_tracks = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return player->back.sequencer_tracks[index].proxy;
+    return s.sequencer_tracks[index].proxy;
   }
 
 
@@ -442,22 +440,22 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return (int)player->back.wavetable.waves.size();
+    return (int)s.wavetable.waves.size();
   }
 
   zzub_wave_t* zzub_player_get_wave(zzub_player_t* player, int index) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
     if (index == -1) // monitor wave
-      return player->back.wavetable.monitorwave.proxy;
+      return s.wavetable.monitorwave.proxy;
     else {
-      assert(index >= 0 && index < player->back.wavetable.waves.size());
-      return player->back.wavetable.waves[index]->proxy;
+      assert(index >= 0 && index < s.wavetable.waves.size());
+      return s.wavetable.waves[index]->proxy;
     }
   }
 
@@ -482,6 +480,22 @@ extern "C"
     player->set_event_queue_state(enable);
   }
 
+  int zzub_player_get_event_queue_size(zzub_player_t* player) {
+    return player->get_user_event_queue_size();
+  }
+
+  int zzub_player_get_all_plugin_meters(zzub_player_t* player, float* values, int size) {
+    std::vector<metaplugin*>& plugins = player->front.plugins;
+    int count = (int)plugins.size() * 3;
+    for (int i = 0; i < size; i += 3) {
+      metaplugin* m = (size_t)(i / 3) < plugins.size() ? plugins[i / 3] : 0;
+      values[i] = m ? m->last_work_max_left : 0.0f;
+      if (i + 1 < size) values[i + 1] = m ? m->last_work_max_right : 0.0f;
+      if (i + 2 < size) values[i + 2] = m ? (float)m->cpu_load : 0.0f;
+    }
+    return count;
+  }
+
   zzub_midimapping_t *zzub_player_add_midimapping(zzub_plugin_t *plugin, int group, int track, int param, int channel, int controller) {
 
 
@@ -500,18 +514,18 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_midi_mappings = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return &player->back.midi_mappings[index];
+    return &s.midi_mappings[index];
   }
 
   int zzub_player_get_midimapping_count(zzub_player_t* player) {
 
     operation_copy_flags flags;
     flags.copy_midi_mappings = true;
-    player->merge_backbuffer_flags(flags);
+    zzub::song& s = player->read_song(flags);
 
-    return player->back.midi_mappings.size();
+    return s.midi_mappings.size();
   }
 
   int zzub_player_get_automation(zzub_player_t* player) {
@@ -522,6 +536,18 @@ extern "C"
     player->front.is_recording_parameters = enable!=0?true:false;
   }
 
+  int zzub_player_render_stereo(zzub_player_t* player, void* buffer, int frames, int format) {
+    return player->render_stereo(buffer, frames, format);
+  }
+
+  int zzub_player_get_thread_count(zzub_player_t* player) {
+    return player->front.scheduler.get_thread_count();
+  }
+
+  void zzub_player_set_thread_count(zzub_player_t* player, int count) {
+    player->set_thread_count(count);
+  }
+
   int zzub_player_get_midi_transport(zzub_player_t* player) {
     return player->front.is_syncing_midi_transport;
   }
@@ -841,10 +867,9 @@ extern "C"
   int zzub_plugin_get_name(zzub_plugin_t *plugin, char* name, int maxlen) {
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    std::string s = plugin->_player->back.plugins[plugin->id]->name;
-    strncpy(name, s.c_str(), maxlen);
+    strncpy(name, s.plugins[plugin->id]->name.c_str(), maxlen);
     return (int)strlen(name);
   }
 
@@ -864,9 +889,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    strncpy(commands, plugin->_player->back.plugins[plugin->id]->info->commands.c_str(), maxlen);
+    strncpy(commands, s.plugins[plugin->id]->info->commands.c_str(), maxlen);
     return strlen(commands);
   }
 
@@ -877,13 +902,13 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
     vector<char> bytes;
     mem_outstream outm(bytes);
     outstream* outf = &outm;
 
-    plugin->_player->back.plugins[plugin->id]->plugin->get_sub_menu(i, outf);
+    s.plugins[plugin->id]->plugin->get_sub_menu(i, outf);
     outf->write((char)0);	// terminate array
 
     // create a new \n-separated string and return it instead, means both getCommands() and getSubCommands() return similar formatted strings
@@ -908,11 +933,11 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
     static _midiouts midiouts;
     midiouts.clear();
-    plugin->_player->back.plugins[plugin->id]->plugin->get_midi_output_names(&midiouts);
+    s.plugins[plugin->id]->plugin->get_midi_output_names(&midiouts);
     return midiouts.names.size();
   }
 
@@ -920,11 +945,11 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
     static _midiouts midiouts;
     midiouts.clear();
-    plugin->_player->back.plugins[plugin->id]->plugin->get_midi_output_names(&midiouts);
+    s.plugins[plugin->id]->plugin->get_midi_output_names(&midiouts);
     return midiouts.names[index].c_str();
   }
 
@@ -932,9 +957,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    const zzub::envelope_info** infos = plugin->_player->back.plugins[plugin->id]->plugin->get_envelope_infos();
+    const zzub::envelope_info** infos = s.plugins[plugin->id]->plugin->get_envelope_infos();
     if (!infos) return 0;
 
     int count = 0;
@@ -946,9 +971,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    const zzub::envelope_info** infos = plugin->_player->back.plugins[plugin->id]->plugin->get_envelope_infos();
+    const zzub::envelope_info** infos = s.plugins[plugin->id]->plugin->get_envelope_infos();
     if (!infos) return 0;
 
     int count = 0;
@@ -975,16 +1000,16 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    return plugin->_player->back.plugins[plugin->id]->flags;
+    zzub::song& s = plugin->_player->read_song(flags);
+    return s.plugins[plugin->id]->flags;
   }
 
   zzub_pluginloader_t *zzub_plugin_get_pluginloader(zzub_plugin_t *plugin) {
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    return plugin->_player->back.plugins[plugin->id]->info;
+    zzub::song& s = plugin->_player->read_song(flags);
+    return s.plugins[plugin->id]->info;
   }
 
   void zzub_plugin_add_pattern(zzub_plugin_t *plugin, zzub_pattern_t *pattern) {
@@ -1010,31 +1035,29 @@ extern "C"
   zzub_pattern_t *zzub_plugin_get_pattern(zzub_plugin_t *plugin, int index) {
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    return new zzub::pattern(*plugin->_player->back.plugins[plugin->id]->patterns[index]);
+    zzub::song& s = plugin->_player->read_song(flags);
+    return new zzub::pattern(*s.plugins[plugin->id]->patterns[index]);
   }
 
   int zzub_plugin_get_pattern_index(zzub_plugin_t *plugin, zzub_pattern_t *pattern) {
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    for (size_t i = 0; i < plugin->_player->back.plugins[plugin->id]->patterns.size(); i++)
-      if (plugin->_player->back.plugins[plugin->id]->patterns[i] == pattern) return (int)i;
+    for (size_t i = 0; i < s.plugins[plugin->id]->patterns.size(); i++)
+      if (s.plugins[plugin->id]->patterns[i] == pattern) return (int)i;
     return -1;
   }
 
 
   int zzub_plugin_get_pattern_by_name(zzub_plugin_t *plugin, const char* name) {
-    // copy necessary fields to the back buffer (if neccessary) and fetch the value from there
-    // (note to self: separating read/write flags seems appropriate now)
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    for (size_t i = 0; i < plugin->_player->back.plugins[plugin->id]->patterns.size(); i++)
-      if (plugin->_player->back.plugins[plugin->id]->patterns[i]->name == name) return (int)i;
+    zzub::song& s = plugin->_player->read_song(flags);
+    for (size_t i = 0; i < s.plugins[plugin->id]->patterns.size(); i++)
+      if (s.plugins[plugin->id]->patterns[i]->name == name) return (int)i;
     return -1;
   }
 
@@ -1042,16 +1065,16 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    return (int)plugin->_player->back.plugins[plugin->id]->patterns.size();
+    zzub::song& s = plugin->_player->read_song(flags);
+    return (int)s.plugins[plugin->id]->patterns.size();
   }
 
   const char* zzub_plugin_get_pattern_name(zzub_plugin_t *plugin, int index) {
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    return plugin->_player->back.plugins[plugin->id]->patterns[index]->name.c_str();
+    zzub::song& s = plugin->_player->read_song(flags);
+    return s.plugins[plugin->id]->patterns[index]->name.c_str();
   }
 
   void zzub_plugin_set_pattern_name(zzub_plugin_t *plugin, int index, const char* name) {
@@ -1063,9 +1086,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugins[plugin->id]->patterns[index]->rows;
+    return s.plugins[plugin->id]->patterns[index]->rows;
   }
 
   void zzub_plugin_set_pattern_length(zzub_plugin_t *plugin, int index, int rows) {
@@ -1077,9 +1100,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugins[plugin->id]->patterns[pattern]->groups[group][track][column][row];
+    return s.plugins[plugin->id]->patterns[pattern]->groups[group][track][column][row];
   }
 
   int zzub_plugin_get_parameter_count(zzub_plugin_t *plugin, int group, int track) {
@@ -1087,9 +1110,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugin_get_parameter_count(plugin->id, group, track);
+    return s.plugin_get_parameter_count(plugin->id, group, track);
   }
 
   zzub_parameter_t* zzub_plugin_get_parameter(zzub_plugin_t *plugin, int group, int track, int column) {
@@ -1097,9 +1120,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return (zzub_parameter_t*)plugin->_player->back.plugin_get_parameter_info(plugin->id, group, track, column);
+    return (zzub_parameter_t*)s.plugin_get_parameter_info(plugin->id, group, track, column);
   }
 
   void zzub_plugin_set_pattern_value(zzub_plugin_t *plugin, int pattern, int group, int track, int column, int row, int value) {
@@ -1110,6 +1133,50 @@ extern "C"
     plugin->_player->plugin_set_pattern_value(plugin->id, pattern, group, track, column, row, value);
   }
 
+  static bool pattern_block_in_range(const zzub::pattern& p, int group, int track, int tracks, int column, int columns, int row, int rows) {
+    if (group < 0 || group >= (int)p.groups.size()) return false;
+    if (track < 0 || tracks < 0 || track + tracks > (int)p.groups[group].size()) return false;
+    if (row < 0 || rows < 0 || row + rows > p.rows) return false;
+    for (int t = track; t < track + tracks; t++) {
+      if (column < 0 || columns < 0 || column + columns > (int)p.groups[group][t].size()) return false;
+    }
+    return true;
+  }
+
+  int zzub_plugin_get_pattern_columns(zzub_plugin_t *plugin, int pattern, int group, int track, int tracks, int column, int columns, int row, int rows, int* values, int size) {
+
+    operation_copy_flags flags;
+    flags.copy_plugins = true;
+    zzub::song& s = plugin->_player->read_song(flags);
+
+    const zzub::pattern& p = *s.plugins[plugin->id]->patterns[pattern];
+    if (!pattern_block_in_range(p, group, track, tracks, column, columns, row, rows)) return -1;
+    if (tracks * columns * rows > size) return -1;
+
+    int* dest = values;
+    for (int t = track; t < track + tracks; t++) {
+      for (int c = column; c < column + columns; c++) {
+	const zzub::pattern::column& col = p.groups[group][t][c];
+	std::copy(col.begin() + row, col.begin() + row + rows, dest);
+	dest += rows;
+      }
+    }
+    return (int)(dest - values);
+  }
+
+  void zzub_plugin_set_pattern_columns(zzub_plugin_t *plugin, int pattern, int group, int track, int tracks, int column, int columns, int row, int rows, const int* values, int size) {
+
+    operation_copy_flags flags;
+    flags.copy_plugins = true;
+    zzub::song& s = plugin->_player->read_song(flags);
+
+    const zzub::pattern& p = *s.plugins[plugin->id]->patterns[pattern];
+    if (!pattern_block_in_range(p, group, track, tracks, column, columns, row, rows)) return;
+    if (tracks * columns * rows > size) return;
+
+    plugin->_player->plugin_set_pattern_columns(plugin->id, pattern, group, track, tracks, column, columns, row, rows, values);
+  }
+
   void zzub_plugin_insert_pattern_rows(zzub_plugin_t *plugin, int pattern, const int* column_indices, int num_indices, int start, int rows) {
 
     plugin->_player->plugin_insert_pattern_rows(plugin->id, pattern, (int*)column_indices, num_indices, start, rows);
@@ -1152,9 +1219,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugin_get_parameter(plugin->id, group, track, column);
+    return s.plugin_get_parameter(plugin->id, group, track, column);
   }
 
   void zzub_plugin_set_parameter_value(zzub_plugin_t *plugin, int group, int track, int column, int value, int record) {
@@ -1170,10 +1237,10 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    *x = plugin->_player->back.plugins[plugin->id]->x;
-    *y = plugin->_player->back.plugins[plugin->id]->y;
+    *x = s.plugins[plugin->id]->x;
+    *y = s.plugins[plugin->id]->y;
   }
 
   void zzub_plugin_set_position(zzub_plugin_t *plugin, float x, float y) {
@@ -1196,9 +1263,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 	
-    return plugin->_player->back.plugin_get_input_connection_count(plugin->id);
+    return s.plugin_get_input_connection_count(plugin->id);
   }
 
   int zzub_plugin_get_input_connection_by_type(zzub_plugin_t *to_plugin, zzub_plugin_t* from_plugin, int type) {
@@ -1206,9 +1273,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    to_plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = to_plugin->_player->read_song(flags);
 
-    return to_plugin->_player->back.plugin_get_input_connection_index(to_plugin->id, from_plugin->id, (connection_type)type);
+    return s.plugin_get_input_connection_index(to_plugin->id, from_plugin->id, (connection_type)type);
   }
 
   int zzub_plugin_get_input_connection_type(zzub_plugin_t *plugin, int index) {
@@ -1216,9 +1283,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugin_get_input_connection_type(plugin->id, index);
+    return s.plugin_get_input_connection_type(plugin->id, index);
   }
 
   zzub_plugin_t* zzub_plugin_get_input_connection_plugin(zzub_plugin_t *plugin, int index) {
@@ -1226,10 +1293,10 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    int id = plugin->_player->back.plugin_get_input_connection_plugin(plugin->id, index);
-    return plugin->_player->back.plugins[id]->proxy;
+    int id = s.plugin_get_input_connection_plugin(plugin->id, index);
+    return s.plugins[id]->proxy;
   }
 
   int zzub_plugin_get_output_connection_count(zzub_plugin_t *plugin) {
@@ -1237,9 +1304,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugin_get_output_connection_count(plugin->id);
+    return s.plugin_get_output_connection_count(plugin->id);
   }
 
   int zzub_plugin_get_output_connection_by_type(zzub_plugin_t *to_plugin, zzub_plugin_t* from_plugin, int type) {
@@ -1247,9 +1314,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    to_plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = to_plugin->_player->read_song(flags);
 
-    return to_plugin->_player->back.plugin_get_output_connection_index(to_plugin->id, from_plugin->id, (connection_type)type);
+    return s.plugin_get_output_connection_index(to_plugin->id, from_plugin->id, (connection_type)type);
   }
 
   int zzub_plugin_get_output_connection_type(zzub_plugin_t *plugin, int index) {
@@ -1257,9 +1324,9 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugin_get_output_connection_type(plugin->id, index);
+    return s.plugin_get_output_connection_type(plugin->id, index);
   }
 
   zzub_plugin_t* zzub_plugin_get_output_connection_plugin(zzub_plugin_t *plugin, int index) {
@@ -1267,10 +1334,10 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    int id = plugin->_player->back.plugin_get_output_connection_plugin(plugin->id, index);
-    return plugin->_player->back.plugins[id]->proxy;
+    int id = s.plugin_get_output_connection_plugin(plugin->id, index);
+    return s.plugins[id]->proxy;
   }
 
   int zzub_connection_get_parameter_count(zzub_player_t *player, int plugin, int from_plugin) {
@@ -1303,8 +1370,8 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
-    return plugin->_player->back.plugins[plugin->id]->tracks;
+    zzub::song& s = plugin->_player->read_song(flags);
+    return s.plugins[plugin->id]->tracks;
   }
 
   void zzub_plugin_set_track_count(zzub_plugin_t *plugin, int tracks) {
@@ -1327,9 +1394,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    const zzub::info* info = plugin->_player->back.plugins[plugin->id]->info;
+    const zzub::info* info = s.plugins[plugin->id]->info;
 
     switch (group) {
     case 0:
@@ -1385,16 +1452,16 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_plugins = true;
     flags.copy_graph = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
     int index = -1;
     zzub_plugin_pattern_to_linear_no_connections(plugin, group, 0, column, &index);
 
-    const zzub::parameter* para = plugin->_player->back.plugin_get_parameter_info(plugin->id, group, 0, column);
+    const zzub::parameter* para = s.plugin_get_parameter_info(plugin->id, group, 0, column);
     if (index != -1) {
       if (value != getNoValue(para)) {	// infector crashen when trying to describe novalues (and out-of-range-values)
 			
-	const char* str = plugin->_player->back.plugins[plugin->id]->plugin->describe_value(index, value);
+	const char* str = s.plugins[plugin->id]->plugin->describe_value(index, value);
 	if (str != 0) {
 	  strncpy(name, str, maxlen);
 	  return strlen(str);
@@ -1465,9 +1532,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    return plugin->_player->back.plugins[plugin->id]->plugin->attributes[index];//machine->getAttributeValue((size_t)index);
+    return s.plugins[plugin->id]->plugin->attributes[index];//machine->getAttributeValue((size_t)index);
   }
 
   void zzub_plugin_set_attribute_value(zzub_plugin_t *plugin, int index, int value) {
@@ -1513,12 +1580,12 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_plugins = true;
     flags.copy_graph = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    const zzub::info* info = plugin->_player->back.plugins[plugin->id]->info;
+    const zzub::info* info = s.plugins[plugin->id]->info;
 
     int numconnparams = 0;
-    for (int i = 0; i < plugin->_player->back.plugin_get_input_connection_count(plugin->id); i++) {
+    for (int i = 0; i < s.plugin_get_input_connection_count(plugin->id); i++) {
       int numconnparamtrack = zzub_plugin_get_parameter_count(plugin, 0, i);
       if (index < numconnparams + numconnparamtrack) {
 	*group = 0;
@@ -1543,7 +1610,7 @@ extern "C"
     if (!info->track_parameters.size()) return 0;
 
     int t = index / info->track_parameters.size();
-    if (t >= plugin->_player->back.plugins[plugin->id]->tracks) return 0;
+    if (t >= s.plugins[plugin->id]->tracks) return 0;
 
     *group = 2;
     *track = t;
@@ -1555,12 +1622,12 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_plugins = true;
     flags.copy_graph = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    const zzub::info* info = plugin->_player->back.plugins[plugin->id]->info;
+    const zzub::info* info = s.plugins[plugin->id]->info;
 
     int numconnparams = 0;
-    for (int i = 0; i < plugin->_player->back.plugin_get_input_connection_count(plugin->id); i++) {
+    for (int i = 0; i < s.plugin_get_input_connection_count(plugin->id); i++) {
       int numconnparamtrack = zzub_plugin_get_parameter_count(plugin, 0, i);
 
       if (group == 0 && track == i) {
@@ -1595,15 +1662,15 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_graph = true;
     flags.copy_plugins = true;
-    plugin->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = plugin->_player->read_song(flags);
 
-    const zzub::info* info = plugin->_player->back.plugins[plugin->id]->info;
+    const zzub::info* info = s.plugins[plugin->id]->info;
 
     int numconnparams = 0;
-    for (int i = 0; i < plugin->_player->back.plugin_get_input_connection_count(plugin->id); i++)
+    for (int i = 0; i < s.plugin_get_input_connection_count(plugin->id); i++)
       numconnparams += zzub_plugin_get_parameter_count(plugin, 0, i);
 
-    return numconnparams + info->global_parameters.size() + info->track_parameters.size() * plugin->_player->back.plugins[plugin->id]->tracks;
+    return numconnparams + info->global_parameters.size() + info->track_parameters.size() * s.plugins[plugin->id]->tracks;
   }
 
   int zzub_plugin_set_instrument(zzub_plugin_t *plugin, const char *name) {
@@ -1622,21 +1689,32 @@ extern "C"
   ***/
 
   int zzub_sequence_get_event_at(zzub_sequence_t* sequence, int pos) {
-    int song_index = 0;
-    int timestamp, value;
-    int event_count = zzub_sequence_get_event_count(sequence);
-    while (event_count > 0 && song_index < event_count) 
-      {
-	zzub_sequence_get_event(sequence, song_index, &timestamp, &value);
-	if (pos <= timestamp) break;
-	song_index++;
-      }
+    int song_index = zzub_sequence_find_event(sequence, pos);
+    if (song_index == -1) return -1;
 
-    if (song_index >= event_count || pos != timestamp) return -1;
+    int timestamp, value;
+    zzub_sequence_get_event(sequence, song_index, &timestamp, &value);
+    if (pos != timestamp) return -1;
 
     return value;
   }
 
+  int zzub_sequence_find_event(zzub_sequence_t* sequence, int pos) {
+    operation_copy_flags flags;
+    flags.copy_sequencer_tracks = true;
+    zzub::song& s = sequence->_player->read_song(flags);
+
+    return s.sequencer_tracks[sequence->track].find_event(pos);
+  }
+
+  void zzub_sequence_get_event_range(zzub_sequence_t* sequence, int start, int end, int* first, int* last) {
+    operation_copy_flags flags;
+    flags.copy_sequencer_tracks = true;
+    zzub::song& s = sequence->_player->read_song(flags);
+
+    s.sequencer_tracks[sequence->track].get_event_range(start, end, *first, *last);
+  }
+
   void zzub_sequence_set_event(zzub_sequence_t* sequence, int timestamp, int value) {
 
     sequence->_player->sequencer_set_event(sequence->track, timestamp, value);
@@ -1646,17 +1724,17 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_sequencer_tracks = true;
-    sequence->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = sequence->_player->read_song(flags);
 
-    return (int)sequence->_player->back.sequencer_tracks[sequence->track].events.size();
+    return (int)s.sequencer_tracks[sequence->track].events.size();
   }
 
   int zzub_sequence_get_event(zzub_sequence_t* sequence, int index, int* pos, int* value) {
     operation_copy_flags flags;
     flags.copy_sequencer_tracks = true;
-    sequence->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = sequence->_player->read_song(flags);
 	
-    sequence_event& ev = sequence->_player->back.sequencer_tracks[sequence->track].events[index];
+    sequence_event& ev = s.sequencer_tracks[sequence->track].events[index];
     *pos = ev.time;
     *value = ev.pattern_event.value;
     return 0;
@@ -1667,10 +1745,10 @@ extern "C"
     operation_copy_flags flags;
     flags.copy_sequencer_tracks = true;
     flags.copy_plugins = true;
-    sequence->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = sequence->_player->read_song(flags);
 
-    int id = sequence->_player->back.sequencer_tracks[sequence->track].plugin_id;
-    return sequence->_player->back.plugins[id]->proxy;
+    int id = s.sequencer_tracks[sequence->track].plugin_id;
+    return s.plugins[id]->proxy;
   }
 
   zzub_sequence_t* zzub_player_create_sequence(zzub_player_t *player, zzub_plugin_t* plugin, int type) {
@@ -1681,9 +1759,9 @@ extern "C"
   int zzub_sequence_get_type(zzub_sequence_t* sequence) {
     operation_copy_flags flags;
     flags.copy_sequencer_tracks = true;
-    sequence->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = sequence->_player->read_song(flags);
 
-    return (int)sequence->_player->back.sequencer_tracks[sequence->track].type;
+    return (int)s.sequencer_tracks[sequence->track].type;
   }
 
   void zzub_sequence_destroy(zzub_sequence_t* sequence) {
@@ -1800,6 +1878,35 @@ extern "C"
     pattern->groups[group][track][column][row] = value;
   }
 
+  int zzub_pattern_get_columns(zzub_pattern_t* pattern, int group, int track, int tracks, int column, int columns, int row, int rows, int* values, int size) {
+    if (!pattern_block_in_range(*pattern, group, track, tracks, column, columns, row, rows)) return -1;
+    if (tracks * columns * rows > size) return -1;
+
+    int* dest = values;
+    for (int t = track; t < track + tracks; t++) {
+      for (int c = column; c < column + columns; c++) {
+	const zzub::pattern::column& col = pattern->groups[group][t][c];
+	std::copy(col.begin() + row, col.begin() + row + rows, dest);
+	dest += rows;
+      }
+    }
+    return (int)(dest - values);
+  }
+
+  void zzub_pattern_set_columns(zzub_pattern_t* pattern, int group, int track, int tracks, int column, int columns, int row, int rows, const int* values, int size) {
+    if (!pattern_block_in_range(*pattern, group, track, tracks, column, columns, row, rows)) return;
+    if (tracks * columns * rows > size) return;
+
+    const int* src = values;
+    for (int t = track; t < track + tracks; t++) {
+      for (int c = column; c < column + columns; c++) {
+	zzub::pattern::column& col = pattern->groups[group][t][c];
+	std::copy(src, src + rows, col.begin() + row);
+	src += rows;
+      }
+    }
+  }
+
   void zzub_pattern_interpolate(zzub_pattern_t* pattern) {
     int num_rows = zzub_pattern_get_row_count(pattern);
     int num_cols = zzub_pattern_get_column_count(pattern, 0, 0);
@@ -2059,8 +2166,8 @@ extern "C"
   const char* zzub_wave_get_name(zzub_wave_t* wave) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
-    return wave->_player->back.wavetable.waves[wave->wave]->name.c_str();
+    zzub::song& s = wave->_player->read_song(flags);
+    return s.wavetable.waves[wave->wave]->name.c_str();
   }
 
   void zzub_wave_set_name(zzub_wave_t* wave, const char* name) {
@@ -2070,8 +2177,8 @@ extern "C"
   const char* zzub_wave_get_path(zzub_wave_t* wave) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
-    return wave->_player->back.wavetable.waves[wave->wave]->fileName.c_str();
+    zzub::song& s = wave->_player->read_song(flags);
+    return s.wavetable.waves[wave->wave]->fileName.c_str();
   }
 
   void zzub_wave_set_path(zzub_wave_t* wave, const char* path) {
@@ -2081,8 +2188,8 @@ extern "C"
   int zzub_wave_get_flags(zzub_wave_t* wave) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
-    return wave->_player->back.wavetable.waves[wave->wave]->flags;
+    zzub::song& s = wave->_player->read_song(flags);
+    return s.wavetable.waves[wave->wave]->flags;
   }
 
   void zzub_wave_set_flags(zzub_wave_t* wave, int flags) {
@@ -2092,14 +2199,21 @@ extern "C"
   float zzub_wave_get_volume(zzub_wave_t* wave) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
-    return wave->_player->back.wavetable.waves[wave->wave]->volume;
+    zzub::song& s = wave->_player->read_song(flags);
+    return s.wavetable.waves[wave->wave]->volume;
   }
 
   void zzub_wave_set_volume(zzub_wave_t* wave, float volume) {
     wave->_player->wave_set_volume(wave->wave, volume);
   }
 
+  int zzub_wave_load_wavedata(zzub_wave_t* wave, int level, int offset, int clear, zzub_wavedata_t* data) {
+    if (!data->samples) return 0;
+    int loaded_samples = wave->_player->wave_load_samples(wave->wave, level, offset, clear != 0, data->info, data->samples);
+    data->samples = 0;
+    return loaded_samples;
+  }
+
   int zzub_wave_load_sample(zzub_wave_t* wave, int level, int offset, 
 			    int clear, const char* path, 
 			    zzub_input_t* datastream) {
@@ -2111,6 +2225,17 @@ extern "C"
     level->_player->wave_remove_samples(level->wave, level->level, start, end - start + 1);
   }
 
+  void zzub_wavelevel_replace_sample_range(zzub_wavelevel_t* level, int start, void* buffer, int numsamples) {
+    level->_player->wave_replace_samples(level->wave, level->level, start, numsamples, buffer);
+  }
+
+  void* zzub_wavelevel_get_samples(zzub_wavelevel_t* level) {
+    operation_copy_flags flags;
+    flags.copy_wavetable = true;
+    zzub::song& s = level->_player->read_song(flags);
+    return s.wavetable.waves[level->wave]->levels[level->level].samples;
+  }
+
   void zzub_wave_insert_sample_range(zzub_player_t* player, int wave, int level, int start, void* buffer, int channels, int format, int numsamples) {
     assert(false);
   }
@@ -2123,9 +2248,9 @@ extern "C"
   zzub_wave_t* zzub_wavelevel_get_wave(zzub_wavelevel_t* level) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = level->_player->read_song(flags);
 
-    return level->_player->back.wavetable.waves[level->wave]->proxy;
+    return s.wavetable.waves[level->wave]->proxy;
   }
 
   int zzub_wave_clear(zzub_wave_t* wave) {
@@ -2137,36 +2262,36 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    return wave->_player->back.wavetable.waves[wave->wave]->levels.size();
+    return s.wavetable.waves[wave->wave]->levels.size();
   }
 
   zzub_wavelevel_t* zzub_wave_get_level(zzub_wave_t* wave, int index) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    return wave->_player->back.wavetable.waves[wave->wave]->levels[index].proxy;
+    return s.wavetable.waves[wave->wave]->levels[index].proxy;
   }
 
   int zzub_wave_get_envelope_count(zzub_wave_t* wave) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    return wave->_player->back.wavetable.waves[wave->wave]->envelopes.size();
+    return s.wavetable.waves[wave->wave]->envelopes.size();
   }
 
   void zzub_wave_set_envelope_count(zzub_wave_t* wave, unsigned int count) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    vector<envelope_entry> envelopes = wave->_player->back.wavetable.waves[wave->wave]->envelopes;
+    vector<envelope_entry> envelopes = s.wavetable.waves[wave->wave]->envelopes;
     if (count >= envelopes.size()) {
       for (unsigned int i = envelopes.size(); i < count; i++) {
 	envelopes.push_back(envelope_entry());
@@ -2183,19 +2308,19 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    assert(index >= 0 && index < wave->_player->back.wavetable.waves[wave->wave]->envelopes.size());
-    return &wave->_player->back.wavetable.waves[wave->wave]->envelopes[index];
+    assert(index >= 0 && index < s.wavetable.waves[wave->wave]->envelopes.size());
+    return &s.wavetable.waves[wave->wave]->envelopes[index];
   }
 
   void zzub_wave_set_envelope(zzub_wave_t* wave, int index, zzub_envelope_t* env) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    vector<envelope_entry> envelopes = wave->_player->back.wavetable.waves[wave->wave]->envelopes;
+    vector<envelope_entry> envelopes = s.wavetable.waves[wave->wave]->envelopes;
     assert(index >= 0 && index < envelopes.size());
     envelopes[index] = *env;
     wave->_player->wave_set_envelopes(wave->wave, envelopes);
@@ -2206,9 +2331,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = level->_player->read_song(flags);
 
-    return level->_player->back.wavetable.waves[level->wave]->levels[level->level].sample_count;
+    return s.wavetable.waves[level->wave]->levels[level->level].sample_count;
   }
 
   void zzub_wavelevel_set_sample_count(zzub_wavelevel_t* level, int count) {
@@ -2218,8 +2343,8 @@ extern "C"
   int zzub_wavelevel_get_root_note(zzub_wavelevel_t* level) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
-    return level->_player->back.wavetable.waves[level->wave]->levels[level->level].root_note;
+    zzub::song& s = level->_player->read_song(flags);
+    return s.wavetable.waves[level->wave]->levels[level->level].root_note;
   }
 
   void zzub_wavelevel_set_root_note(zzub_wavelevel_t* level, int note) {
@@ -2229,8 +2354,8 @@ extern "C"
   int zzub_wavelevel_get_samples_per_second(zzub_wavelevel_t* level) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
-    return level->_player->back.wavetable.waves[level->wave]->levels[level->level].samples_per_second;
+    zzub::song& s = level->_player->read_song(flags);
+    return s.wavetable.waves[level->wave]->levels[level->level].samples_per_second;
   }
 
   void zzub_wavelevel_set_samples_per_second(zzub_wavelevel_t* level, int sps) {
@@ -2240,8 +2365,8 @@ extern "C"
   int zzub_wavelevel_get_loop_start(zzub_wavelevel_t* level) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
-    return level->_player->back.wavetable.waves[level->wave]->levels[level->level].loop_start;
+    zzub::song& s = level->_player->read_song(flags);
+    return s.wavetable.waves[level->wave]->levels[level->level].loop_start;
   }
 
   void zzub_wavelevel_set_loop_start(zzub_wavelevel_t* level, int pos) {
@@ -2251,8 +2376,8 @@ extern "C"
   int zzub_wavelevel_get_loop_end(zzub_wavelevel_t* level) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
-    return level->_player->back.wavetable.waves[level->wave]->levels[level->level].loop_end;
+    zzub::song& s = level->_player->read_song(flags);
+    return s.wavetable.waves[level->wave]->levels[level->level].loop_end;
   }
 
   void zzub_wavelevel_set_loop_end(zzub_wavelevel_t* level, int pos) {
@@ -2262,8 +2387,8 @@ extern "C"
   int zzub_wavelevel_get_format(zzub_wavelevel_t* level) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
-    return level->_player->back.wavetable.waves[level->wave]->levels[level->level].format;
+    zzub::song& s = level->_player->read_song(flags);
+    return s.wavetable.waves[level->wave]->levels[level->level].format;
   }
 
   static sf_count_t outstream_filelen (void *user_data) {
@@ -2324,15 +2449,16 @@ extern "C"
     for (int i = 0; i < (end - start) * bytes_per_sample; i++) {
       target_info.samples[i] = source_info.samples[start * bytes_per_sample + i];
     }
+    source->_player->get_wave_peaks(wave_index, 0).invalidate(0, end - start, true);
     return 0;
   }
 
   int zzub_wave_save_sample_range(zzub_wave_t* wave, unsigned int level, zzub_output_t* datastream, int start, int end) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    wave_info_ex& w = *wave->_player->back.wavetable.waves[wave->wave];
+    wave_info_ex& w = *s.wavetable.waves[wave->wave];
     if (level < 0 || level >= w.levels.size()) {
       return -1;
     }
@@ -2386,9 +2512,9 @@ extern "C"
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    wave->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = wave->_player->read_song(flags);
 
-    wave_info_ex& w = *wave->_player->back.wavetable.waves[wave->wave];
+    wave_info_ex& w = *s.wavetable.waves[wave->wave];
     return zzub_wave_save_sample_range(wave, level, datastream, 0, w.get_sample_count(level));
   }
 
@@ -2432,6 +2558,7 @@ extern "C"
 	fade2 -= dfade;
       }
     }
+    level->_player->get_wave_peaks(level->wave, level->level).invalidate(start, end);
     l.loop_start = start;
     l.loop_end = end;
     w.flags = w.flags | zzub_wave_flag_loop;
@@ -2476,97 +2603,19 @@ extern "C"
 	normalizer = (0.5 * pow(2.0, bitsps)) / float(max_sample);
       }
     }
+    level->_player->get_wave_peaks(level->wave, level->level).invalidate(0, l.sample_count);
   }
 
   void zzub_wavelevel_get_samples_digest(zzub_wavelevel_t* level, int channel, int start, int end, float *mindigest, float *maxdigest, float *ampdigest, int digestsize) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
-    level->_player->merge_backbuffer_flags(flags);
+    zzub::song& s = level->_player->read_song(flags);
 
-    wave_info_ex& w = *level->_player->back.wavetable.waves[level->wave];
-    wave_level_ex& l = level->_player->back.wavetable.waves[level->wave]->levels[level->level];
+    wave_info_ex& w = *s.wavetable.waves[level->wave];
+    wave_level_ex& l = s.wavetable.waves[level->wave]->levels[level->level];
 
-    unsigned char *samples = (unsigned char*)l.samples;
-    int bitsps = l.get_bytes_per_sample() * 8;
-    int bps = l.get_bytes_per_sample();
-    wave_buffer_type format = (wave_buffer_type)l.format;
-    float scaler = 1.0f / (1<<(bitsps-1));
-    //int samplecount = l.sample_count;
-    int samplerange = end - start;
-    //assert((start >= 0) && (start < samplecount));
-    //assert((end > start) && (end <= samplecount));
-    assert(samplerange > 0);
-    int channels = w.get_stereo()?2:1;
-    float sps = (float)samplerange / (float)digestsize; // samples per sample
-    float blockstart = (float)start;
-    if (sps > 1)
-      {
-	for (int i = 0; i < digestsize; ++i) {
-	  float blockend = std::min(blockstart + sps, (float)end);
-	  float minsample = 1.0f;
-	  float maxsample = -1.0f;
-	  float amp = 0.0f;
-	  for (int s = (int)blockstart; s < (int)blockend; ++s) {
-	    int offset = (s*channels + channel)*bps;
-	    int isample = 0;
-	    switch (bps) {
-	    case 1: isample = *(char*)&samples[offset]; break;
-	    case 2: isample = *(short*)&samples[offset]; break;
-	    case 3: 
-	      isample = *(int*)&samples[offset] & 0x00ffffff; 
-	      if (isample & 0x00800000) isample = isample | 0xFF000000;
-	      break; // TODO
-	    case 4: 
-	      switch (format) {
-	      case wave_buffer_type_si16:
-		break;
-	      case wave_buffer_type_si24:
-		break;
-	      case wave_buffer_type_si32:
-		isample = *(int*)&samples[offset];
-		break;
-	      case wave_buffer_type_f32:
-		isample = (int)((*(float*)&samples[offset]) / scaler);
-		break;
-	      }
-	      break;
-	    }
-	    float sample = (float)(isample) * scaler;
-	    minsample = std::min(minsample, sample);
-	    maxsample = std::max(maxsample, sample);
-	    amp += sample*sample;
-	  }
-	  if (mindigest)
-	    mindigest[i] = minsample;
-	  if (maxdigest)
-	    maxdigest[i] = maxsample;
-	  if (ampdigest)
-	    ampdigest[i] = sqrtf(amp / (blockend - blockstart));
-	  blockstart = blockend;
-	}
-      }
-    else
-      {
-	for (int i = 0; i < digestsize; ++i) {
-	  int s = (int)(blockstart + i * sps /* + 0.5f */);
-	  int offset = (s*channels + channel)*bps;
-	  int isample = 0;
-	  switch (bps) {
-	  case 1: isample = *(char*)&samples[offset]; break;
-	  case 2: isample = *(short*)&samples[offset]; break;
-	  case 3: isample = *(int*)&samples[offset]; break; // TODO
-	  case 4: isample = *(int*)&samples[offset]; break;
-	  }
-	  float sample = (float)(isample) * scaler;
-	  if (mindigest)
-	    mindigest[i] = sample;
-	  if (maxdigest)
-	    maxdigest[i] = sample;
-	  if (ampdigest)
-	    ampdigest[i] = std::abs(sample);
-	}
-      }
+    level->_player->get_wave_peaks(level->wave, level->level).get_digest(w, l, channel, start, end, mindigest, maxdigest, ampdigest, digestsize);
   }
 
   /*int zzub_wavelevel_get_sample_count(zzub_wavelevel_t * level) {
@@ -2673,6 +2722,43 @@ extern "C"
     return 0;
     }*/
 
+  // decoded sample files
+
+  zzub_wavedata_t* zzub_wavedata_decode_file(const char* path) {
+    zzub::file_instream strm;
+    if (!strm.open(path)) return 0;
+    waveimporter importer;
+    importwave_data* data = new importwave_data();
+    data->samples = importer.decode(path, &strm, data->info);
+    strm.close();
+    if (!data->samples) {
+      delete data;
+      return 0;
+    }
+    return data;
+  }
+
+  void zzub_wavedata_destroy(zzub_wavedata_t* data) {
+    delete[] data->samples;
+    delete data;
+  }
+
+  int zzub_wavedata_get_channels(zzub_wavedata_t* data) {
+    return data->info.channels;
+  }
+
+  int zzub_wavedata_get_sample_count(zzub_wavedata_t* data) {
+    return data->info.sample_count;
+  }
+
+  int zzub_wavedata_get_samples_per_second(zzub_wavedata_t* data) {
+    return data->info.samples_per_second;
+  }
+
+  int zzub_wavedata_get_format(zzub_wavedata_t* data) {
+    return data->info.format;
+  }
+
   // envelopes
 
   unsigned short zzub_envelope_get_attack(zzub_envelope_t *env) {
@@ -1126,10 +1126,10 @@ namespace zzub {
     copy_flags.copy_graph = true;
     copy_flags.copy_plugins = true;
 
+    // the other patterns are not touched, copying the pattern list is enough
     operation_copy_plugin_flags pluginflags;
     pluginflags.plugin_id = id;
     pluginflags.copy_plugin = true;
-    pluginflags.copy_patterns = true;
     copy_flags.plugin_flags.push_back(pluginflags);
   }
 
@@ -1172,7 +1172,16 @@ namespace zzub {
     operation_copy_plugin_flags pluginflags;
     pluginflags.plugin_id = _id;
     pluginflags.copy_plugin = true;
-    pluginflags.copy_patterns = true;
+    if (index == -1) {
+      // the last pattern is not known before prepare()
+      pluginflags.copy_patterns = true;
+    } else {
+      operation_copy_pattern_flags patternflags;
+      patternflags.plugin_id = id;
+      patternflags.index = index;
+      patternflags.copy_pattern = true;
+      copy_flags.pattern_flags.push_back(patternflags);
+    }
     copy_flags.plugin_flags.push_back(pluginflags);
   }
 
@@ -1312,11 +1321,11 @@ namespace zzub {
     copy_flags.copy_graph = true;
     copy_flags.copy_plugins = true;
 
-    operation_copy_plugin_flags pluginflags;
-    pluginflags.plugin_id = id;
-    pluginflags.copy_plugin = true;
-    pluginflags.copy_patterns = true;
-    copy_flags.plugin_flags.push_back(pluginflags);
+    operation_copy_pattern_flags patternflags;
+    patternflags.plugin_id = id;
+    patternflags.index = index;
+    patternflags.copy_pattern = true;
+    copy_flags.pattern_flags.push_back(patternflags);
 
   }
 
@@ -1359,11 +1368,11 @@ namespace zzub {
     copy_flags.copy_graph = true;
     copy_flags.copy_plugins = true;
 
-    operation_copy_plugin_flags pluginflags;
-    pluginflags.plugin_id = id;
-    pluginflags.copy_plugin = true;
-    pluginflags.copy_patterns = true;
-    copy_flags.plugin_flags.push_back(pluginflags);
+    operation_copy_pattern_flags patternflags;
+    patternflags.plugin_id = id;
+    patternflags.index = index;
+    patternflags.copy_pattern = true;
+    copy_flags.pattern_flags.push_back(patternflags);
 
   }
 
@@ -1421,15 +1430,10 @@ namespace zzub {
     copy_flags.copy_graph = true;
     copy_flags.copy_plugins = true;
 
-    operation_copy_plugin_flags pluginflags;
-    pluginflags.plugin_id = id;
-    pluginflags.copy_plugin = true;
-    pluginflags.copy_patterns = true;
-    copy_flags.plugin_flags.push_back(pluginflags);
-
     operation_copy_pattern_flags patternflags;
     patternflags.plugin_id = id;
     patternflags.index = index;
+    patternflags.copy_pattern = true;
     copy_flags.pattern_flags.push_back(patternflags);
 
   }
@@ -1489,13 +1493,7 @@ namespace zzub {
 
     zzub::sequencer_track& seqtrack = song.sequencer_tracks[track];
 
-    std::vector<sequence_event>::iterator pos = seqtrack.events.begin();
-    int index = 0;
-
-    while (seqtrack.events.size() && (size_t)index < seqtrack.events.size() && pos->time < timestamp) {
-      pos++;
-      index++;
-    }
+    std::vector<sequence_event>::iterator pos = seqtrack.events.begin() + seqtrack.lower_bound(timestamp);
 
     if (seqtrack.events.size() == 0 || pos == seqtrack.events.end()) {
       if (action != -1) {
@@ -1736,7 +1734,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_allocate_wavelevel::op_wavetable_allocate_wavelevel(int _wave, int _level, int _sample_count, int _channels, wave_buffer_type _format) {
+  op_wavetable_allocate_wavelevel::op_wavetable_allocate_wavelevel(zzub::player* _player, int _wave, int _level, int _sample_count, int _channels, wave_buffer_type _format) {
+    player = _player;
     wave = _wave;
     level = _level;
     sample_count = _sample_count;
@@ -1762,6 +1761,7 @@ namespace zzub {
   }
 
   void op_wavetable_allocate_wavelevel::finish(zzub::song& song, bool send_events) {
+    player->erase_wave_peaks(wave, level);
   }
 
 
@@ -1803,7 +1803,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_remove_wavelevel::op_wavetable_remove_wavelevel(int _wave, int _level) {
+  op_wavetable_remove_wavelevel::op_wavetable_remove_wavelevel(zzub::player* _player, int _wave, int _level) {
+    player = _player;
     wave = _wave;
     level = _level;
     copy_flags.copy_wavetable = true;
@@ -1832,6 +1833,8 @@ namespace zzub {
   }
 
   void op_wavetable_remove_wavelevel::finish(zzub::song& song, bool send_events) {
+    // the following levels move down
+    player->erase_wave_peaks(wave);
     //event_data.delete_wave.level = level;
     if (send_events) song.plugin_invoke_event(0, event_data, true);
   }
@@ -1843,7 +1846,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_move_wavelevel::op_wavetable_move_wavelevel(int _wave, int _level, int _newlevel) {
+  op_wavetable_move_wavelevel::op_wavetable_move_wavelevel(zzub::player* _player, int _wave, int _level, int _newlevel) {
+    player = _player;
     wave = _wave;
     level = _level;
     newlevel = _newlevel;
@@ -1871,6 +1875,7 @@ namespace zzub {
   }
 
   void op_wavetable_move_wavelevel::finish(zzub::song& song, bool send_events) {
+    player->erase_wave_peaks(wave);
   }
 
   // ---------------------------------------------------------------------------
@@ -1879,7 +1884,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_wave_replace::op_wavetable_wave_replace(int _wave, const wave_info_ex& _data) {
+  op_wavetable_wave_replace::op_wavetable_wave_replace(zzub::player* _player, int _wave, const wave_info_ex& _data) {
+    player = _player;
     wave = _wave;
     data = _data;
 
@@ -1913,6 +1919,7 @@ namespace zzub {
   }
 
   void op_wavetable_wave_replace::finish(zzub::song& song, bool send_events) {
+    player->erase_wave_peaks(wave);
     if (send_events) song.plugin_invoke_event(0, event_data, true);
   }
 
@@ -1923,7 +1930,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_wavelevel_replace::op_wavetable_wavelevel_replace(int _wave, int _level, const wave_level_ex& _data) {
+  op_wavetable_wavelevel_replace::op_wavetable_wavelevel_replace(zzub::player* _player, int _wave, int _level, const wave_level_ex& _data) {
+    player = _player;
     wave = _wave;
     level = _level;
     data = _data;
@@ -1963,6 +1971,7 @@ namespace zzub {
   }
 
   void op_wavetable_wavelevel_replace::finish(zzub::song& song, bool send_events) {
+    player->erase_wave_peaks(wave, level);
     if (send_events) song.plugin_invoke_event(0, event_data, true);
   }
 
@@ -1973,7 +1982,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_insert_sampledata::op_wavetable_insert_sampledata(int _wave, int _level, int _pos) {
+  op_wavetable_insert_sampledata::op_wavetable_insert_sampledata(zzub::player* _player, int _wave, int _level, int _pos) {
+    player = _player;
     wave = _wave;
     level = _level;
     pos = _pos;
@@ -2062,6 +2072,7 @@ namespace zzub {
   }
 
   void op_wavetable_insert_sampledata::finish(zzub::song& song, bool send_events) {
+    player->invalidate_wave_peaks(wave, level, pos, pos + samples_length, true);
     //event_data.allocate_wavelevel.level = level;
     if (send_events) song.plugin_invoke_event(0, event_data, true);
   }
@@ -2074,7 +2085,8 @@ namespace zzub {
   //
   // ---------------------------------------------------------------------------
 
-  op_wavetable_remove_sampledata::op_wavetable_remove_sampledata(int _wave, int _level, int _pos, int _samples) {
+  op_wavetable_remove_sampledata::op_wavetable_remove_sampledata(zzub::player* _player, int _wave, int _level, int _pos, int _samples) {
+    player = _player;
     wave = _wave;
     level = _level;
     pos = _pos;
@@ -2140,8 +2152,60 @@ namespace zzub {
   }
 
   void op_wavetable_remove_sampledata::finish(zzub::song& song, bool send_events) {
+    player->invalidate_wave_peaks(wave, level, pos, pos + samples, true);
     //event_data.allocate_wavelevel.level = level;
     if (send_events) song.plugin_invoke_event(0, event_data, true);
   }
 
+
+  // ---------------------------------------------------------------------------
+  //
+  // op_wavetable_replace_sampledata
+  //
+  // ---------------------------------------------------------------------------
+
+  op_wavetable_replace_sampledata::op_wavetable_replace_sampledata(zzub::player* _player, int _wave, int _level, int _pos, void* _samples, int _samples_length) {
+    player = _player;
+    wave = _wave;
+    level = _level;
+    pos = _pos;
+    samples = _samples;
+    samples_length = _samples_length;
+
+    copy_flags.copy_wavetable = true;
+    operation_copy_wavelevel_flags wavelevel_flags;
+    wavelevel_flags.wave = wave;
+    wavelevel_flags.level = level;
+    wavelevel_flags.copy_samples = true;
+    copy_flags.wavelevel_flags.push_back(wavelevel_flags);
+  }
+
+  op_wavetable_replace_sampledata::~op_wavetable_replace_sampledata() {
+    delete[] (char*)samples;
+  }
+
+  bool op_wavetable_replace_sampledata::prepare(zzub::song& song) {
+    // overwrite samples in place, samples is in the format and channel layout of the level
+    wave_info_ex& w = *song.wavetable.waves[wave];
+    int channels = w.get_stereo() ? 2 : 1;
+    int bytes_per_sample = w.get_bytes_per_sample(level) * channels;
+    int length = std::min(samples_length, (int)w.get_sample_count(level) - pos);
+    if (length > 0)
+      memcpy(w.get_sample_ptr(level, pos), samples, length * bytes_per_sample);
+
+    event_data.type = event_type_wave_changed;
+    event_data.change_wave.wave = w.proxy;
+
+    return true;
+  }
+
+  bool op_wavetable_replace_sampledata::operate(zzub::song& song) {
+    return true;
+  }
+
+  void op_wavetable_replace_sampledata::finish(zzub::song& song, bool send_events) {
+    player->invalidate_wave_peaks(wave, level, pos, pos + samples_length);
+    if (send_events) song.plugin_invoke_event(0, event_data, true);
+  }
+
 } // namespace zzub
@@ -365,10 +365,11 @@ namespace zzub {
   };
 
   struct op_wavetable_wave_replace : operation {
+    zzub::player* player;
     int wave;
     wave_info_ex data;
 	
-    op_wavetable_wave_replace(int _wave, const wave_info_ex& _data);
+    op_wavetable_wave_replace(zzub::player* _player, int _wave, const wave_info_ex& _data);
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
     virtual void finish(zzub::song& song, bool send_events);
@@ -385,47 +386,52 @@ namespace zzub {
   };
 
   struct op_wavetable_remove_wavelevel : operation {
+    zzub::player* player;
     int wave;
     int level;
 
-    op_wavetable_remove_wavelevel(int _wave, int _level);
+    op_wavetable_remove_wavelevel(zzub::player* _player, int _wave, int _level);
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
     virtual void finish(zzub::song& song, bool send_events);
   };
 
   struct op_wavetable_move_wavelevel : operation {
+    zzub::player* player;
     int wave;
     int level, newlevel;
 
-    op_wavetable_move_wavelevel(int _wave, int _level, int _newlevel);
+    op_wavetable_move_wavelevel(zzub::player* _player, int _wave, int _level, int _newlevel);
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
     virtual void finish(zzub::song& song, bool send_events);
   };
 
   struct op_wavetable_allocate_wavelevel : operation {
+    zzub::player* player;
     int wave, level;
     int sample_count, channels;
     wave_buffer_type format;
 
-    op_wavetable_allocate_wavelevel(int _wave, int _level, int _sample_count, int _channels, wave_buffer_type _format);
+    op_wavetable_allocate_wavelevel(zzub::player* _player, int _wave, int _level, int _sample_count, int _channels, wave_buffer_type _format);
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
     virtual void finish(zzub::song& song, bool send_events);
   };
 
   struct op_wavetable_wavelevel_replace : operation {
+    zzub::player* player;
     int wave, level;
     wave_level_ex data;
 	
-    op_wavetable_wavelevel_replace(int _wave, int _level, const wave_level_ex& _data);
+    op_wavetable_wavelevel_replace(zzub::player* _player, int _wave, int _level, const wave_level_ex& _data);
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
     virtual void finish(zzub::song& song, bool send_events);
   };
 
   struct op_wavetable_insert_sampledata : operation {
+    zzub::player* player;
     int wave;
     int level;
     int pos;
@@ -435,7 +441,7 @@ namespace zzub {
     float samples_scale;
     int samples_channels;
 
-    op_wavetable_insert_sampledata(int _wave, int _level, int _pos);
+    op_wavetable_insert_sampledata(zzub::player* _player, int _wave, int _level, int _pos);
     ~op_wavetable_insert_sampledata();
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
@@ -443,12 +449,28 @@ namespace zzub {
   };
 
   struct op_wavetable_remove_sampledata : operation {
+    zzub::player* player;
     int wave;
     int level;
     int pos;
     int samples;
 
-    op_wavetable_remove_sampledata(int _wave, int _level, int _pos, int _samples);
+    op_wavetable_remove_sampledata(zzub::player* _player, int _wave, int _level, int _pos, int _samples);
+    virtual bool prepare(zzub::song& song);
+    virtual bool operate(zzub::song& song);
+    virtual void finish(zzub::song& song, bool send_events);
+  };
+
+  struct op_wavetable_replace_sampledata : operation {
+    zzub::player* player;
+    int wave;
+    int level;
+    int pos;
+    void* samples;
+    int samples_length;
+
+    op_wavetable_replace_sampledata(zzub::player* _player, int _wave, int _level, int _pos, void* _samples, int _samples_length);
+    ~op_wavetable_replace_sampledata();
     virtual bool prepare(zzub::song& song);
     virtual bool operate(zzub::song& song);
     virtual void finish(zzub::song& song, bool send_events);
@@ -36,6 +36,7 @@
 #include <sys/stat.h>
 
 #include "sseoptimization.h"
+#include "samplekernels.h"
 
 using namespace std;
 
@@ -100,8 +101,13 @@ namespace zzub {
     mh = NULL;
     int err  = MPG123_OK;
 
+    // files may be decoded on several threads, mpg123_init() is not thread safe
+    static synchronization::critical_section init_lock;
+    init_lock.lock();
     err = mpg123_init();
-    if(err != MPG123_OK || (mh = mpg123_new(NULL, &err)) == NULL) {
+    if (err == MPG123_OK) mh = mpg123_new(NULL, &err);
+    init_lock.unlock();
+    if(err != MPG123_OK || mh == NULL) {
       fprintf(stderr, "Basic setup goes wrong: %s", mpg123_plain_strerror(err));
       close();
       mh = 0;
@@ -391,6 +397,23 @@ namespace zzub {
     imp = 0;
   }
 
+  char* waveimporter::decode(std::string filename, zzub::instream* inf, importwave_info& info) {
+    if (!open(filename, inf)) return 0;
+    if (!get_wave_level_info(0, 0, info)) {
+      close();
+      return 0;
+    }
+
+    assert(info.channels != 0);
+
+    int bytes_per_sample = sizeFromWaveFormat(info.format) * info.channels;
+    char* buffer = new char[bytes_per_sample * info.sample_count];
+
+    read_wave_level_samples(0, 0, buffer);
+    close();
+    return buffer;
+  }
+
 
   /***
 
@@ -400,6 +423,7 @@ namespace zzub {
 
   player::player() {
     swap_operations_commit = false;
+    work_stop_at_song_end = false;
 
     history_position = history.begin();
 
@@ -545,6 +569,67 @@ namespace zzub {
     // NOTE: also see note for player::set_state(). the same stuff goes on here too.
   }
 
+  // offline rendering for devices without an audio thread, such as
+  // audiodriver_silent. the caller is the user thread, so operations are
+  // swapped in directly and events are handled here.
+  int player::render_stereo(void* buffer, int frames, int format) {
+    if (work_out_buffer[work_master_channel*2+0] == 0) return 0;
+
+    int sample_size;
+    switch (format) {
+    case wave_buffer_type_si16: sample_size = 2; break;
+    case wave_buffer_type_si24: sample_size = 3; break;
+    case wave_buffer_type_si32:
+    case wave_buffer_type_f32: sample_size = 4; break;
+    default: return 0;
+    }
+
+    unsigned char* output = (unsigned char*)buffer;
+    std::vector<float> interleaved(zzub::buffer_size * 2);
+    int done = 0;
+    work_stop_at_song_end = true;
+    while (done < frames) {
+      work_stereo(std::min(frames - done, (int)zzub::buffer_size));
+      int chunk_size = work_buffer_position;
+
+      float* left = work_out_buffer[work_master_channel*2+0];
+      float* right = work_out_buffer[work_master_channel*2+1];
+      for (int i = 0; i < chunk_size; i++) {
+	interleaved[i*2+0] = left[i];
+	interleaved[i*2+1] = right[i];
+      }
+      unsigned char* dest = output + done * 2 * sample_size;
+      switch (format) {
+      case wave_buffer_type_si16:
+	convert_f32_to_si16(&interleaved.front(), (short*)dest, chunk_size * 2);
+	break;
+      case wave_buffer_type_si24:
+	convert_f32_to_si24(&interleaved.front(), dest, chunk_size * 2);
+	break;
+      case wave_buffer_type_si32:
+	convert_f32_to_si32_saturated(&interleaved.front(), (int*)dest, chunk_size * 2);
+	break;
+      case wave_buffer_type_f32:
+	memcpy(dest, &interleaved.front(), chunk_size * 2 * sizeof(float));
+	break;
+      }
+      done += chunk_size;
+
+      process_user_event_queue();
+      if (chunk_size == 0) break;
+    }
+    work_stop_at_song_end = false;
+    return done;
+  }
+
+  void player::set_thread_count(int count) {
+    // the audio thread holds swap_lock while mixing, so the workers are
+    // never changed during generate_audio()
+    swap_lock.lock();
+    front.scheduler.set_thread_count(count);
+    swap_lock.unlock();
+  }
+
   /*	\brief Clears all data associated with current song from the player.
    */
   void player::clear() {
@@ -580,6 +665,7 @@ namespace zzub {
     }
     flush_operations(0, 0, 0);
     clear_history();
+    wave_peak_cache.clear();
     front.song_comment = "";
     front.song_begin = 0;
     front.song_end = 16;
@@ -653,6 +739,10 @@ namespace zzub {
     work_buffer_position = 0;
     int remaining_samples = sample_count;
     while (remaining_samples > 0) {
+      // stop at the tick where the mixer would stop a song that is not looping
+      if (work_stop_at_song_end && front.state == player_state_playing && front.master_info.tick_position == 0 &&
+	  !front.song_loop_enabled && front.song_position >= front.song_loop_end)
+	break;
       // handle serialized editing
       poll_operations();
       swap_lock.lock();
@@ -755,7 +845,8 @@ namespace zzub {
   std::string player::plugin_get_new_name(std::string uri) {
     operation_copy_flags flags;
     flags.copy_graph = true;
-    merge_backbuffer_flags(flags);
+    flags.copy_plugins = true;
+    zzub::song& s = read_song(flags);
     using namespace std;
     string baseName;
     std::vector<const zzub::info*>::iterator info = find_if(plugin_infos.begin(), plugin_infos.end(), find_info_by_uri(uri));
@@ -769,7 +860,7 @@ namespace zzub {
       }  else {
 	strm << baseName << (i+1);
       }
-      zzub::plugin_descriptor m = back.get_plugin_descriptor(strm.str());
+      zzub::plugin_descriptor m = s.get_plugin_descriptor(strm.str());
       if (m == graph_traits<plugin_map>::null_vertex()) return strm.str();
     }
     assert(false);
@@ -827,6 +918,34 @@ namespace zzub {
     }
   }
 
+  int player::get_user_event_queue_size() {
+    unsigned int size = front.user_event_queue.size();
+    return (front.user_event_queue_write + size - front.user_event_queue_read) % size;
+  }
+
+  wave_peaks& player::get_wave_peaks(int wave, int level) {
+    // the wavetable operations invalidate or erase entries as they change
+    // the sample data, including when undone or redone
+    return wave_peak_cache[std::make_pair(wave, level)];
+  }
+
+  void player::invalidate_wave_peaks(int wave, int level, int start, int end, bool resized) {
+    wave_peak_map::iterator i = wave_peak_cache.find(std::make_pair(wave, level));
+    if (i != wave_peak_cache.end()) i->second.invalidate(start, end, resized);
+  }
+
+  void player::erase_wave_peaks(int wave, int level) {
+    wave_peak_map::iterator first, last;
+    if (level == -1) {
+      first = wave_peak_cache.lower_bound(std::make_pair(wave, 0));
+      last = wave_peak_cache.lower_bound(std::make_pair(wave + 1, 0));
+    } else {
+      first = wave_peak_cache.lower_bound(std::make_pair(wave, level));
+      last = wave_peak_cache.upper_bound(std::make_pair(wave, level));
+    }
+    wave_peak_cache.erase(first, last);
+  }
+
   void player::set_event_queue_state(int enable) {
     front.enable_event_queue = enable;
   }
@@ -1082,14 +1201,36 @@ namespace zzub {
     end_plugin_operation(id);
   }
 
+  void player::plugin_set_pattern_columns(int id, int index, int group, int track, int tracks, int column, int columns, int row, int rows, const int* values) {
+    // the whole block goes in as a single pattern replacement, so it costs one
+    // operation and one undo step regardless of how many cells are written.
+    zzub::pattern newpattern;
+    op_pattern_replace* redo = new op_pattern_replace(id, index, newpattern);
+    merge_backbuffer_flags(redo->copy_flags);
+    begin_plugin_operation(id);
+    op_pattern_replace* undo = new op_pattern_replace(id, index, *back.plugins[id]->patterns[index]);
+    prepare_operation_undo(undo);
+    redo->pattern = *back.plugins[id]->patterns[index];
+    const int* src = values;
+    for (int t = track; t < track + tracks; t++) {
+      for (int c = column; c < column + columns; c++) {
+	std::copy(src, src + rows, redo->pattern.groups[group][t][c].begin() + row);
+	src += rows;
+      }
+    }
+    prepare_operation_redo(redo);
+    end_plugin_operation(id);
+  }
+
   void player::plugin_insert_pattern_rows(int plugin_id, int pattern, int* column_indices, int num_indices, int start, int rows) {
     operation_copy_flags flags;
     flags.copy_plugins = true;
-    merge_backbuffer_flags(flags);
     operation_copy_pattern_flags patternflags;
     patternflags.plugin_id = plugin_id;
     patternflags.index = pattern;
+    patternflags.copy_pattern = true;
     flags.pattern_flags.push_back(patternflags);
+    merge_backbuffer_flags(flags);
     metaplugin& m = *back.plugins[plugin_id];
     zzub::pattern& p = *m.patterns[pattern];
     begin_plugin_operation(plugin_id);
@@ -1119,6 +1260,7 @@ namespace zzub {
     operation_copy_pattern_flags patternflags;
     patternflags.plugin_id = plugin_id;
     patternflags.index = pattern;
+    patternflags.copy_pattern = true;
     flags.pattern_flags.push_back(patternflags);
     merge_backbuffer_flags(flags);
     metaplugin& m = *back.plugins[plugin_id];
@@ -1418,6 +1560,17 @@ namespace zzub {
   ***/
 
   int player::wave_load_sample(int wave, int level, int offset, bool clear, std::string name, zzub::instream* datastream) {
+    waveimporter importer;
+    importwave_info wavedata;
+
+    char* buffer = importer.decode(name, datastream, wavedata);
+    if (!buffer) return 0;
+
+    return wave_load_samples(wave, level, offset, clear, wavedata, buffer);
+  }
+
+  // takes ownership of buffer
+  int player::wave_load_samples(int wave, int level, int offset, bool clear, const importwave_info& wavedata, char* buffer) {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
@@ -1430,23 +1583,6 @@ namespace zzub {
     //     - import the stereo sample as mono sample data, so the user has to convert the 
     //       second sample manually if it mismatches the earlier sample?
 
-    waveimporter importer;
-    importwave_info wavedata;
-
-    if (!importer.open(name.c_str(), datastream)) return 0;
-    if (!importer.get_wave_level_info(0, 0, wavedata)) {
-      importer.close();
-      return 0;
-    }
-
-    assert(wavedata.channels != 0);
-
-    int bytes_per_sample = sizeFromWaveFormat(wavedata.format) * wavedata.channels;
-    char* buffer = new char[bytes_per_sample * wavedata.sample_count];
-
-    importer.read_wave_level_samples(0, 0, buffer);
-    importer.close();
-
     bool reset_wave = false;
     // determine cases where we want to set/change the wave stereo flag before loading a sample:
     if ((back.wavetable.waves[wave]->levels.size() == 1 && level == 0 && clear) || back.wavetable.waves[wave]->levels.size() == 0) {
@@ -1476,7 +1612,7 @@ namespace zzub {
     assert(offset <= back.wavetable.waves[wave]->get_sample_count(level));
 
     // now load sample data into an insert_samples-operation
-    op_wavetable_insert_sampledata* redo = new op_wavetable_insert_sampledata(wave, level, offset);
+    op_wavetable_insert_sampledata* redo = new op_wavetable_insert_sampledata(this, wave, level, offset);
 
     redo->samples = buffer;
     redo->samples_format = wavedata.format;
@@ -1485,7 +1621,7 @@ namespace zzub {
 
     prepare_operation_redo(redo);
 
-    op_wavetable_remove_sampledata* undo = new op_wavetable_remove_sampledata(wave, level, offset, wavedata.sample_count);
+    op_wavetable_remove_sampledata* undo = new op_wavetable_remove_sampledata(this, wave, level, offset, wavedata.sample_count);
     prepare_operation_undo(undo);
     wave_set_samples_per_second(wave, level, wavedata.samples_per_second);
     return wavedata.sample_count;
@@ -1498,9 +1634,9 @@ namespace zzub {
 
     wave_info_ex& w = *back.wavetable.waves[wave];
 
-    op_wavetable_allocate_wavelevel* redo = new op_wavetable_allocate_wavelevel(wave, level, sample_count, channels, format);
+    op_wavetable_allocate_wavelevel* redo = new op_wavetable_allocate_wavelevel(this, wave, level, sample_count, channels, format);
 
-    op_wavetable_allocate_wavelevel* undo = new op_wavetable_allocate_wavelevel(wave, level, w.get_sample_count(level), w.get_stereo() ? 2 : 1, w.get_wave_format(level));
+    op_wavetable_allocate_wavelevel* undo = new op_wavetable_allocate_wavelevel(this, wave, level, w.get_sample_count(level), w.get_stereo() ? 2 : 1, w.get_wave_format(level));
 
     // TODO: preserve wave data in undo
     prepare_operation_redo(redo);
@@ -1511,16 +1647,16 @@ namespace zzub {
     op_wavetable_add_wavelevel* redo = new op_wavetable_add_wavelevel(this, wave);
     prepare_operation_redo(redo);
 
-    op_wavetable_remove_wavelevel* undo = new op_wavetable_remove_wavelevel(wave, -1);
+    op_wavetable_remove_wavelevel* undo = new op_wavetable_remove_wavelevel(this, wave, -1);
     prepare_operation_undo(undo);
   }
 
   void player::wave_remove_level(int wave, int level) {
     // TODO: since move_wave_level isnt implemented yet, undo only works with the last level - ie we cant delete an arbitrary level yet
-    op_wavetable_remove_wavelevel* redo = new op_wavetable_remove_wavelevel(wave, level);
+    op_wavetable_remove_wavelevel* redo = new op_wavetable_remove_wavelevel(this, wave, level);
     prepare_operation_redo(redo);
 
-    op_wavetable_move_wavelevel* undo_move = new op_wavetable_move_wavelevel(wave, back.wavetable.waves[wave]->levels.size(), level);
+    op_wavetable_move_wavelevel* undo_move = new op_wavetable_move_wavelevel(this, wave, back.wavetable.waves[wave]->levels.size(), level);
     prepare_operation_undo(undo_move);
 
     op_wavetable_add_wavelevel* undo = new op_wavetable_add_wavelevel(this, wave);
@@ -1528,10 +1664,10 @@ namespace zzub {
   }
 
   void player::wave_move_level(int wave, int level, int newlevel) {
-    op_wavetable_move_wavelevel* redo = new op_wavetable_move_wavelevel(wave, level, newlevel);
+    op_wavetable_move_wavelevel* redo = new op_wavetable_move_wavelevel(this, wave, level, newlevel);
     prepare_operation_redo(redo);
 
-    op_wavetable_move_wavelevel* undo = new op_wavetable_move_wavelevel(wave, newlevel, level);
+    op_wavetable_move_wavelevel* undo = new op_wavetable_move_wavelevel(this, wave, newlevel, level);
     prepare_operation_undo(undo);
   }
 
@@ -1541,13 +1677,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(wave, *back.wavetable.waves[wave]);
+    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(this, wave, *back.wavetable.waves[wave]);
     prepare_operation_undo(undo);
 
     wave_info_ex data;
     data = *back.wavetable.waves[wave];
     data.name = name;
-    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(wave, data);
+    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(this, wave, data);
     prepare_operation_redo(redo);
 
   }
@@ -1558,13 +1694,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(wave, *back.wavetable.waves[wave]);
+    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(this, wave, *back.wavetable.waves[wave]);
     prepare_operation_undo(undo);
 
     wave_info_ex data;
     data = *back.wavetable.waves[wave];
     data.volume = volume;
-    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(wave, data);
+    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(this, wave, data);
     prepare_operation_redo(redo);
 
   }
@@ -1574,13 +1710,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(wave, *back.wavetable.waves[wave]);
+    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(this, wave, *back.wavetable.waves[wave]);
     prepare_operation_undo(undo);
 
     wave_info_ex data;
     data = *back.wavetable.waves[wave];
     data.flags = waveflags;
-    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(wave, data);
+    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(this, wave, data);
     prepare_operation_redo(redo);
   }
 
@@ -1589,13 +1725,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(wave, *back.wavetable.waves[wave]);
+    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(this, wave, *back.wavetable.waves[wave]);
     prepare_operation_undo(undo);
 
     wave_info_ex data;
     data = *back.wavetable.waves[wave];
     data.fileName = name;
-    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(wave, data);
+    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(this, wave, data);
     prepare_operation_redo(redo);
   }
 
@@ -1604,13 +1740,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(wave, level, back.wavetable.waves[wave]->levels[level]);
+    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(this, wave, level, back.wavetable.waves[wave]->levels[level]);
     prepare_operation_undo(undo);
 
     wave_level_ex data;
     data = back.wavetable.waves[wave]->levels[level];
     data.loop_start = pos;
-    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(wave, level, data);
+    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(this, wave, level, data);
     prepare_operation_redo(redo);
   }
 
@@ -1620,13 +1756,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(wave, level, back.wavetable.waves[wave]->levels[level]);
+    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(this, wave, level, back.wavetable.waves[wave]->levels[level]);
     prepare_operation_undo(undo);
 
     wave_level_ex data;
     data = back.wavetable.waves[wave]->levels[level];
     data.loop_end = pos;
-    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(wave, level, data);
+    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(this, wave, level, data);
     prepare_operation_redo(redo);
   }
 
@@ -1636,13 +1772,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(wave, level, back.wavetable.waves[wave]->levels[level]);
+    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(this, wave, level, back.wavetable.waves[wave]->levels[level]);
     prepare_operation_undo(undo);
 
     wave_level_ex data;
     data = back.wavetable.waves[wave]->levels[level];
     data.samples_per_second = sps;
-    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(wave, level, data);
+    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(this, wave, level, data);
     prepare_operation_redo(redo);
   }
 
@@ -1651,13 +1787,13 @@ namespace zzub {
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(wave, level, back.wavetable.waves[wave]->levels[level]);
+    op_wavetable_wavelevel_replace* undo = new op_wavetable_wavelevel_replace(this, wave, level, back.wavetable.waves[wave]->levels[level]);
     prepare_operation_undo(undo);
 
     wave_level_ex data;
     data = back.wavetable.waves[wave]->levels[level];
     data.root_note = note;
-    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(wave, level, data);
+    op_wavetable_wavelevel_replace* redo = new op_wavetable_wavelevel_replace(this, wave, level, data);
     prepare_operation_redo(redo);
   }
 
@@ -1668,9 +1804,9 @@ namespace zzub {
 
     wave_info_ex& w = *back.wavetable.waves[wave];
     int numsamples = w.get_sample_count(level);
-    op_wavetable_remove_sampledata* redo = new op_wavetable_remove_sampledata(wave, level, 0, numsamples);
+    op_wavetable_remove_sampledata* redo = new op_wavetable_remove_sampledata(this, wave, level, 0, numsamples);
 
-    op_wavetable_insert_sampledata* undo = new op_wavetable_insert_sampledata(wave, level, 0);
+    op_wavetable_insert_sampledata* undo = new op_wavetable_insert_sampledata(this, wave, level, 0);
     int channels = w.get_stereo() ? 2 : 1;
     wave_buffer_type format = w.get_wave_format(level);
     int bytes_per_sample = sizeFromWaveFormat(format) * channels;
@@ -1699,9 +1835,9 @@ namespace zzub {
       wave_remove_level(wave, num_levels - i - 1);
 
       // reset name, flags, volume, envelopes, etc
-      op_wavetable_wave_replace* undo_reset = new op_wavetable_wave_replace(wave, *back.wavetable.waves[wave]);
+      op_wavetable_wave_replace* undo_reset = new op_wavetable_wave_replace(this, wave, *back.wavetable.waves[wave]);
       wave_info_ex blank_wave;
-      op_wavetable_wave_replace* redo_reset = new op_wavetable_wave_replace(wave, blank_wave);
+      op_wavetable_wave_replace* redo_reset = new op_wavetable_wave_replace(this, wave, blank_wave);
       prepare_operation_redo(redo_reset);
       prepare_operation_undo(undo_reset);
     }
@@ -1716,8 +1852,8 @@ namespace zzub {
     operation_copy_flags flags;
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
-    op_wavetable_remove_sampledata* redo = new op_wavetable_remove_sampledata(wave, level, target_offset, sample_count);
-    op_wavetable_insert_sampledata* undo = new op_wavetable_insert_sampledata(wave, level, target_offset);
+    op_wavetable_remove_sampledata* redo = new op_wavetable_remove_sampledata(this, wave, level, target_offset, sample_count);
+    op_wavetable_insert_sampledata* undo = new op_wavetable_insert_sampledata(this, wave, level, target_offset);
     wave_info_ex& w = *back.wavetable.waves[wave];
     int channels = w.get_stereo() ? 2 : 1;
     wave_buffer_type format = w.get_wave_format(level);
@@ -1733,19 +1869,38 @@ namespace zzub {
     prepare_operation_undo(undo);
   }
 
+  void player::wave_replace_samples(int wave, int level, int target_offset, int sample_count, void* bytes) {
+    operation_copy_flags flags;
+    flags.copy_wavetable = true;
+    merge_backbuffer_flags(flags);
+    wave_info_ex& w = *back.wavetable.waves[wave];
+    int channels = w.get_stereo() ? 2 : 1;
+    int bytes_per_sample = w.get_bytes_per_sample(level) * channels;
+    sample_count = std::min(sample_count, (int)w.get_sample_count(level) - target_offset);
+    if (sample_count <= 0) return;
+    char* newbuffer = new char[bytes_per_sample * sample_count];
+    memcpy(newbuffer, bytes, bytes_per_sample * sample_count);
+    char* oldbuffer = new char[bytes_per_sample * sample_count];
+    memcpy(oldbuffer, w.get_sample_ptr(level, target_offset), bytes_per_sample * sample_count);
+    op_wavetable_replace_sampledata* redo = new op_wavetable_replace_sampledata(this, wave, level, target_offset, newbuffer, sample_count);
+    op_wavetable_replace_sampledata* undo = new op_wavetable_replace_sampledata(this, wave, level, target_offset, oldbuffer, sample_count);
+    prepare_operation_redo(redo);
+    prepare_operation_undo(undo);
+  }
+
   void player::wave_set_envelopes(int wave, const vector<zzub::envelope_entry>& envelopes) {
 
     operation_copy_flags flags;
     flags.copy_wavetable = true;
     merge_backbuffer_flags(flags);
 
-    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(wave, *back.wavetable.waves[wave]);
+    op_wavetable_wave_replace* undo = new op_wavetable_wave_replace(this, wave, *back.wavetable.waves[wave]);
     prepare_operation_undo(undo);
 
     wave_info_ex data;
     data = *back.wavetable.waves[wave];
     data.envelopes = envelopes;
-    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(wave, data);
+    op_wavetable_wave_replace* redo = new op_wavetable_wave_replace(this, wave, data);
     prepare_operation_redo(redo);
   }
 } // namespace zzub
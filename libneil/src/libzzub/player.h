@@ -24,8 +24,11 @@ using std::vector;
 using std::stack;
 
 namespace zzub {
+  struct importwave_info;
+
   struct player : undo_manager, audioworker, midiworker {
     int work_buffer_position; // sample position in current buffer
+    bool work_stop_at_song_end; // return from work_stereo() when the song ends, for render_stereo()
     input_plugincollection inputPluginCollection;
     output_plugincollection outputPluginCollection;
     recorder_plugincollection recorderPluginCollection;
@@ -60,6 +63,14 @@ namespace zzub {
     // user methods (should be, but arent supported by begin_/commit_operation)
     void clear();
     void process_user_event_queue();
+    int get_user_event_queue_size();
+    typedef std::map<std::pair<int, int>, wave_peaks> wave_peak_map;
+    wave_peak_map wave_peak_cache;
+    wave_peaks& get_wave_peaks(int wave, int level);
+    // marks [start, end) of a cached level as changed, see wave_peaks::invalidate
+    void invalidate_wave_peaks(int wave, int level, int start, int end, bool resized = false);
+    // drops the cached levels of a wave, or only one level
+    void erase_wave_peaks(int wave, int level = -1);
     void set_event_queue_state(int enable);
     void set_state(player_state state);
     void set_state_direct(player_state state);
@@ -67,6 +78,8 @@ namespace zzub {
     void play_plugin_note(int plugin_id, int note, int prevNote, int velocity);
     void reset_keyjazz();
     void set_play_position(int pos);
+    void set_thread_count(int count);
+    int render_stereo(void* buffer, int frames, int format);
 
     // user methods for creating compound, undoable operations
     // any of these must be enclosed by calls to begin_operation() and commit_operation().
@@ -90,6 +103,7 @@ namespace zzub {
     void plugin_set_pattern_name(int plugin_id, int index, std::string name);
     void plugin_set_pattern_length(int plugin_id, int index, int rows);
     void plugin_set_pattern_value(int plugin_id, int index, int group, int track, int column, int row, int value);
+    void plugin_set_pattern_columns(int plugin_id, int index, int group, int track, int tracks, int column, int columns, int row, int rows, const int* values);
     void plugin_insert_pattern_rows(int plugin_id, int pattern, int* column_indices, int num_indices, int start, int rows);
     void plugin_remove_pattern_rows(int plugin_id, int pattern, int* column_indices, int num_indices, int start, int rows);
     bool plugin_add_input(int to_id, int from_id, connection_type type);
@@ -118,12 +132,14 @@ namespace zzub {
     void wave_set_samples(int wave, int level, int sample_count, int channels, int format, void* bytes);
     void wave_insert_samples(int wave, int level, int target_offset, int sample_count, int channels, wave_buffer_type format, void* bytes);
     void wave_remove_samples(int wave, int level, int target_offset, int sample_count);
+    void wave_replace_samples(int wave, int level, int target_offset, int sample_count, void* bytes);
     void wave_set_root_note(int wave, int level, int note);
     void wave_set_samples_per_second(int wave, int level, int sps);
     void wave_set_loop_begin(int wave, int level, int loop_begin);
     void wave_set_loop_end(int wave, int level, int loop_end);
 
     int wave_load_sample(int wave, int level, int offset, bool clear, std::string name, zzub::instream* datastream);
+    int wave_load_samples(int wave, int level, int offset, bool clear, const importwave_info& wavedata, char* buffer);
     void wave_set_envelopes(int wave, const vector<zzub::envelope_entry>& _envelopes);
   };
 
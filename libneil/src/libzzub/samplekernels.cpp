@@ -0,0 +1,327 @@
+#include <algorithm>
+#include "zzub/plugin.h"
+#include "samplekernels.h"
+
+#if defined(__SSE2__)
+#include <emmintrin.h>
+#endif
+
+namespace zzub {
+
+  namespace {
+
+    struct si16_sample {
+      enum { size = 2 };
+      static inline float get(const unsigned char* p) {
+	return (float)*(const short*)p * (1.0f / 32768.0f);
+      }
+    };
+
+    struct si24_sample {
+      enum { size = 3 };
+      static inline float get(const unsigned char* p) {
+	int i = p[0] | (p[1] << 8) | ((signed char)p[2] << 16);
+	return (float)i * (1.0f / 8388608.0f);
+      }
+    };
+
+    struct si32_sample {
+      enum { size = 4 };
+      static inline float get(const unsigned char* p) {
+	return (float)*(const int*)p * (1.0f / 2147483648.0f);
+      }
+    };
+
+    struct f32_sample {
+      enum { size = 4 };
+      static inline float get(const unsigned char* p) {
+	return *(const float*)p;
+      }
+    };
+
+#if defined(__SSE2__)
+
+    // loaders return four consecutive frames of one channel as floats
+
+    inline __m128 load_si16(const unsigned char* p, int channels, int channel) {
+      if (channels == 1) {
+	__m128i v = _mm_loadl_epi64((const __m128i*)p);
+	v = _mm_srai_epi32(_mm_unpacklo_epi16(v, v), 16);
+	return _mm_mul_ps(_mm_cvtepi32_ps(v), _mm_set1_ps(1.0f / 32768.0f));
+      }
+      __m128i v = _mm_loadu_si128((const __m128i*)p);
+      if (channel == 0)
+	v = _mm_srai_epi32(_mm_slli_epi32(v, 16), 16); else
+	v = _mm_srai_epi32(v, 16);
+      return _mm_mul_ps(_mm_cvtepi32_ps(v), _mm_set1_ps(1.0f / 32768.0f));
+    }
+
+    inline __m128 load_f32(const unsigned char* p, int channels, int channel) {
+      if (channels == 1)
+	return _mm_loadu_ps((const float*)p);
+      __m128 a = _mm_loadu_ps((const float*)p);
+      __m128 b = _mm_loadu_ps((const float*)p + 4);
+      if (channel == 0)
+	return _mm_shuffle_ps(a, b, _MM_SHUFFLE(2, 0, 2, 0)); else
+	return _mm_shuffle_ps(a, b, _MM_SHUFFLE(3, 1, 3, 1));
+    }
+
+    inline __m128 load_si32(const unsigned char* p, int channels, int channel) {
+      __m128i v = _mm_castps_si128(load_f32(p, channels, channel));
+      return _mm_mul_ps(_mm_cvtepi32_ps(v), _mm_set1_ps(1.0f / 2147483648.0f));
+    }
+
+    typedef __m128 (*load_func)(const unsigned char*, int, int);
+
+    // returns the number of frames done, the caller finishes the rest
+    inline int scan_sse(load_func load, const unsigned char* p, int stride, int channels, int channel, int count, float& minimum, float& maximum, float& power) {
+      if (channels > 2 || count < 4) return 0;
+      __m128 lo = _mm_set1_ps(minimum);
+      __m128 hi = _mm_set1_ps(maximum);
+      __m128 sum = _mm_setzero_ps();
+      int i = 0;
+      for (; i + 4 <= count; i += 4, p += stride * 4) {
+	__m128 s = load(p, channels, channel);
+	lo = _mm_min_ps(lo, s);
+	hi = _mm_max_ps(hi, s);
+	sum = _mm_add_ps(sum, _mm_mul_ps(s, s));
+      }
+      float l[4], h[4], q[4];
+      _mm_storeu_ps(l, lo);
+      _mm_storeu_ps(h, hi);
+      _mm_storeu_ps(q, sum);
+      minimum = std::min(std::min(l[0], l[1]), std::min(l[2], l[3]));
+      maximum = std::max(std::max(h[0], h[1]), std::max(h[2], h[3]));
+      power += (q[0] + q[1]) + (q[2] + q[3]);
+      return i;
+    }
+
+    inline int decode_sse(load_func load, const unsigned char* p, int stride, int channels, int channel, int count, float* output) {
+      if (channels > 2) return 0;
+      int i = 0;
+      for (; i + 4 <= count; i += 4, p += stride * 4)
+	_mm_storeu_ps(output + i, load(p, channels, channel));
+      return i;
+    }
+
+#endif
+
+    template <typename T>
+    void scan_loop(const unsigned char* p, int stride, int count, float& minimum, float& maximum, float& power) {
+      float lo = minimum, hi = maximum, sum = 0.0f;
+      for (int i = 0; i < count; i++, p += stride) {
+	float s = T::get(p);
+	lo = std::min(lo, s);
+	hi = std::max(hi, s);
+	sum += s * s;
+      }
+      minimum = lo;
+      maximum = hi;
+      power += sum;
+    }
+
+    template <typename T>
+    void decode_loop(const unsigned char* p, int stride, int count, float* output) {
+      for (int i = 0; i < count; i++, p += stride)
+	output[i] = T::get(p);
+    }
+
+    int get_sample_size(int format) {
+      switch (format) {
+      case wave_buffer_type_si16: return 2;
+      case wave_buffer_type_si24: return 3;
+      default: return 4;
+      }
+    }
+
+  }
+
+  float decode_sample(const void* samples, int format, int channels, int channel, int frame) {
+    int size = get_sample_size(format);
+    const unsigned char* p = (const unsigned char*)samples + (frame * channels + channel) * size;
+    switch (format) {
+    case wave_buffer_type_si16: return si16_sample::get(p);
+    case wave_buffer_type_si24: return si24_sample::get(p);
+    case wave_buffer_type_si32: return si32_sample::get(p);
+    case wave_buffer_type_f32: return f32_sample::get(p);
+    }
+    return 0.0f;
+  }
+
+  void decode_samples(const void* samples, int format, int channels, int channel, int start, int count, float* output) {
+    int size = get_sample_size(format);
+    int stride = channels * size;
+    const unsigned char* p = (const unsigned char*)samples + (start * channels + channel) * size;
+    int done = 0;
+    switch (format) {
+    case wave_buffer_type_si16:
+#if defined(__SSE2__)
+      done = decode_sse(load_si16, p - channel * size, stride, channels, channel, count, output);
+#endif
+      decode_loop<si16_sample>(p + done * stride, stride, count - done, output + done);
+      break;
+    case wave_buffer_type_si24:
+      decode_loop<si24_sample>(p, stride, count, output);
+      break;
+    case wave_buffer_type_si32:
+#if defined(__SSE2__)
+      done = decode_sse(load_si32, p - channel * size, stride, channels, channel, count, output);
+#endif
+      decode_loop<si32_sample>(p + done * stride, stride, count - done, output + done);
+      break;
+    case wave_buffer_type_f32:
+#if defined(__SSE2__)
+      done = decode_sse(load_f32, p - channel * size, stride, channels, channel, count, output);
+#endif
+      decode_loop<f32_sample>(p + done * stride, stride, count - done, output + done);
+      break;
+    }
+  }
+
+  void scan_samples(const void* samples, int format, int channels, int channel, int start, int count, float& minimum, float& maximum, float& power) {
+    int size = get_sample_size(format);
+    int stride = channels * size;
+    const unsigned char* p = (const unsigned char*)samples + (start * channels + channel) * size;
+    int done = 0;
+    switch (format) {
+    case wave_buffer_type_si16:
+#if defined(__SSE2__)
+      done = scan_sse(load_si16, p - channel * size, stride, channels, channel, count, minimum, maximum, power);
+#endif
+      scan_loop<si16_sample>(p + done * stride, stride, count - done, minimum, maximum, power);
+      break;
+    case wave_buffer_type_si24:
+      scan_loop<si24_sample>(p, stride, count, minimum, maximum, power);
+      break;
+    case wave_buffer_type_si32:
+#if defined(__SSE2__)
+      done = scan_sse(load_si32, p - channel * size, stride, channels, channel, count, minimum, maximum, power);
+#endif
+      scan_loop<si32_sample>(p + done * stride, stride, count - done, minimum, maximum, power);
+      break;
+    case wave_buffer_type_f32:
+#if defined(__SSE2__)
+      done = scan_sse(load_f32, p - channel * size, stride, channels, channel, count, minimum, maximum, power);
+#endif
+      scan_loop<f32_sample>(p + done * stride, stride, count - done, minimum, maximum, power);
+      break;
+    }
+  }
+
+  void convert_si16_to_f32(const short* src, float* dst, size_t count) {
+    size_t i = 0;
+#if defined(__SSE2__)
+    const __m128 scale = _mm_set1_ps(32767.0f);
+    for (; i + 8 <= count; i += 8) {
+      __m128i v = _mm_loadu_si128((const __m128i*)(src + i));
+      __m128i lo = _mm_srai_epi32(_mm_unpacklo_epi16(v, v), 16);
+      __m128i hi = _mm_srai_epi32(_mm_unpackhi_epi16(v, v), 16);
+      _mm_storeu_ps(dst + i, _mm_div_ps(_mm_cvtepi32_ps(lo), scale));
+      _mm_storeu_ps(dst + i + 4, _mm_div_ps(_mm_cvtepi32_ps(hi), scale));
+    }
+#endif
+    for (; i < count; i++)
+      dst[i] = (float)src[i] / 32767.0f;
+  }
+
+  void convert_f32_to_si16(const float* src, short* dst, size_t count) {
+    size_t i = 0;
+#if defined(__SSE2__)
+    const __m128 one = _mm_set1_ps(1.0f);
+    const __m128 minus_one = _mm_set1_ps(-1.0f);
+    const __m128 scale = _mm_set1_ps(32767.0f);
+    for (; i + 8 <= count; i += 8) {
+      __m128 a = _mm_max_ps(_mm_min_ps(_mm_loadu_ps(src + i), one), minus_one);
+      __m128 b = _mm_max_ps(_mm_min_ps(_mm_loadu_ps(src + i + 4), one), minus_one);
+      __m128i ia = _mm_cvttps_epi32(_mm_mul_ps(a, scale));
+      __m128i ib = _mm_cvttps_epi32(_mm_mul_ps(b, scale));
+      _mm_storeu_si128((__m128i*)(dst + i), _mm_packs_epi32(ia, ib));
+    }
+#endif
+    for (; i < count; i++)
+      dst[i] = (short)(std::max(std::min(src[i], 1.0f), -1.0f) * 32767.0f);
+  }
+
+  void convert_si32_to_f32(const int* src, float* dst, size_t count) {
+    size_t i = 0;
+#if defined(__SSE2__)
+    const __m128 scale = _mm_set1_ps(2147483648.0f);
+    for (; i + 4 <= count; i += 4) {
+      __m128i v = _mm_loadu_si128((const __m128i*)(src + i));
+      _mm_storeu_ps(dst + i, _mm_div_ps(_mm_cvtepi32_ps(v), scale));
+    }
+#endif
+    for (; i < count; i++)
+      dst[i] = (float)src[i] / 2147483648.0f;
+  }
+
+  void convert_f32_to_si32(const float* src, int* dst, size_t count) {
+    size_t i = 0;
+#if defined(__SSE2__)
+    const __m128 one = _mm_set1_ps(1.0f);
+    const __m128 minus_one = _mm_set1_ps(-1.0f);
+    const __m128 scale = _mm_set1_ps(2147483648.0f);
+    for (; i + 4 <= count; i += 4) {
+      __m128 a = _mm_max_ps(_mm_min_ps(_mm_loadu_ps(src + i), one), minus_one);
+      _mm_storeu_si128((__m128i*)(dst + i), _mm_cvttps_epi32(_mm_mul_ps(a, scale)));
+    }
+#endif
+    for (; i < count; i++)
+      dst[i] = (int)(std::max(std::min(src[i], 1.0f), -1.0f) * 2147483648.0f);
+  }
+
+  namespace {
+
+    inline void store_si24(unsigned char* p, int i) {
+      p[0] = i & 0xff;
+      p[1] = (i >> 8) & 0xff;
+      p[2] = (i >> 16) & 0xff;
+    }
+
+  }
+
+  void convert_f32_to_si24(const float* src, unsigned char* dst, size_t count) {
+    size_t i = 0;
+#if defined(__SSE2__)
+    const __m128 one = _mm_set1_ps(1.0f);
+    const __m128 minus_one = _mm_set1_ps(-1.0f);
+    const __m128 scale = _mm_set1_ps(8388607.0f);
+    int v[4];
+    for (; i + 4 <= count; i += 4, dst += 12) {
+      __m128 a = _mm_max_ps(_mm_min_ps(_mm_loadu_ps(src + i), one), minus_one);
+      _mm_storeu_si128((__m128i*)v, _mm_cvttps_epi32(_mm_mul_ps(a, scale)));
+      store_si24(dst, v[0]);
+      store_si24(dst + 3, v[1]);
+      store_si24(dst + 6, v[2]);
+      store_si24(dst + 9, v[3]);
+    }
+#endif
+    for (; i < count; i++, dst += 3)
+      store_si24(dst, (int)(std::max(std::min(src[i], 1.0f), -1.0f) * 8388607.0f));
+  }
+
+  void convert_f32_to_si32_saturated(const float* src, int* dst, size_t count) {
+    size_t i = 0;
+#if defined(__SSE2__)
+    // cvttps gives 0x80000000 for anything out of range. that is already
+    // right for large negative values, and the mask flips it to 0x7fffffff
+    // for large positive ones.
+    const __m128 scale = _mm_set1_ps(2147483648.0f);
+    for (; i + 4 <= count; i += 4) {
+      __m128 a = _mm_mul_ps(_mm_loadu_ps(src + i), scale);
+      __m128i overflow = _mm_castps_si128(_mm_cmpge_ps(a, scale));
+      _mm_storeu_si128((__m128i*)(dst + i), _mm_xor_si128(_mm_cvttps_epi32(a), overflow));
+    }
+#endif
+    for (; i < count; i++) {
+      float a = src[i] * 2147483648.0f;
+      if (a >= 2147483648.0f)
+	dst[i] = 0x7fffffff;
+      else if (a <= -2147483648.0f)
+	dst[i] = -0x7fffffff - 1;
+      else
+	dst[i] = (int)a;
+    }
+  }
+
+}
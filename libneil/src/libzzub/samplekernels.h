@@ -0,0 +1,37 @@
+#pragma once
+
+#include <cstddef>
+
+namespace zzub {
+
+  // sample kernels: one loop per wave_buffer_type instead of a switch per
+  // sample. buffers are interleaved with the given number of channels,
+  // positions and counts are in frames. si16, si32 and f32 use SSE2 where
+  // available, as do the render conversions to si24 and si32. everything
+  // else uses scalar loops.
+
+  // returns one sample scaled to -1..1
+  float decode_sample(const void* samples, int format, int channels, int channel, int frame);
+
+  // writes count samples of one channel scaled to -1..1 to output
+  void decode_samples(const void* samples, int format, int channels, int channel, int start, int count, float* output);
+
+  // lowers minimum, raises maximum and adds the squares of count samples of
+  // one channel to power
+  void scan_samples(const void* samples, int format, int channels, int channel, int start, int count, float& minimum, float& maximum, float& power);
+
+  // unit step conversions with the same results as ConvertSample()
+  void convert_si16_to_f32(const short* src, float* dst, size_t count);
+  void convert_f32_to_si16(const float* src, short* dst, size_t count);
+  void convert_si32_to_f32(const int* src, float* dst, size_t count);
+  void convert_f32_to_si32(const float* src, int* dst, size_t count);
+
+  // writes count packed little endian 24 bit samples, three bytes each.
+  // unlike ConvertSample() the input is clamped to -1..1 as for si16
+  void convert_f32_to_si24(const float* src, unsigned char* dst, size_t count);
+
+  // for rendering: saturates instead of wrapping, so that 1 and above
+  // become 0x7fffffff rather than -0x80000000 as with convert_f32_to_si32()
+  void convert_f32_to_si32_saturated(const float* src, int* dst, size_t count);
+
+}
@@ -0,0 +1,198 @@
+#include "common.h"
+#include <sched.h>
+
+namespace zzub {
+
+  work_scheduler::work_scheduler() {
+    pthread_mutex_init(&lock, 0);
+    pthread_cond_init(&wake, 0);
+    quit = false;
+    update_priority = false;
+    remaining = 0;
+    work_mixer = 0;
+    work_sample_count = 0;
+  }
+
+  work_scheduler::~work_scheduler() {
+    stop_workers();
+    pthread_cond_destroy(&wake);
+    pthread_mutex_destroy(&lock);
+  }
+
+  void work_scheduler::set_thread_count(int count) {
+    stop_workers();
+    if (count <= 1) return;
+
+    int cpus = (int)sysconf(_SC_NPROCESSORS_ONLN);
+    if (cpus < 1) cpus = 1;
+
+    quit = false;
+    for (int i = 1; i < count; i++) {
+      worker* w = new worker();
+      w->owner = this;
+      w->cpu = i % cpus;
+      w->mix_buffer.resize(2);
+      w->mix_buffer[0].resize(zzub::buffer_size * 4);
+      w->mix_buffer[1].resize(zzub::buffer_size * 4);
+      if (pthread_create(&w->thread, 0, worker_thread, w) != 0) {
+	delete w;
+	break;
+      }
+      workers.push_back(w);
+    }
+
+    // the workers get the priority of the audio thread on the next run
+    update_priority = true;
+  }
+
+  int work_scheduler::get_thread_count() {
+    return (int)workers.size() + 1;
+  }
+
+  void work_scheduler::stop_workers() {
+    pthread_mutex_lock(&lock);
+    quit = true;
+    pthread_cond_broadcast(&wake);
+    pthread_mutex_unlock(&lock);
+
+    for (size_t i = 0; i < workers.size(); i++) {
+      pthread_join(workers[i]->thread, 0);
+      delete workers[i];
+    }
+    workers.clear();
+  }
+
+  void work_scheduler::add_dependency(int before, int after) {
+    dependents[before].push_back(after);
+    pending[after]++;
+  }
+
+  bool work_scheduler::build_schedule(mixer& m) {
+    int count = (int)m.work_order.size();
+    int vertices = (int)num_vertices(m.graph);
+
+    // the vectors keep their capacity, so this allocates only when the graph grows
+    position.assign(vertices, -1);
+    last_reader.assign(vertices, -1);
+    int last_driver = -1;
+    for (int i = 0; i < count; i++) {
+      if ((int)m.work_order[i] >= vertices) return false;
+      position[m.work_order[i]] = i;
+    }
+
+    pending.assign(count, 0);
+    if ((int)dependents.size() < count) dependents.resize(count);
+    for (int i = 0; i < count; i++)
+      dependents[i].clear();
+    ready.reserve(count);
+
+    for (int i = 0; i < count; i++) {
+      zzub::out_edge_iterator out, out_end;
+      boost::tie(out, out_end) = out_edges(m.work_order[i], m.graph);
+      for (; out != out_end; ++out) {
+	plugin_descriptor from = target(*out, m.graph);
+	int j = position[from];
+	if (j != -1 && j < i)
+	  add_dependency(j, i); else
+	if (j > i)
+	  add_dependency(i, j);
+
+	connection_type type = m.graph[*out].conn->type;
+	if (type == connection_type_midi || type == connection_type_event) {
+	  if (last_reader[from] != -1)
+	    add_dependency(last_reader[from], i);
+	  last_reader[from] = i;
+	}
+      }
+
+      host* callbacks = m.get_plugin(m.work_order[i]).callbacks;
+      if (callbacks == 0) continue;
+      if (callbacks->uses_driver) {
+	if (last_driver != -1)
+	  add_dependency(last_driver, i);
+	last_driver = i;
+      }
+      if (!callbacks->processed || callbacks->controls_peers) {
+	for (int j = 0; j < count; j++) {
+	  if (j < i)
+	    add_dependency(j, i); else
+	  if (j > i)
+	    add_dependency(i, j);
+	}
+      }
+    }
+    return true;
+  }
+
+  bool work_scheduler::run(mixer& m, int sample_count) {
+    if (workers.empty() || !build_schedule(m)) return false;
+
+    if (update_priority) {
+      int policy;
+      sched_param param;
+      if (pthread_getschedparam(pthread_self(), &policy, &param) == 0) {
+	for (size_t i = 0; i < workers.size(); i++)
+	  pthread_setschedparam(workers[i]->thread, policy, &param);
+      }
+      update_priority = false;
+    }
+
+    pthread_mutex_lock(&lock);
+    work_mixer = &m;
+    work_sample_count = sample_count;
+    remaining = (int)m.work_order.size();
+    ready.clear();
+    // ready is used as a stack, push backwards so the first plugins go first
+    for (int i = remaining - 1; i >= 0; i--) {
+      if (pending[i] == 0) ready.push_back(i);
+    }
+    pthread_cond_broadcast(&wake);
+
+    while (remaining > 0) {
+      if (!ready.empty())
+	work_ready(m.mix_buffer); else
+	pthread_cond_wait(&wake, &lock);
+    }
+    pthread_mutex_unlock(&lock);
+    return true;
+  }
+
+  // called with lock held, returns with lock held
+  void work_scheduler::work_ready(vector<vector<float> >& mix_buffer) {
+    int index = ready.back();
+    ready.pop_back();
+
+    pthread_mutex_unlock(&lock);
+    work_mixer->work_plugin(work_mixer->work_order[index], work_sample_count, mix_buffer);
+    pthread_mutex_lock(&lock);
+
+    vector<int>& released = dependents[index];
+    for (size_t i = 0; i < released.size(); i++) {
+      if (--pending[released[i]] == 0) ready.push_back(released[i]);
+    }
+    remaining--;
+    pthread_cond_broadcast(&wake);
+  }
+
+  void* work_scheduler::worker_thread(void* arg) {
+    worker* w = (worker*)arg;
+    work_scheduler* self = w->owner;
+
+#if defined(__linux__)
+    cpu_set_t cpus;
+    CPU_ZERO(&cpus);
+    CPU_SET(w->cpu, &cpus);
+    pthread_setaffinity_np(pthread_self(), sizeof(cpus), &cpus);
+#endif
+
+    pthread_mutex_lock(&self->lock);
+    while (!self->quit) {
+      if (!self->ready.empty())
+	self->work_ready(w->mix_buffer); else
+	pthread_cond_wait(&self->wake, &self->lock);
+    }
+    pthread_mutex_unlock(&self->lock);
+    return 0;
+  }
+
+}
@@ -0,0 +1,78 @@
+#pragma once
+
+namespace zzub {
+
+  struct mixer;
+
+  // runs mixer::work_plugin for the plugins in work_order on a pool of worker
+  // threads, each pinned to a cpu and with its own mix buffer. the audio
+  // thread takes part in the work and waits until all plugins are done.
+  //
+  // the schedule is derived from work_order and the graph for every chunk: a
+  // plugin waits for the connected plugins that come before it in work_order,
+  // and the connected plugins after it (feedback) wait for it, so every
+  // connection reads the same buffers as when processing one plugin at a
+  // time. midi and event connections write to the plugin they read from, so
+  // the readers of the same plugin run in work_order. with one thread (the
+  // default) no workers are started and the mixer processes the plugins on
+  // the audio thread as before.
+  //
+  // plugins can also change other plugins through host::control_change and
+  // the other peer control methods, which the graph does not show. once a
+  // plugin has done so (host::controls_peers) it runs alone, after all
+  // plugins before it and before all plugins after it. plugins that use the
+  // audio driver channels (host::uses_driver) share them, so they run in
+  // work_order. both flags are set by the host methods, and init() and
+  // process_events() always run on one thread. a plugin also runs alone
+  // until its first process_stereo() (host::processed), so it is marked
+  // before it ever runs alongside other plugins if it reaches for another
+  // plugin or the driver in any of these.
+  struct work_scheduler {
+
+    struct worker {
+      work_scheduler* owner;
+      int cpu;
+      pthread_t thread;
+      std::vector<std::vector<float> > mix_buffer;
+    };
+
+    std::vector<worker*> workers;
+    pthread_mutex_t lock;
+    pthread_cond_t wake;
+    bool quit;
+    bool update_priority;
+
+    // the schedule, indices are positions in work_order
+    std::vector<int> position;							// position of each vertex, -1 if not in work_order
+    std::vector<int> last_reader;						// position of the last midi or event reader of each vertex
+    std::vector<int> pending;							// number of plugins each plugin waits for
+    std::vector<std::vector<int> > dependents;				// plugins to release when a plugin is done
+    std::vector<int> ready;
+    int remaining;
+    mixer* work_mixer;
+    int work_sample_count;
+
+    work_scheduler();
+    ~work_scheduler();
+
+    // count includes the audio thread, 1 or less turns the workers off.
+    // the mixer must not be processing while the count is changed.
+    void set_thread_count(int count);
+    int get_thread_count();
+
+    // processes work_order and returns true, or returns false when there are
+    // no workers and the caller should process work_order itself
+    bool run(mixer& m, int sample_count);
+
+  private:
+    work_scheduler(const work_scheduler&);
+    work_scheduler& operator=(const work_scheduler&);
+
+    void stop_workers();
+    bool build_schedule(mixer& m);
+    void add_dependency(int before, int after);
+    void work_ready(std::vector<std::vector<float> >& mix_buffer);
+    static void* worker_thread(void* arg);
+  };
+
+}
@@ -54,6 +54,34 @@ namespace {	// duplicate from ccm.h and pattern.cpp
 
 namespace zzub {
 
+  namespace {
+
+    bool event_time_less(const sequence_event& ev, int time) {
+      return ev.time < time;
+    }
+
+    bool time_event_less(int time, const sequence_event& ev) {
+      return time < ev.time;
+    }
+
+  }
+
+  int sequencer_track::find_event(int time) const {
+    std::vector<sequence_event>::const_iterator i = std::upper_bound(events.begin(), events.end(), time, time_event_less);
+    return (int)(i - events.begin()) - 1;
+  }
+
+  int sequencer_track::lower_bound(int time) const {
+    std::vector<sequence_event>::const_iterator i = std::lower_bound(events.begin(), events.end(), time, event_time_less);
+    return (int)(i - events.begin());
+  }
+
+  void sequencer_track::get_event_range(int start, int end, int& first, int& last) const {
+    // the event at or before start may still be playing
+    first = std::max(find_event(start), 0);
+    last = std::max(lower_bound(end), first);
+  }
+
   bool is_note_playing(int plugin_id, const std::vector<zzub::keyjazz_note>& keyjazz, int note) {
     for (size_t i = 0; i < keyjazz.size(); i++)
       if (keyjazz[i].plugin_id == plugin_id && keyjazz[i].note == note) return true;
@@ -1041,13 +1069,16 @@ namespace zzub {
 	sequencer_track& seqtrack = sequencer_tracks[i];
 			
 	int& song_index = sequencer_indices[i];
+	int event_count = (int)seqtrack.events.size();
 
-	while (song_index >= 0 && (song_index >= (int)seqtrack.events.size() || seqtrack.events[song_index].time > song_position)) {
-	  song_index--;
-	}
-
-	while (song_index < (int)seqtrack.events.size() - 1 && seqtrack.events[song_index + 1].time <= song_position) {
+	// during playback we usually stay on the same event or step to the
+	// next one. after jumps and edits, look the event up instead.
+	if (song_index < event_count - 1 && song_index >= -1 && seqtrack.events[song_index + 1].time <= song_position)
 	  song_index++;
+	if (song_index < -1 || song_index >= event_count ||
+	    (song_index >= 0 && seqtrack.events[song_index].time > song_position) ||
+	    (song_index < event_count - 1 && seqtrack.events[song_index + 1].time <= song_position)) {
+	  song_index = seqtrack.find_event(song_position);
 	}
       }
 
@@ -1112,12 +1143,14 @@ namespace zzub {
     assert(next_tick_position <= master_info.samples_per_tick);
     assert(work_chunk_size >= 0 && work_chunk_size <= sample_count);
 
-    // process plugins
-    for (size_t i = 0; i < work_order.size(); i++) {
+    // process plugins, on the worker threads if there are any
+    if (!scheduler.run(*this, work_chunk_size)) {
+      for (size_t i = 0; i < work_order.size(); i++) {
 
-      // process audio
-      work_plugin(work_order[i], work_chunk_size);
+	// process audio
+	work_plugin(work_order[i], work_chunk_size, mix_buffer);
 
+      }
     }
 
     // process midi
@@ -1201,7 +1234,7 @@ namespace zzub {
     sequencer_indices.resize(sequencer_tracks.size());
   }
 
-  void mixer::work_plugin(plugin_descriptor plugin, int sample_count) {
+  void mixer::work_plugin(plugin_descriptor plugin, int sample_count, vector<vector<float> >& mixbuffer) {
 
     double start_time = timer.frame();
 
@@ -1239,10 +1272,10 @@ namespace zzub {
 	flags = zzub::process_mode_write;
     }
 
-    memcpy(&mix_buffer[0].front(), &m.work_buffer[0].front(), sample_count * sizeof(float));
-    memcpy(&mix_buffer[1].front(), &m.work_buffer[1].front(), sample_count * sizeof(float));
+    memcpy(&mixbuffer[0].front(), &m.work_buffer[0].front(), sample_count * sizeof(float));
+    memcpy(&mixbuffer[1].front(), &m.work_buffer[1].front(), sample_count * sizeof(float));
 
-    float *plin[] = { &mix_buffer[0].front(), &mix_buffer[1].front() };
+    float *plin[] = { &mixbuffer[0].front(), &mixbuffer[1].front() };
     float *plout[] = { &m.work_buffer[0].front(), &m.work_buffer[1].front() };
 
     if (m.is_muted || m.sequencer_state == sequencer_event_type_mute) {
@@ -1253,6 +1286,7 @@ namespace zzub {
       } else {
 	SETABRPUN(); // turn on flush-to-zero for SSE machines
 	m.last_work_audio_result = m.plugin->process_stereo(plin, plout, sample_count, flags);
+	m.callbacks->processed = true;
 	// (paniq) flush to zero should be turned off outside our DSP loop
 	// because the player library might be running in a process where
 	// precise computation is expected (i.e. realtime physics simulation).
@@ -181,8 +181,15 @@ namespace zzub {
     sequence_type type;
     int automation_group, automation_track, automation_column;
     int automation_mode;	// constant? linear? spline?
-    vector<sequence_event> events;
+    vector<sequence_event> events;	// sorted by time
     sequence_proxy* proxy;
+
+    // index of the last event at or before time, or -1
+    int find_event(int time) const;
+    // index of the first event at or after time, or events.size()
+    int lower_bound(int time) const;
+    // events [first, last) audible between the ticks start and end
+    void get_event_range(int start, int end, int& first, int& last) const;
   };
 
   struct song {
@@ -288,6 +295,7 @@ namespace zzub {
     master_plugin_info master_plugininfo;
     plugin_descriptor solo_plugin;
     vector<vector<float> > mix_buffer;
+    zzub::work_scheduler scheduler;					// runs work_order on worker threads
     float* inputBuffer[audiodriver::MAX_CHANNELS];
     float* outputBuffer[audiodriver::MAX_CHANNELS];
 
@@ -300,7 +308,7 @@ namespace zzub {
 
     // processing methods
     int generate_audio(int sample_count);
-    void work_plugin(plugin_descriptor plugindesc, int sample_count);
+    void work_plugin(plugin_descriptor plugindesc, int sample_count, vector<vector<float> >& mixbuffer);
     void process_sequencer_events(plugin_descriptor plugindesc);
     int determine_chunk_size(int sample_count, double& tick_fracs, int& next_tick_position);
     void process_sequencer_events();
@@ -21,6 +21,7 @@ Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
 
 #include "common.h"
 #include "tools.h"
+#include "samplekernels.h"
 
 char backslashToSlash(char c) { if (c=='\\') return '/'; return c; }
 
@@ -219,13 +220,17 @@ void Copy16ToS32(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcste
 }
 
 void Copy16ToF32(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcstep, size_t dststep, size_t srcoffset, size_t dstoffset) {
-	CopySamplesT((short*)srcbuf, (float*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
+	if (srcstep == 1 && dststep == 1)
+		zzub::convert_si16_to_f32((short*)srcbuf + srcoffset, (float*)targetbuf + dstoffset, numSamples); else
+		CopySamplesT((short*)srcbuf, (float*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
 }
 
 
 // from 32 bit floating point conversion
 void CopyF32To16(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcstep, size_t dststep, size_t srcoffset, size_t dstoffset) {
-	CopySamplesT((float*)srcbuf, (short*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
+	if (srcstep == 1 && dststep == 1)
+		zzub::convert_f32_to_si16((float*)srcbuf + srcoffset, (short*)targetbuf + dstoffset, numSamples); else
+		CopySamplesT((float*)srcbuf, (short*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
 }
 
 void CopyF32To24(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcstep, size_t dststep, size_t srcoffset, size_t dstoffset) {
@@ -233,7 +238,9 @@ void CopyF32To24(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcste
 }
 
 void CopyF32ToS32(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcstep, size_t dststep, size_t srcoffset, size_t dstoffset) {
-	CopySamplesT((float*)srcbuf, (int*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
+	if (srcstep == 1 && dststep == 1)
+		zzub::convert_f32_to_si32((float*)srcbuf + srcoffset, (int*)targetbuf + dstoffset, numSamples); else
+		CopySamplesT((float*)srcbuf, (int*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
 }
 
 
@@ -247,7 +254,9 @@ void CopyS32To24(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcste
 }
 
 void CopyS32ToF32(void* srcbuf, void* targetbuf, size_t numSamples, size_t srcstep, size_t dststep, size_t srcoffset, size_t dstoffset) {
-	CopySamplesT((int*)srcbuf, (float*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
+	if (srcstep == 1 && dststep == 1)
+		zzub::convert_si32_to_f32((int*)srcbuf + srcoffset, (float*)targetbuf + dstoffset, numSamples); else
+		CopySamplesT((int*)srcbuf, (float*)targetbuf, numSamples, srcstep, dststep, srcoffset, dstoffset);
 }
 
 
@@ -223,8 +223,10 @@ namespace zzub {
       for (size_t i = 0; i < backbuffer_operations.size(); i++) {
 	backbuffer_operations[i]->operate(front);
       }
-      clear_swap_song(back, backbuffer_flags);
       swap_lock.unlock();
+      // the swapped out data is unreachable from front now, so it can be
+      // freed without holding up the audio thread
+      clear_swap_song(back, backbuffer_flags);
     }
   }
 
@@ -410,6 +412,12 @@ namespace zzub {
     if (!backbuffer_flags.copy_work_order && flags.copy_work_order)
       back.work_order = front.work_order;
 
+    // in case a pattern is flagged, we also add flags to copy its plugin
+    for (size_t i = 0; i < flags.pattern_flags.size(); i++) {
+      assert(flags.copy_plugins);
+      flags.get_plugin_flags(flags.pattern_flags[i].plugin_id).copy_plugin = true;
+    }
+
     // if player_flags_copy_plugins_deep is set we generate flags to copy all the plugins
     if (!backbuffer_flags.copy_plugins_deep && flags.copy_plugins_deep) {
       assert(flags.copy_plugins);
@@ -436,9 +444,10 @@ namespace zzub {
       metaplugin& tp = *back.plugins[pflags.plugin_id];
 
       if (!bflags.copy_patterns && pflags.copy_patterns) {
-	// duplicate all patterns
+	// duplicate all patterns, except those already copied for a pattern flag
 	for (size_t i = 0; i < tp.patterns.size(); i++) {
-	  tp.patterns[i] = new pattern(*tp.patterns[i]);
+	  if (is_front_pattern(pflags.plugin_id, tp.patterns[i]))
+	    tp.patterns[i] = new pattern(*tp.patterns[i]);
 	}
       }
     }
@@ -489,16 +498,20 @@ namespace zzub {
       }
     }
 
+    // patterns are tracked by pointer rather than by index, since operations
+    // in the same batch may insert, remove or move patterns. a pattern that
+    // front still uses is copied, one that was copied already is left alone.
     for (size_t i = 0; i < flags.pattern_flags.size(); i++) {
       const operation_copy_pattern_flags& pflags = flags.pattern_flags[i];
-      operation_copy_pattern_flags& bflags = backbuffer_flags.get_pattern_flags(pflags.plugin_id, pflags.index);
 
-      // check if this pattern was already copied via the plugin before we do anything
-      operation_copy_plugin_flags& pluginflags = backbuffer_flags.get_plugin_flags(pflags.plugin_id);
-      if (pluginflags.copy_patterns) continue;
+      assert(pflags.copy_pattern);
+
+      if ((size_t)pflags.plugin_id >= back.plugins.size() || back.plugins[pflags.plugin_id] == 0) continue;
 
       metaplugin& tp = *back.plugins[pflags.plugin_id];
-      if (!bflags.copy_pattern && pflags.copy_pattern) {
+      if (pflags.index < 0 || (size_t)pflags.index >= tp.patterns.size()) continue;
+
+      if (is_front_pattern(pflags.plugin_id, tp.patterns[pflags.index])) {
 	tp.patterns[pflags.index] = new pattern(*tp.patterns[pflags.index]);
       }
     }
@@ -506,6 +519,39 @@ namespace zzub {
     backbuffer_flags.merge(flags);
   }
 
+  // returns the song a read-only accessor should read from. the parts in
+  // flags are read from front unless a pending operation already copied
+  // them to the back buffer, so pure reads don't get their data copied and
+  // swapped in on the next commit. only when some of the parts are pending
+  // and others are not, they are merged like for an operation.
+  zzub::song& undo_manager::read_song(const operation_copy_flags& flags) {
+    const bool wanted[] = {
+      flags.copy_graph, flags.copy_midi_mappings, flags.copy_plugins,
+      flags.copy_sequencer_tracks, flags.copy_song_variables,
+      flags.copy_wavetable, flags.copy_work_order
+    };
+    const bool copied[] = {
+      backbuffer_flags.copy_graph, backbuffer_flags.copy_midi_mappings, backbuffer_flags.copy_plugins,
+      backbuffer_flags.copy_sequencer_tracks, backbuffer_flags.copy_song_variables,
+      backbuffer_flags.copy_wavetable, backbuffer_flags.copy_work_order
+    };
+    bool any = false, all = true;
+    for (size_t i = 0; i < sizeof(wanted) / sizeof(bool); i++) {
+      if (!wanted[i]) continue;
+      any |= copied[i];
+      all &= copied[i];
+    }
+    if (!any) return front;
+    if (!all) merge_backbuffer_flags(flags);
+    return back;
+  }
+
+  bool undo_manager::is_front_pattern(int plugin_id, const zzub::pattern* p) {
+    if ((size_t)plugin_id >= front.plugins.size() || front.plugins[plugin_id] == 0) return false;
+    const std::vector<zzub::pattern*>& patterns = front.plugins[plugin_id]->patterns;
+    return std::find(patterns.begin(), patterns.end(), p) != patterns.end();
+  }
+
   void undo_manager::write_swap_song(zzub::song& song, const operation_copy_flags& flags) {
     if (flags.copy_graph)
       front.graph = song.graph;
@@ -556,11 +602,12 @@ namespace zzub {
 
       const metaplugin& sp = *song.plugins[pflags.plugin_id];
 
-      if (pflags.copy_patterns) {
-	// delete (swapped) duplicated patterns
-	for (size_t i = 0; i < sp.patterns.size(); i++) {
+      // delete the patterns that were copied or removed in the back buffer,
+      // i.e. those the swapped in plugin no longer has
+      bool swapped = (size_t)pflags.plugin_id < front.plugins.size() && front.plugins[pflags.plugin_id] != 0;
+      for (size_t i = 0; i < sp.patterns.size(); i++) {
+	if (swapped ? !is_front_pattern(pflags.plugin_id, sp.patterns[i]) : pflags.copy_patterns)
 	  delete sp.patterns[i];
-	}
       }
 
       delete &sp;
@@ -583,18 +630,6 @@ namespace zzub {
 	delete song.wavetable.waves[wflags.wave];
     }
 
-    for (size_t i = 0; i < flags.pattern_flags.size(); i++) {
-      const operation_copy_pattern_flags& pflags = flags.pattern_flags[i];
-      //operation_copy_pattern_flags& bflags = flags.get_pattern_flags(pflags.plugin_id, pflags.index);
-
-      // check if this pattern was already copied via the plugin before we do anything
-      const operation_copy_plugin_flags& pluginflags = flags.get_plugin_flags(pflags.plugin_id);
-      if (pluginflags.copy_patterns) continue;
-
-      metaplugin& tp = *back.plugins[pflags.plugin_id];
-      delete tp.patterns[pflags.index];
-    }
-
   }
 
 };
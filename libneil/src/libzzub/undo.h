@@ -148,6 +148,8 @@ struct undo_manager {
 	~undo_manager();
 	void reset();
 	void merge_backbuffer_flags(operation_copy_flags flags);
+	zzub::song& read_song(const operation_copy_flags& flags);
+	bool is_front_pattern(int plugin_id, const zzub::pattern* p);
 	bool prepare_operation_redo(operation* singleop);
 	void prepare_operation_undo(operation* singleop);
 	void flush_operations(zzub_event_data_t* do_event, zzub_event_data_t* redo_event, zzub_event_data_t* undo_event);
@@ -19,9 +19,176 @@
 #include <algorithm>
 #include "common.h"
 #include "tools.h"
+#include "samplekernels.h"
 
 namespace zzub {
 
+  /*! \struct wave_peaks
+    \brief Cached min/max/rms pyramid used for waveform digests.
+  */
+
+  wave_peaks::wave_peaks() {
+    samples = 0;
+    sample_count = 0;
+    format = 0;
+    channels = 0;
+    rebind = false;
+  }
+
+  void wave_peaks::invalidate(int start, int end, bool resized) {
+    if (stale.empty()) return;
+    int first = std::max(start, 0) / block_size;
+    int last = resized ? (int)stale[0].size() : std::min((end + block_size - 1) / block_size, (int)stale[0].size());
+    for (size_t level = 0; level < stale.size() && first < last; level++) {
+      for (int i = first; i < last && i < (int)stale[level].size(); i++)
+	stale[level][i] = true;
+      first /= 2;
+      last = (last + 1) / 2;
+    }
+    if (resized) rebind = true;
+  }
+
+  void wave_peaks::bind(wave_info_ex& w, wave_level_ex& l) {
+    int newchannels = w.get_stereo() ? 2 : 1;
+    if (samples == l.samples && sample_count == l.sample_count && format == l.format && channels == newchannels)
+      return;
+
+    bool keep = rebind && format == l.format && channels == newchannels;
+    int blocks = (l.sample_count + block_size - 1) / block_size;
+    int oldblocks = stale.empty() ? 0 : (int)stale[0].size();
+    if (!keep) {
+      stale.clear();
+      levels[0].clear();
+      levels[1].clear();
+      oldblocks = 0;
+    }
+    int level = 0;
+    for (int size = blocks; size > 0; size = size > 1 ? (size + 1) / 2 : 0, level++) {
+      if ((int)stale.size() <= level) {
+	stale.push_back(std::vector<bool>());
+	levels[0].push_back(std::vector<wave_peak>());
+	levels[1].push_back(std::vector<wave_peak>());
+      }
+      stale[level].resize(size, true);
+      levels[0][level].resize(size);
+      levels[1][level].resize(size);
+    }
+    stale.resize(level);
+    levels[0].resize(level);
+    levels[1].resize(level);
+    // the old last block may have been partial
+    if (keep && oldblocks > 0) invalidate((oldblocks - 1) * block_size, l.sample_count, false);
+
+    samples = l.samples;
+    sample_count = l.sample_count;
+    format = l.format;
+    channels = newchannels;
+    rebind = false;
+  }
+
+  void wave_peaks::update(wave_level_ex& l, int level, int index) {
+    if (!stale[level][index]) return;
+    for (int channel = 0; channel < channels; channel++) {
+      wave_peak& peak = levels[channel][level][index];
+      peak.minimum = 1.0f;
+      peak.maximum = -1.0f;
+      peak.power = 0.0f;
+      peak.count = 0;
+    }
+    if (level == 0) {
+      int start = index * block_size;
+      int end = std::min(start + block_size, l.sample_count);
+      for (int channel = 0; channel < channels; channel++) {
+	wave_peak& peak = levels[channel][0][index];
+	scan_samples(l.samples, l.format, channels, channel, start, end - start, peak.minimum, peak.maximum, peak.power);
+	peak.count = end - start;
+      }
+    } else {
+      for (int i = index * 2; i < index * 2 + 2 && i < (int)stale[level - 1].size(); i++) {
+	update(l, level - 1, i);
+	for (int channel = 0; channel < channels; channel++) {
+	  wave_peak& peak = levels[channel][level][index];
+	  const wave_peak& child = levels[channel][level - 1][i];
+	  peak.minimum = std::min(peak.minimum, child.minimum);
+	  peak.maximum = std::max(peak.maximum, child.maximum);
+	  peak.power += child.power;
+	  peak.count += child.count;
+	}
+      }
+    }
+    stale[level][index] = false;
+  }
+
+  void wave_peaks::get_digest(wave_info_ex& w, wave_level_ex& l, int channel, int start, int end, float* mindigest, float* maxdigest, float* ampdigest, int digestsize) {
+    int samplerange = end - start;
+    assert(samplerange > 0);
+    int channels = w.get_stereo()?2:1;
+    float sps = (float)samplerange / (float)digestsize; // samples per sample
+    float blockstart = (float)start;
+
+    if (sps >= block_size) bind(w, l);
+
+    if (sps >= block_size && !stale.empty()) {
+      // answer from the coarsest level that still resolves one digest entry
+      int level = 0;
+      while (level + 1 < (int)stale.size() && (float)(block_size << (level + 1)) <= sps)
+	level++;
+      int size = block_size << level;
+      int entries = (int)stale[level].size();
+      for (int i = 0; i < digestsize; ++i) {
+	float blockend = std::min(blockstart + sps, (float)end);
+	int first = std::min((int)blockstart / size, entries - 1);
+	int last = std::min(std::max(((int)blockend + size - 1) / size, first + 1), entries);
+	float minsample = 1.0f;
+	float maxsample = -1.0f;
+	float power = 0.0f;
+	int count = 0;
+	for (int e = first; e < last; e++) {
+	  update(l, level, e);
+	  const wave_peak& peak = levels[channel][level][e];
+	  minsample = std::min(minsample, peak.minimum);
+	  maxsample = std::max(maxsample, peak.maximum);
+	  power += peak.power;
+	  count += peak.count;
+	}
+	if (mindigest)
+	  mindigest[i] = minsample;
+	if (maxdigest)
+	  maxdigest[i] = maxsample;
+	if (ampdigest)
+	  ampdigest[i] = count ? sqrtf(power / count) : 0.0f;
+	blockstart = blockend;
+      }
+    } else if (sps > 1) {
+      for (int i = 0; i < digestsize; ++i) {
+	float blockend = std::min(blockstart + sps, (float)end);
+	float minsample = 1.0f;
+	float maxsample = -1.0f;
+	float amp = 0.0f;
+	if ((int)blockend > (int)blockstart)
+	  scan_samples(l.samples, l.format, channels, channel, (int)blockstart, (int)blockend - (int)blockstart, minsample, maxsample, amp);
+	if (mindigest)
+	  mindigest[i] = minsample;
+	if (maxdigest)
+	  maxdigest[i] = maxsample;
+	if (ampdigest)
+	  ampdigest[i] = sqrtf(amp / (blockend - blockstart));
+	blockstart = blockend;
+      }
+    } else {
+      for (int i = 0; i < digestsize; ++i) {
+	int s = (int)(blockstart + i * sps /* + 0.5f */);
+	float sample = decode_sample(l.samples, l.format, channels, channel, s);
+	if (mindigest)
+	  mindigest[i] = sample;
+	if (maxdigest)
+	  maxdigest[i] = sample;
+	if (ampdigest)
+	  ampdigest[i] = std::abs(sample);
+      }
+    }
+  }
+
   /*! \struct envelope_entry
     \brief Envelope properties and points
   */
@@ -224,4 +224,36 @@ namespace zzub {
     void clear();
   };
 
+  struct wave_peak {
+    float minimum, maximum;
+    float power;	// sum of squared samples
+    int count;
+  };
+
+  // min/max/rms pyramid of a wavelevel, built lazily as digests are
+  // requested. entries of level 0 summarize block_size samples, every
+  // further level halves the resolution.
+  struct wave_peaks {
+    enum { block_size = 256 };
+
+    const void* samples;
+    int sample_count;
+    int format;
+    int channels;
+    bool rebind;
+    std::vector<std::vector<wave_peak> > levels[2];
+    std::vector<std::vector<bool> > stale;
+
+    wave_peaks();
+    // marks the samples in [start, end) as changed. if resized is true the
+    // sample buffer may have been reallocated and everything from start
+    // onwards is rebuilt.
+    void invalidate(int start, int end, bool resized = false);
+    void get_digest(wave_info_ex& w, wave_level_ex& l, int channel, int start, int end, float* mindigest, float* maxdigest, float* ampdigest, int digestsize);
+
+  private:
+    void bind(wave_info_ex& w, wave_level_ex& l);
+    void update(wave_level_ex& l, int level, int index);
+  };
+
 };
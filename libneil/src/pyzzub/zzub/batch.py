@@ -0,0 +1,202 @@
+#encoding: latin-1
+
+# pyzzub
+# Python bindings for libzzub
+# Copyright (C) 2006 The libzzub Development Team
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Batch rendering of many songs in parallel worker processes.
+
+Each worker process keeps one zzub.render.Renderer, and so one player,
+for all the songs it is given. The plugin libraries are loaded and
+enumerated once per process rather than once per song, and the plugin
+folders are looked up once by the parent. Workers get one song at a
+time, so a plugin crashing a worker only fails that song and the
+worker is restarted.
+
+neil-render-batch is the command line front end.
+"""
+
+import os
+import time
+import errno
+import select
+import multiprocessing
+from zzub.render import Renderer, RenderError, get_plugin_paths
+
+class BatchResult:
+	"""
+	The outcome of rendering one song. error is None on success.
+	"""
+	def __init__(self, songfile, outfile, frames=0, samplerate=44100, seconds=0.0, error=None):
+		self.songfile = songfile
+		self.outfile = outfile
+		self.frames = frames
+		self.samplerate = samplerate
+		self.seconds = seconds
+		self.error = error
+
+	def get_length(self):
+		"""
+		Returns the length of the rendered audio in seconds.
+		"""
+		return float(self.frames) / self.samplerate
+
+	def get_realtime_factor(self):
+		"""
+		Returns how many times faster than realtime the song was rendered.
+		"""
+		return self.get_length() / max(self.seconds, 1e-6)
+
+	def __str__(self):
+		if self.error:
+			return "%s: failed: %s" % (self.songfile, self.error)
+		return "%s: %.1f s rendered in %.1f s (%.1fx realtime)" % (self.songfile,
+			self.get_length(), self.seconds, self.get_realtime_factor())
+
+def find_songs(path):
+	"""
+	Returns (songfile, name) pairs for the .ccm files below a folder, or
+	listed in a manifest file with one path per line. Manifest paths are
+	relative to the manifest, empty lines and lines starting with # are
+	skipped. name is the path of the song relative to the folder or the
+	manifest, and is used to name the output file.
+	"""
+	songs = []
+	if os.path.isdir(path):
+		for dirpath, dirnames, filenames in os.walk(path):
+			dirnames.sort()
+			for filename in sorted(filenames):
+				if filename.lower().endswith('.ccm'):
+					songfile = os.path.join(dirpath, filename)
+					songs.append((songfile, os.path.relpath(songfile, path)))
+		return songs
+	basepath = os.path.dirname(os.path.abspath(path))
+	for line in open(path, 'r'):
+		line = line.strip()
+		if not line or line.startswith('#'):
+			continue
+		songfile = os.path.normpath(os.path.join(basepath, line))
+		name = os.path.relpath(songfile, basepath)
+		if name.startswith(os.pardir):
+			name = os.path.basename(songfile)
+		songs.append((songfile, name))
+	return songs
+
+def _batch_worker(conn, samplerate, plugin_paths, threads, render_options):
+	renderer = Renderer(samplerate, plugin_paths, threads)
+	try:
+		while True:
+			job = conn.recv()
+			if job is None:
+				break
+			songfile, outfile = job
+			t = time.time()
+			try:
+				renderer.load(songfile)
+				frames = renderer.render(outfile, **render_options)
+				conn.send((frames, time.time() - t, None))
+			except (RenderError, IOError), e:
+				conn.send((0, time.time() - t, str(e)))
+	finally:
+		renderer.destroy()
+
+class BatchWorker:
+	def __init__(self, args):
+		self.conn, child = multiprocessing.Pipe()
+		self.process = multiprocessing.Process(target=_batch_worker, args=(child,) + args)
+		self.process.daemon = True
+		self.process.start()
+		child.close()
+		self.result = None
+
+	def stop(self):
+		try:
+			self.conn.send(None)
+		except (IOError, EOFError):
+			pass
+		self.process.join()
+
+def render_batch(songs, outdir, processes=None, samplerate=44100, plugin_paths=None, threads=1, report=None, **render_options):
+	"""
+	Renders songs, a list of (songfile, name) pairs as returned by
+	find_songs(), to wave files in outdir on processes worker processes,
+	by default one per cpu. threads is the number of plugin threads per
+	process. render_options are passed on to Renderer.render().
+
+	report is called with each BatchResult as the songs finish. Returns
+	the results in the order of songs.
+	"""
+	if processes is None:
+		processes = multiprocessing.cpu_count()
+	if plugin_paths is None:
+		plugin_paths = get_plugin_paths()
+	args = (samplerate, plugin_paths, threads, render_options)
+
+	results = []
+	for songfile, name in songs:
+		outfile = os.path.join(outdir, os.path.splitext(name)[0] + '.wav')
+		if not os.path.isdir(os.path.dirname(outfile)):
+			os.makedirs(os.path.dirname(outfile))
+		results.append(BatchResult(songfile, outfile, samplerate=samplerate))
+
+	pending = list(reversed(results))
+	workers = [BatchWorker(args) for i in range(min(processes, len(results)))]
+	try:
+		while pending or [w for w in workers if w.result]:
+			for w in workers:
+				if not w.result and pending:
+					w.result = pending.pop()
+					try:
+						w.conn.send((w.result.songfile, w.result.outfile))
+					except IOError:
+						pass
+			# wait for whichever worker answers first. a worker that exits
+			# closes its end of the pipe, which also wakes up select.
+			busy = [w.conn.fileno() for w in workers if w.result]
+			try:
+				readable = select.select(busy, [], [], 0.5)[0]
+			except select.error, e:
+				if e.args[0] != errno.EINTR:
+					raise
+				continue
+			for i, w in enumerate(workers):
+				if not w.result:
+					continue
+				result = w.result
+				exited = False
+				if w.conn.fileno() in readable:
+					try:
+						result.frames, result.seconds, result.error = w.conn.recv()
+					except EOFError:
+						exited = True
+				elif w.process.is_alive() or w.conn.poll():
+					continue
+				else:
+					exited = True
+				if exited:
+					w.process.join()
+					result.error = "worker exited with code %s" % w.process.exitcode
+					if pending:
+						workers[i] = BatchWorker(args)
+				w.result = None
+				if report:
+					report(result)
+	finally:
+		for w in workers:
+			w.stop()
+	return results
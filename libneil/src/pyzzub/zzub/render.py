@@ -0,0 +1,196 @@
+#encoding: latin-1
+
+# pyzzub
+# Python bindings for libzzub
+# Copyright (C) 2006 The libzzub Development Team
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Offline rendering of songs to wave files.
+
+A Renderer owns a player with a silent audio driver. render() plays the
+loaded song through Player.render_stereo() as fast as the cpu allows and
+writes the master output to a RIFF wave file. Positions are song rows.
+
+neil-render is the command line front end.
+"""
+
+import os
+import ctypes
+import struct
+import zzub
+
+# (bits, float) : (zzub format, wave format tag)
+WAVE_FORMATS = {
+	(16, False) : (zzub.zzub_wave_buffer_type_si16, 1),
+	(24, False) : (zzub.zzub_wave_buffer_type_si24, 1),
+	(32, False) : (zzub.zzub_wave_buffer_type_si32, 1),
+	(32, True) : (zzub.zzub_wave_buffer_type_f32, 3),
+}
+
+WAVE_FORMAT_EXTENSIBLE = 0xfffe
+
+# channels : speaker positions in an extensible header
+SPEAKER_MASKS = {
+	1 : 0x4, # front center
+	2 : 0x3, # front left, front right
+}
+
+# frames per call to render_stereo()
+CHUNK_SIZE = 8192
+
+class RenderError(Exception):
+	pass
+
+def get_plugin_paths():
+	"""
+	Returns the plugin folders from NEIL_PLUGIN_PATH, or the zzub folders
+	next to the library paths, as the Neil player looks them up.
+	"""
+	pluginpath = os.environ.get('NEIL_PLUGIN_PATH', None)
+	if pluginpath:
+		return pluginpath.split(os.pathsep)
+	paths = os.environ.get('LD_LIBRARY_PATH', '')
+	paths = [path for path in paths.split(os.pathsep) if path]
+	paths += ['/usr/local/lib64', '/usr/local/lib', '/usr/lib64', '/usr/lib']
+	pluginpaths = []
+	for path in [os.path.join(path, 'zzub') for path in paths]:
+		if os.path.exists(path) and not path in pluginpaths:
+			pluginpaths.append(path)
+	return pluginpaths
+
+class WaveWriter:
+	"""
+	Writes interleaved samples to a RIFF wave file. Formats above 16 bits
+	get a WAVE_FORMAT_EXTENSIBLE header, which readers expect for them.
+	The sizes in the header are filled in by close().
+	"""
+	def __init__(self, filename, samplerate, bits, floating=False, channels=2):
+		self.file = open(filename, 'wb')
+		self.size = 0
+		tag = WAVE_FORMATS[(bits, floating)][1]
+		blockalign = channels * bits / 8
+		extensible = bits > 16
+		fmt = struct.pack('<HHIIHH', extensible and WAVE_FORMAT_EXTENSIBLE or tag,
+			channels, samplerate, samplerate * blockalign, blockalign, bits)
+		if extensible:
+			# the format tag moves into the sub format guid
+			fmt += struct.pack('<HHI', 22, bits, SPEAKER_MASKS.get(channels, 0))
+			fmt += struct.pack('<IHH', tag, 0x0000, 0x0010) + '\x80\x00\x00\xaa\x00\x38\x9b\x71'
+		self.file.write('RIFF' + struct.pack('<I', 0) + 'WAVE')
+		self.file.write('fmt ' + struct.pack('<I', len(fmt)) + fmt)
+		self.file.write('data' + struct.pack('<I', 0))
+		self.header_size = self.file.tell()
+
+	def write(self, data):
+		self.file.write(data)
+		self.size += len(data)
+
+	def close(self):
+		pad = self.size & 1
+		if pad:
+			self.file.write('\0')
+		self.file.seek(4)
+		self.file.write(struct.pack('<I', self.header_size - 8 + self.size + pad))
+		self.file.seek(self.header_size - 4)
+		self.file.write(struct.pack('<I', self.size))
+		self.file.close()
+
+class Renderer:
+	"""
+	Renders songs without a sound card. One renderer can load and render
+	any number of songs in turn.
+	"""
+	def __init__(self, samplerate=44100, plugin_paths=None, threads=1):
+		self.samplerate = samplerate
+		self.player = zzub.Player.create()
+		if plugin_paths is None:
+			plugin_paths = get_plugin_paths()
+		for path in plugin_paths:
+			self.player.add_plugin_path(path + os.sep)
+		if self.player.initialize(samplerate) != 0:
+			raise RenderError("could not initialize the player")
+		self.driver = zzub.Audiodriver.create_silent(self.player, "render", 2, 0, 1)[0]
+		self.driver.set_samplerate(samplerate)
+		if self.driver.create_device(-1, 0) != 0:
+			raise RenderError("could not create the render device")
+		self.player.set_thread_count(threads)
+
+	def destroy(self):
+		self.player.set_thread_count(1)
+		self.driver.destroy()
+		self.player.destroy()
+
+	def load(self, filename):
+		"""
+		Loads a song, replacing the current one.
+		"""
+		self.player.clear()
+		if self.player.load_ccm(filename) != 0:
+			raise RenderError("could not load %s" % filename)
+
+	def render(self, filename, start=None, end=None, loops=1, bits=16, floating=False, tail=0.0):
+		"""
+		Renders the song from row start to row end, loops times, followed
+		by tail seconds with the player stopped so that effects can ring
+		out. start and end default to the song start and end markers.
+
+		Returns the number of frames written to the wave file filename.
+		"""
+		if not (bits, floating) in WAVE_FORMATS:
+			raise RenderError("unsupported sample format: %i bit%s" % (bits, floating and " float" or ""))
+		player = self.player
+		if start is None:
+			start = player.get_song_start()
+		if end is None:
+			end = player.get_song_end()
+		if end <= start:
+			raise RenderError("nothing to render from row %i to row %i" % (start, end))
+
+		# render_stereo() returns where the mixer would stop a song that
+		# is not looping, which is the loop end
+		player.set_loop_enabled(0)
+		player.set_loop(start, end)
+
+		format = WAVE_FORMATS[(bits, floating)][0]
+		framesize = 2 * bits / 8
+		buf = ctypes.create_string_buffer(CHUNK_SIZE * framesize)
+		writer = WaveWriter(filename, self.samplerate, bits, floating)
+		frames = 0
+		try:
+			player.set_position(start)
+			player.set_state(zzub.zzub_player_state_playing)
+			for i in range(loops):
+				if i:
+					player.set_position(start)
+				while player.get_state() == zzub.zzub_player_state_playing:
+					count = player.render_stereo(buf, CHUNK_SIZE, format)
+					writer.write(ctypes.string_at(buf, count * framesize))
+					frames += count
+					if count < CHUNK_SIZE:
+						break
+			player.set_state(zzub.zzub_player_state_stopped)
+			remaining = int(tail * self.samplerate)
+			while remaining > 0:
+				count = player.render_stereo(buf, min(remaining, CHUNK_SIZE), format)
+				if not count:
+					break
+				writer.write(ctypes.string_at(buf, count * framesize))
+				frames += count
+				remaining -= count
+		finally:
+			writer.close()
+		return frames
@@ -0,0 +1,140 @@
+#encoding: latin-1
+
+# pyzzub
+# Python bindings for libzzub
+# Copyright (C) 2006 The libzzub Development Team
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Bulk access to wavelevel sample data.
+
+get_buffer() returns the sample memory of a level without copying it,
+get_array() wraps the same memory in a numpy array of shape
+(samples, channels). write() stores samples back as a single undo step.
+
+The memory belongs to libzzub and is replaced whenever the level is
+edited, so buffers and arrays must not be kept across edits. numpy is
+only needed for get_array() and for writing arrays.
+"""
+
+import ctypes
+import zzub
+
+SAMPLE_SIZES = {
+	zzub.zzub_wave_buffer_type_si16 : 2,
+	zzub.zzub_wave_buffer_type_si24 : 3,
+	zzub.zzub_wave_buffer_type_si32 : 4,
+	zzub.zzub_wave_buffer_type_f32 : 4,
+}
+
+# si24 has no numpy type and is exposed as raw bytes
+DTYPES = {
+	zzub.zzub_wave_buffer_type_si16 : '<i2',
+	zzub.zzub_wave_buffer_type_si24 : 'u1',
+	zzub.zzub_wave_buffer_type_si32 : '<i4',
+	zzub.zzub_wave_buffer_type_f32 : '<f4',
+}
+
+# full scale of the integer formats, for writing float arrays
+SCALES = {
+	zzub.zzub_wave_buffer_type_si16 : 32767.0,
+	zzub.zzub_wave_buffer_type_si32 : 2147483647.0,
+}
+
+def get_channels(level):
+	"""
+	Returns the number of interleaved channels of a wavelevel.
+	"""
+	if level.get_wave().get_flags() & zzub.zzub_wave_flag_stereo:
+		return 2
+	return 1
+
+def get_frame_size(level):
+	"""
+	Returns the size of one frame (all channels of one sample) in bytes.
+	"""
+	return SAMPLE_SIZES[level.get_format()] * get_channels(level)
+
+def get_buffer(level):
+	"""
+	Returns the sample memory of a wavelevel as a ctypes char array.
+	memoryview() of the result gives the raw interleaved samples.
+	The buffer must be treated as read only, use write() to change it.
+	"""
+	size = level.get_sample_count() * get_frame_size(level)
+	ptr = level.get_samples()
+	if not ptr or size <= 0:
+		return (ctypes.c_char * 0)()
+	return (ctypes.c_char * size).from_address(ptr)
+
+def get_array(level):
+	"""
+	Returns a read only numpy view on the samples of a wavelevel with
+	shape (samples, channels), or (samples, channels, 3) bytes for
+	24 bit levels.
+	"""
+	import numpy
+	format = level.get_format()
+	channels = get_channels(level)
+	buf = get_buffer(level)
+	if len(buf):
+		array = numpy.frombuffer(buf, dtype=DTYPES[format])
+	else:
+		array = numpy.zeros(0, dtype=DTYPES[format])
+	if format == zzub.zzub_wave_buffer_type_si24:
+		array = array.reshape(-1, channels, 3)
+	else:
+		array = array.reshape(-1, channels)
+	array.flags.writeable = False
+	return array
+
+def to_level_array(level, data):
+	"""
+	Converts a numpy array to the format of a wavelevel. Float arrays
+	are taken to be in the range -1..1 and scaled to integer formats.
+	One dimensional arrays are taken to be interleaved.
+	"""
+	import numpy
+	format = level.get_format()
+	data = numpy.asarray(data)
+	if format in SCALES and data.dtype.kind == 'f':
+		data = numpy.clip(data, -1.0, 1.0) * SCALES[format]
+	return numpy.ascontiguousarray(data, dtype=DTYPES[format])
+
+def write(level, start, data):
+	"""
+	Overwrites samples of a wavelevel from start with data, as one undo
+	operation which sends zzub_event_type_wave_changed once committed.
+	data is a numpy array (see to_level_array()) or any other buffer
+	holding samples in the format and channel layout of the level.
+	Samples past the end of the level are ignored.
+
+	Returns the number of frames written.
+	"""
+	framesize = get_frame_size(level)
+	if hasattr(data, '__array_interface__'):
+		data = to_level_array(level, data)
+		ptr = ctypes.c_void_p(data.ctypes.data)
+		size = data.nbytes
+	else:
+		data = memoryview(data).tobytes()
+		ptr = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+		size = len(data)
+	count = min(size / framesize, level.get_sample_count() - start)
+	if count <= 0:
+		return 0
+	level.replace_sample_range(start, ptr, count)
+	return count
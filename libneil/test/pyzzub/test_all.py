@@ -140,6 +140,31 @@ class Test(TestCase):
 						self.assertTrue(not kargs)
 					break
 			self.assertTrue(found == True, "no luck finding event %s" % name)
+
+	def _read_wave(self, path):
+		"""
+		returns the format tag, channel count, bit depth and sample data of
+		a wave file. the format tag of an extensible file is the one from
+		its sub format, and extensible is set in the result.
+		"""
+		import struct
+		data = open(path, 'rb').read()
+		self.assertTrue(data[:4] == 'RIFF' and data[8:12] == 'WAVE')
+		self.assertTrue(struct.unpack('<I', data[4:8])[0] == len(data) - 8)
+		pos = 12
+		chunks = {}
+		while pos + 8 <= len(data):
+			name, size = data[pos:pos+4], struct.unpack('<I', data[pos+4:pos+8])[0]
+			chunks[name] = data[pos+8:pos+8+size]
+			pos += 8 + size + (size & 1)
+		fmt = chunks['fmt ']
+		tag, channels, samplerate, byterate, blockalign, bits = struct.unpack('<HHIIHH', fmt[:16])
+		extensible = tag == 0xfffe
+		if extensible:
+			self.assertTrue(len(fmt) == 40)
+			self.assertTrue(struct.unpack('<H', fmt[18:20])[0] == bits)
+			tag = struct.unpack('<I', fmt[24:28])[0]
+		return tag, channels, bits, extensible, chunks['data']
 		
 	def test_state_changed(self):
 		"""
@@ -293,7 +318,69 @@ class Test(TestCase):
 		self.assertTrue(pat.get_row_count() == 64)
 		self.player.undo()
 		self._handle_events()
-		
+
+	def test_pattern_columns(self):
+		"""
+		write a block of pattern values in one call, read it back and check
+		that the write is undone as a single step.
+		"""
+		pluginloader = self.player.get_pluginloader_by_name('@krzysztof_foltman/generator/infector;1')
+		self.assertTrue(pluginloader)
+		plugin = self.player.create_plugin(None, 0, "test", pluginloader)
+		pattern = plugin.create_pattern(16)
+		pattern.set_name('00')
+		plugin.add_pattern(pattern)
+		self.player.history_commit("create plugin")
+		param = plugin.get_parameter(2, 0, 0)
+		none = param.get_value_none()
+		values = [(r % 2) and param.get_value_min() or none for r in range(16)]
+		count, original = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, 16)
+		self.assertTrue(count == 16)
+		plugin.set_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, values, 16)
+		self.assertTrue(self.player.history_get_uncomitted_operations() == 1)
+		self.player.history_commit("set columns")
+		count, result = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, 16)
+		self.assertTrue(count == 16)
+		self.assertTrue(result == values)
+		self.assertTrue(plugin.get_pattern_value(0, 2, 0, 0, 1) == param.get_value_min())
+		count, result = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 32, 32)
+		self.assertTrue(count == -1)
+		self.player.undo()
+		count, result = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, 16)
+		self.assertTrue(result == original)
+		self._handle_events()
+
+	def test_pattern_rows(self):
+		"""
+		remove and insert rows in a pattern column, then undo both steps and
+		check that the column is back as it was.
+		"""
+		pluginloader = self.player.get_pluginloader_by_name('@krzysztof_foltman/generator/infector;1')
+		self.assertTrue(pluginloader)
+		plugin = self.player.create_plugin(None, 0, "test", pluginloader)
+		pattern = plugin.create_pattern(16)
+		pattern.set_name('00')
+		plugin.add_pattern(pattern)
+		self.player.history_commit("create plugin")
+		param = plugin.get_parameter(2, 0, 0)
+		none = param.get_value_none()
+		values = [param.get_value_min() + (r % 8) for r in range(16)]
+		plugin.set_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, values, 16)
+		self.player.history_commit("set columns")
+		plugin.remove_pattern_rows(0, [2, 0, 0], 1, 4, 2)
+		self.player.history_commit("remove rows")
+		count, result = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, 16)
+		self.assertTrue(result == values[:4] + values[6:] + [none, none])
+		plugin.insert_pattern_rows(0, [2, 0, 0], 1, 4, 2)
+		self.player.history_commit("insert rows")
+		count, result = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, 16)
+		self.assertTrue(result == values[:4] + [none, none] + values[6:])
+		self.player.undo()
+		self.player.undo()
+		count, result = plugin.get_pattern_columns(0, 2, 0, 1, 0, 1, 0, 16, 16)
+		self.assertTrue(result == values)
+		self._handle_events()
+
 	def test_enumerate_plugin(self):
 		self.assertTrue(self.player.history_get_uncomitted_operations() == 0)
 		self.assertTrue(self.player.get_plugin_count() == 1)
@@ -332,6 +419,208 @@ class Test(TestCase):
 		self._handle_events()
 		self.assertTrue(self.player.history_get_size() == 0)
 
+	def test_wavelevel_samples(self):
+		"""
+		load a sample, read it through zzub.samples, overwrite the end of it
+		and check that the write is a single undoable operation.
+		"""
+		import struct, tempfile
+		import wave as wavefile
+		from zzub import samples
+		path = tempfile.mktemp('.wav')
+		f = wavefile.open(path, 'wb')
+		f.setnchannels(1)
+		f.setsampwidth(2)
+		f.setframerate(44100)
+		f.writeframes(struct.pack('<64h', *range(64)))
+		f.close()
+		wave = self.player.get_wave(0)
+		stream = Input.open_file(path)
+		self.assertTrue(wave.load_sample(0, 0, 0, path, stream) != 0)
+		stream.destroy()
+		os.remove(path)
+		self.player.history_commit("load sample")
+		level = wave.get_level(0)
+		self.assertTrue(level.get_sample_count() == 64)
+		self.assertTrue(samples.get_channels(level) == 1)
+		data = memoryview(samples.get_buffer(level)).tobytes()
+		self.assertTrue(struct.unpack('<64h', data) == tuple(range(64)))
+		self._handle_events()
+		self.assertTrue(samples.write(level, 60, struct.pack('<8h', *([-1] * 8))) == 4)
+		self.assertTrue(self.player.history_get_uncomitted_operations() == 1)
+		self.player.history_commit("write samples")
+		self._handle_events()
+		self._check_protocol([
+			('zzub_wave_changed', dict(wave=wave)),
+		])
+		data = memoryview(samples.get_buffer(level)).tobytes()
+		self.assertTrue(struct.unpack('<64h', data) == tuple(range(60)) + (-1,) * 4)
+		self.player.undo()
+		data = memoryview(samples.get_buffer(level)).tobytes()
+		self.assertTrue(struct.unpack('<64h', data) == tuple(range(64)))
+
+	def test_render(self):
+		"""
+		render a song offline with zzub.render and check that every loop has
+		the same length and the tail is added after the last one.
+		"""
+		import tempfile
+		from zzub.render import Renderer
+		song = tempfile.mktemp('.ccm')
+		self.assertTrue(self.player.save_ccm(song) == 0)
+		renderer = Renderer(44100, ['../../lib/zzub'])
+		try:
+			renderer.load(song)
+			path = tempfile.mktemp('.wav')
+			once = renderer.render(path, start=0, end=4)
+			self.assertTrue(once > 0)
+			twice = renderer.render(path, start=0, end=4, loops=2, bits=24, tail=0.1)
+			self.assertTrue(twice == once * 2 + 4410)
+			tag, channels, bits, extensible, data = self._read_wave(path)
+			self.assertTrue((tag, channels, bits, extensible) == (1, 2, 24, True))
+			self.assertTrue(len(data) == twice * 6)
+			os.remove(path)
+		finally:
+			renderer.destroy()
+			os.remove(song)
+
+	def test_render_full_scale(self):
+		"""
+		render a full scale sample played louder than full scale as 32 bit
+		float and as 32 bit integer, and check that the integer output
+		saturates instead of wrapping around to negative values.
+		"""
+		import array, struct, tempfile
+		import wave as wavefile
+		from zzub.render import Renderer
+		path = tempfile.mktemp('.wav')
+		f = wavefile.open(path, 'wb')
+		f.setnchannels(1)
+		f.setsampwidth(2)
+		f.setframerate(44100)
+		f.writeframes(struct.pack('<h', 32767) * 44100)
+		f.close()
+		wave = self.player.get_wave(0)
+		stream = Input.open_file(path)
+		self.assertTrue(wave.load_sample(0, 0, 0, path, stream) != 0)
+		stream.destroy()
+		os.remove(path)
+		wave.set_volume(2.0)
+		pluginloader = self.player.get_pluginloader_by_name('@rift.dk/generator/Matilde+Tracker;1.5')
+		self.assertTrue(pluginloader)
+		plugin = self.player.create_plugin(None, 0, "tracker", pluginloader)
+		pattern = plugin.create_pattern(4)
+		pattern.set_name('00')
+		plugin.add_pattern(pattern)
+		plugin.set_pattern_value(0, 2, 0, 0, 0, 0x41)
+		plugin.set_pattern_value(0, 2, 0, 1, 0, 1)
+		plugin.set_pattern_value(0, 2, 0, 2, 0, 0xfe)
+		t = self.player.create_sequence(plugin)
+		t.set_event(0, 0x10)
+		self.player.get_plugin(0).add_input(plugin, zzub_connection_type_audio)
+		self.player.history_commit("create tracker")
+		song = tempfile.mktemp('.ccm')
+		self.assertTrue(self.player.save_ccm(song) == 0)
+		renderer = Renderer(44100, ['../../lib/zzub'])
+		try:
+			renderer.load(song)
+			samples = []
+			for floating, typecode in [(True, 'f'), (False, 'i')]:
+				path = tempfile.mktemp('.wav')
+				self.assertTrue(renderer.render(path, start=0, end=4, bits=32, floating=floating) > 0)
+				tag, channels, bits, extensible, data = self._read_wave(path)
+				self.assertTrue((tag, bits, extensible) == (floating and 3 or 1, 32, True))
+				samples.append(array.array(typecode, data))
+				os.remove(path)
+		finally:
+			renderer.destroy()
+			os.remove(song)
+		floats, ints = samples
+		self.assertTrue(len(floats) == len(ints))
+		self.assertTrue(max(floats) > 1.0)
+		self.assertTrue(max(ints) == 0x7fffffff)
+		for a, b in zip(floats, ints):
+			if a >= 1.0:
+				self.assertTrue(b == 0x7fffffff, "%f rendered as %i" % (a, b))
+			elif a > 0.0:
+				self.assertTrue(b >= 0, "%f rendered as %i" % (a, b))
+
+	def test_render_threads(self):
+		"""
+		render a song with several generators playing at once on one thread
+		and on four threads, and check that the output is the same. an lfo
+		controls one of the generators, and two audio outputs write to the
+		same driver channels.
+		"""
+		import tempfile
+		from zzub.render import Renderer
+		pluginloader = self.player.get_pluginloader_by_name('@krzysztof_foltman/generator/infector;1')
+		self.assertTrue(pluginloader)
+		master = self.player.get_plugin(0)
+		plugins = []
+		for i in range(4):
+			plugin = self.player.create_plugin(None, 0, "test%i" % i, pluginloader)
+			pattern = plugin.create_pattern(16)
+			pattern.set_name('00')
+			plugin.add_pattern(pattern)
+			plugin.set_pattern_value(0, 2, 0, 0, 0, 0x41 + i)
+			t = self.player.create_sequence(plugin)
+			t.set_event(0, 0x10)
+			master.add_input(plugin, zzub_connection_type_audio)
+			plugins.append(plugin)
+		pluginloader = self.player.get_pluginloader_by_name('@trac.zeitherrschaft.org/aldrin/lunar/controller/LunarLFO;1')
+		self.assertTrue(pluginloader)
+		lfo = self.player.create_plugin(None, 0, "lfo", pluginloader)
+		plugins[0].add_input(lfo, zzub_connection_type_event)
+		# lfo out to the filter cutoff
+		plugins[0].add_event_connection_binding(lfo, 0, 1, 0, 15)
+		pluginloader = self.player.get_pluginloader_by_name('@zzub.org/output')
+		self.assertTrue(pluginloader)
+		for i in range(2):
+			output = self.player.create_plugin(None, 0, "output%i" % i, pluginloader)
+			output.add_input(plugins[i], zzub_connection_type_audio)
+		self.player.history_commit("create plugins")
+		song = tempfile.mktemp('.ccm')
+		self.assertTrue(self.player.save_ccm(song) == 0)
+		data = []
+		try:
+			for threads in [1, 4]:
+				renderer = Renderer(44100, ['../../lib/zzub'], threads)
+				try:
+					renderer.load(song)
+					path = tempfile.mktemp('.wav')
+					self.assertTrue(renderer.render(path, start=0, end=16) > 0)
+					data.append(open(path, 'rb').read())
+					os.remove(path)
+				finally:
+					renderer.destroy()
+		finally:
+			os.remove(song)
+		self.assertTrue(data[0] == data[1])
+
+	def test_render_batch(self):
+		"""
+		render a folder of songs in two worker processes with zzub.batch.
+		"""
+		import shutil, tempfile
+		from zzub.batch import find_songs, render_batch
+		folder = tempfile.mkdtemp()
+		try:
+			os.mkdir(os.path.join(folder, 'sub'))
+			for name in ['a.ccm', os.path.join('sub', 'b.ccm')]:
+				self.assertTrue(self.player.save_ccm(os.path.join(folder, name)) == 0)
+			songs = find_songs(folder)
+			self.assertTrue([name for songfile, name in songs] == ['a.ccm', os.path.join('sub', 'b.ccm')])
+			outdir = os.path.join(folder, 'out')
+			results = render_batch(songs, outdir, 2, plugin_paths=['../../lib/zzub'], start=0, end=4)
+			for result in results:
+				self.assertTrue(result.error is None)
+				self.assertTrue(result.frames > 0)
+				self.assertTrue(result.get_realtime_factor() > 0)
+			self.assertTrue(os.path.isfile(os.path.join(outdir, 'sub', 'b.wav')))
+		finally:
+			shutil.rmtree(folder)
+
 if __name__ == '__main__':
     main()
 
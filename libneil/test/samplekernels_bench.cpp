@@ -0,0 +1,135 @@
+// micro-benchmark for the libzzub sample kernels. compares the per-sample
+// switch used by the old waveform digest and the CopySamplesT conversions
+// with the kernels in src/libzzub/samplekernels.cpp, and checks that the
+// results agree.
+//
+// build and run from libneil/ after scons has generated include/zzub/zzub.h:
+//   g++ -O2 -Iinclude -Iinclude/zzub -Isrc/libzzub test/samplekernels_bench.cpp \
+//     src/libzzub/samplekernels.cpp -o /tmp/samplekernels_bench
+//   /tmp/samplekernels_bench
+
+#include <algorithm>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+#include <sys/time.h>
+#include "zzub/plugin.h"
+#include "samplekernels.h"
+
+using namespace zzub;
+
+static double now() {
+  timeval tv;
+  gettimeofday(&tv, 0);
+  return tv.tv_sec + tv.tv_usec / 1000000.0;
+}
+
+// the digest loop as it was before the kernels
+static float read_sample(const unsigned char* samples, int offset, int bps, int format, float scaler) {
+  int isample = 0;
+  switch (bps) {
+  case 2: isample = *(short*)&samples[offset]; break;
+  case 4:
+    switch (format) {
+    case wave_buffer_type_si32:
+      isample = *(int*)&samples[offset];
+      break;
+    case wave_buffer_type_f32:
+      isample = (int)((*(float*)&samples[offset]) / scaler);
+      break;
+    }
+    break;
+  }
+  return (float)(isample) * scaler;
+}
+
+static void scan_reference(const void* samples, int format, int bps, int channels, int channel, int count, float& minimum, float& maximum, float& power) {
+  // the old code had 1<<31 here, which flipped the sign of si32 samples
+  float scaler = 1.0f / (float)(1u<<(bps * 8 - 1));
+  for (int s = 0; s < count; s++) {
+    float sample = read_sample((const unsigned char*)samples, (s * channels + channel) * bps, bps, format, scaler);
+    minimum = std::min(minimum, sample);
+    maximum = std::max(maximum, sample);
+    power += sample * sample;
+  }
+}
+
+static void bench_scan(const char* name, const void* samples, int format, int bps, int channels, int frames, int runs) {
+  float rmin = 1, rmax = -1, rpow = 0, kmin = 1, kmax = -1, kpow = 0;
+  double t0 = now();
+  for (int r = 0; r < runs; r++) {
+    rmin = 1; rmax = -1; rpow = 0;
+    scan_reference(samples, format, bps, channels, channels - 1, frames, rmin, rmax, rpow);
+  }
+  double t1 = now();
+  for (int r = 0; r < runs; r++) {
+    kmin = 1; kmax = -1; kpow = 0;
+    scan_samples(samples, format, channels, channels - 1, 0, frames, kmin, kmax, kpow);
+  }
+  double t2 = now();
+  // the single float accumulator of the switch loop drifts over millions of
+  // samples, the kernel sums in four lanes, so power only agrees roughly
+  bool ok = std::fabs(rmin - kmin) < 1e-4f && std::fabs(rmax - kmax) < 1e-4f && std::fabs(rpow - kpow) < 1e-2f * rpow;
+  printf("scan %-12s switch %8.2f ms  kernel %8.2f ms  %5.1fx  %s\n", name,
+    (t1 - t0) * 1000 / runs, (t2 - t1) * 1000 / runs, (t1 - t0) / (t2 - t1), ok ? "ok" : "MISMATCH");
+}
+
+template <typename S, typename D>
+static void convert_reference(const S* src, D* dst, size_t count);
+
+template <> void convert_reference(const short* src, float* dst, size_t count) {
+  for (size_t i = 0; i < count; i++) dst[i] = (float)src[i] / 32767.0f;
+}
+template <> void convert_reference(const float* src, short* dst, size_t count) {
+  for (size_t i = 0; i < count; i++) dst[i] = (short)(std::max(std::min(src[i],1.0f),-1.0f) * 32767.0f);
+}
+template <> void convert_reference(const int* src, float* dst, size_t count) {
+  for (size_t i = 0; i < count; i++) dst[i] = (float)src[i] / 2147483648.0f;
+}
+template <> void convert_reference(const float* src, int* dst, size_t count) {
+  for (size_t i = 0; i < count; i++) dst[i] = (int)(std::max(std::min(src[i],1.0f),-1.0f) * 2147483648.0f);
+}
+
+template <typename S, typename D>
+static void bench_convert(const char* name, const S* src, size_t count, void (*kernel)(const S*, D*, size_t), int runs) {
+  std::vector<D> a(count), b(count);
+  double t0 = now();
+  for (int r = 0; r < runs; r++) convert_reference(src, &a.front(), count);
+  double t1 = now();
+  for (int r = 0; r < runs; r++) kernel(src, &b.front(), count);
+  double t2 = now();
+  bool ok = std::equal(a.begin(), a.end(), b.begin());
+  printf("convert %-9s scalar %8.2f ms  kernel %8.2f ms  %5.1fx  %s\n", name,
+    (t1 - t0) * 1000 / runs, (t2 - t1) * 1000 / runs, (t1 - t0) / (t2 - t1), ok ? "identical" : "MISMATCH");
+}
+
+int main() {
+  const int frames = 1 << 22;
+  const int runs = 10;
+  std::vector<short> s16(frames * 2);
+  std::vector<int> s32(frames * 2);
+  std::vector<float> f32(frames * 2);
+  srand(1);
+  for (int i = 0; i < frames * 2; i++) {
+    float v = sinf(i * 0.001f) * 0.8f + (rand() % 2000 - 1000) / 10000.0f;
+    s16[i] = (short)(v * 32767);
+    s32[i] = (int)(v * 2147483647.0);
+    f32[i] = v;
+  }
+
+  bench_scan("si16 mono", &s16.front(), wave_buffer_type_si16, 2, 1, frames, runs);
+  bench_scan("si16 stereo", &s16.front(), wave_buffer_type_si16, 2, 2, frames, runs);
+  bench_scan("si32 stereo", &s32.front(), wave_buffer_type_si32, 4, 2, frames, runs);
+  bench_scan("f32 mono", &f32.front(), wave_buffer_type_f32, 4, 1, frames, runs);
+  bench_scan("f32 stereo", &f32.front(), wave_buffer_type_f32, 4, 2, frames, runs);
+
+  // full scale and clipped input for the float conversions
+  f32[123] = 1.0f;
+  f32[456] = -1.5f;
+  bench_convert<short, float>("si16>f32", &s16.front(), s16.size(), convert_si16_to_f32, runs);
+  bench_convert<float, short>("f32>si16", &f32.front(), f32.size(), convert_f32_to_si16, runs);
+  bench_convert<int, float>("si32>f32", &s32.front(), s32.size(), convert_si32_to_f32, runs);
+  bench_convert<float, int>("f32>si32", &f32.front(), f32.size(), convert_f32_to_si32, runs);
+  return 0;
+}
@@ -77,6 +77,8 @@ CONFIG_OPTIONS = dict(
 	LedDraw = dict(default=True,doc="the led draw option."),
 	PatNoteOff = dict(func='pattern_noteoff',default=False,doc="pattern noteoff option."),
 	CurveArrows = dict(default=False,doc="the draw connection curves option."),
+	EventPollBudget = dict(default=10,doc="the time in milliseconds the user interface may spend handling player events per update."),
+	AudioThreads = dict(default=1,doc="the number of threads that process plugins, including the audio thread."),
 	),
     PluginListBrowser = dict(
 	SearchTerm = dict(func='pluginlistbrowser_search_term',default='',vtype=str,doc="the current plugin search mask."),
@@ -24,7 +24,7 @@ please note:
 	objects connect their own methods.
 """
 
-import sys, weakref
+import sys, weakref, time, json
 
 EVENTS = [
 	# these might become obsolete
@@ -53,6 +53,7 @@ EVENTS = [
 	'solo_plugin_changed', # (plugin, ...) called when player.solo_plugin changes.
 	'document_path_changed', # (path, ...) called when player.document_path changes.
 	'document_loaded', # (...) called when load_* is called.
+	'document_cleared', # (...) called when clear is called.
 	
 	# libzzub events, translation is done in player.py
 	# note that these events shall never be called from the application
@@ -97,12 +98,63 @@ EVENTS = [
 	'zzub_wave_changed', # ( wave,... )
 ]
 
+class EventProfile:
+	"""
+	collects call count, total time and worst time per event
+	and per handler of an event.
+	"""
+	def __init__(self):
+		self.events = {}
+		self.handlers = {}
+		
+	def add(self, table, key, duration):
+		entry = table.get(key)
+		if entry is None:
+			table[key] = [1, duration, duration]
+		else:
+			entry[0] += 1
+			entry[1] += duration
+			if duration > entry[2]:
+				entry[2] = duration
+				
+	def get_stats(self):
+		"""
+		returns a dict of event name => dict(count, total, worst, handlers),
+		where handlers maps handler names to dict(count, total, worst).
+		times are in seconds.
+		"""
+		def todict(entry):
+			count, total, worst = entry
+			return dict(count=count, total=total, worst=worst)
+		stats = {}
+		for name, entry in self.events.iteritems():
+			stats[name] = todict(entry)
+			stats[name]['handlers'] = {}
+		for (name, handlername), entry in self.handlers.iteritems():
+			stats[name]['handlers'][handlername] = todict(entry)
+		return stats
+		
+	def print_stats(self):
+		stats = self.get_stats()
+		print "%-40s %8s %10s %10s" % ("event / handler", "calls", "total ms", "worst ms")
+		bytotal = lambda item: -item[1]['total']
+		for name, stat in sorted(stats.iteritems(), key=bytotal):
+			print "%-40s %8i %10.2f %10.2f" % (name, stat['count'], stat['total'] * 1000, stat['worst'] * 1000)
+			for handlername, hstat in sorted(stat['handlers'].iteritems(), key=bytotal):
+				print "  %-38s %8i %10.2f %10.2f" % (handlername, hstat['count'], hstat['total'] * 1000, hstat['worst'] * 1000)
+				
+	def to_json(self):
+		return json.dumps(self.get_stats(), indent=1, sort_keys=True)
+
 class EventHandlerList:
 	def __init__(self, name, handlers=None):
 		self.name = name
 		if not handlers:
 			handlers = []
 		self.handlers = handlers
+		# EventProfile while profiling, None otherwise
+		self.profile = None
+		self.compile()
 		
 	def __add__(self, funcargs):
 		func = None
@@ -118,38 +170,101 @@ class EventHandlerList:
 		ref = None
 		funcname = None
 		if hasattr(func, 'im_self'):
-			ref = weakref.ref(func.im_self)
+			ref = weakref.ref(func.im_self, self.on_dead_reference)
 			funcname = func.__name__
 		else:
-			ref = weakref.ref(func)
-		handler = EventHandlerList(self.name, self.handlers)
-		handler.handlers.append((ref,funcname,args))
-		return handler
+			ref = weakref.ref(func, self.on_dead_reference)
+		self.handlers.append((ref,funcname,args))
+		self.compile()
+		return self
 		
 	def __len__(self):
 		return len(self.handlers)
 		
+	def compile(self):
+		"""
+		prepares the tuple of (ref, function, args) that __call__ walks.
+		for methods, the function is looked up once and called with the
+		dereferenced object as first argument.
+		"""
+		compiled = []
+		for ref,funcname,args in self.handlers:
+			obj = ref()
+			if obj is None:
+				continue
+			func = None
+			if funcname:
+				func = getattr(obj, funcname).im_func
+			compiled.append((ref,func,args))
+		self.compiled = tuple(compiled)
+		
+	def on_dead_reference(self, deadref):
+		"""
+		called by weakref when a handler object goes away.
+		"""
+		self.handlers = [(ref,funcname,args) for ref,funcname,args in self.handlers if ref is not deadref]
+		self.compile()
+		
 	def filter_dead_references(self):
 		"""
 		filter handlers from dead references
 		"""
 		self.handlers = [(ref,funcname,args) for ref,funcname,args in self.handlers if ref()]
+		self.compile()
 		
 	def __call__(self, *cargs):
-		self.filter_dead_references()
+		if not self.compiled:
+			return None
+		if self.profile is not None:
+			return self.profiled_call(cargs)
 		result = None
-		for ref,funcname,args in self:
-			if funcname:
-				func = getattr(ref(), funcname)
-			else:
-				func = ref()
+		# the compiled tuple is replaced, never changed, when handlers
+		# are added or removed, so it is safe to walk while dispatching.
+		handlers = iter(self.compiled)
+		while True:
 			try:
-				fargs = cargs + args
-				result = func(*fargs) or result
+				for ref,func,args in handlers:
+					obj = ref()
+					if obj is None:
+						continue
+					if args:
+						fargs = cargs + args
+					else:
+						fargs = cargs
+					if func:
+						result = func(obj, *fargs) or result
+					else:
+						result = obj(*fargs) or result
+				return result
 			except:
+				# report and carry on with the next handler
 				sys.excepthook(*sys.exc_info())
-		return result
 				
+	def profiled_call(self, cargs):
+		"""
+		same as __call__, but records the time spent in each handler.
+		"""
+		profile = self.profile
+		result = None
+		t0 = time.time()
+		for ref,func,args in self.compiled:
+			obj = ref()
+			if obj is None:
+				continue
+			t1 = time.time()
+			try:
+				if func:
+					handlername = obj.__class__.__name__ + '.' + func.__name__
+					result = func(obj, *(cargs + args)) or result
+				else:
+					handlername = getattr(obj, '__name__', repr(obj))
+					result = obj(*(cargs + args)) or result
+			except:
+				sys.excepthook(*sys.exc_info())
+			profile.add(profile.handlers, (self.name, handlername), time.time() - t1)
+		profile.add(profile.events, self.name, time.time() - t0)
+		return result
+		
 	def __iter__(self):
 		return iter(self.handlers)
 		
@@ -171,6 +286,8 @@ class EventBus(object):
 	
 	def __init__(self):
 		self.handlers = []
+		# EventProfile while profiling, None otherwise
+		self.profile = None
 		for name in self.names:
 			attrname = name.replace('-','_')
 			self.handlers.append(attrname)
@@ -190,14 +307,58 @@ class EventBus(object):
 		for idstr in sorted(self.handlers):
 			handlerlist = getattr(self, idstr)
 			handlerlist.print_mapping()
+			
+	def enable_profiling(self, enable=True):
+		"""
+		starts recording call counts and handler timings for all events.
+		enabling again discards the data collected so far.
+		"""
+		if enable:
+			self.profile = EventProfile()
+		else:
+			self.profile = None
+		for idstr in self.handlers:
+			getattr(self, idstr).profile = self.profile
+			
+	def print_profile(self):
+		profile = self.profile
+		if not profile:
+			print "event profiling is disabled, enable it with profile_events()."
+			return
+		profile.print_stats()
+		
+	def export_profile(self, filename=None):
+		"""
+		returns the recorded profile as JSON, and writes it to
+		filename if given.
+		"""
+		profile = self.profile
+		if not profile:
+			return None
+		data = profile.to_json()
+		if filename:
+			f = open(filename, 'w')
+			f.write(data)
+			f.close()
+		return data
 
 class NeilEventBus(EventBus):
 	__neil__ = dict(
 		id = 'neil.core.eventbus',
 		singleton = True,
+		categories = [
+			'pythonconsole.locals',
+		],
 	)	
 	
 	names = EVENTS
+	
+	def register_locals(self, locs):
+		locs.update(dict(
+			profile_events = self.enable_profiling,
+			event_profile = self.print_profile,
+			export_event_profile = self.export_profile,
+		))
 
 __all__ = [
 'GlobalEventBus',
@@ -4,11 +4,25 @@ import os
 import pickle
 import neil.com as com
 from neil.utils import roundint, bn2mn, mn2bn, new_stock_image_button
-from neil.utils import gettext, error
+from neil.utils import gettext, error, transform_pattern_columns
+import numpy as np
 from random import *
 from math import *
 from neil.gtkcodebuffer import CodeBuffer, SyntaxLoader, add_syntax_path
 
+def uses_names(code, names):
+    """
+    Returns True if a code object, or any code nested in it,
+    refers to one of the given names.
+    """
+    for name in names:
+        if name in code.co_names:
+            return True
+    for const in code.co_consts:
+        if hasattr(const, 'co_names') and uses_names(const, names):
+            return True
+    return False
+
 class Expression():
     __neil__ = dict(
         id = 'neil.core.expression',
@@ -19,6 +33,8 @@ class Expression():
     EXPRESSIONS_FILE = os.path.expanduser('~/.neil/expressions.txt')
     name = "Expression"
     expressions = {}
+    # compiled code objects by expression source
+    code_cache = {}
 
     def read_expressions(self):
         fd = open(self.EXPRESSIONS_FILE, 'r')
@@ -86,6 +102,61 @@ class Expression():
             name = model.get_value(active, 0)
             self.text.get_buffer().set_text(self.expressions[name])
 
+    def compile_expression(self, expr):
+        code = self.code_cache.get(expr)
+        if code is None:
+            code = compile(expr, '<expression>', 'exec')
+            self.code_cache[expr] = code
+        return code
+
+    def get_namespace(self):
+        global_ = globals()
+        return {
+            '__builtins__' : global_['__builtins__'],
+            '__name__' : global_['__name__'],
+            '__doc__' : global_['__doc__'],
+            '__package__' : global_['__package__'],
+            'np' : np,
+            }
+
+    def transform_columns(self, code, plugin, pattern, selection):
+        """
+        Runs the expression once per selected column. The expression sees
+        the column as NumPy arrays: row (row indices) and values (current
+        values), plus vmin, vmax and none of the parameter, and replaces or
+        modifies values. All columns are written back in one operation.
+        """
+        columns = {}
+        for row, group, track, index in selection:
+            columns.setdefault((group, track, index), []).append(row)
+        keys = sorted(columns.keys())
+        n = plugin.get_pattern_length(pattern)
+
+        def transform(data):
+            result = []
+            for (group, track, index), (values, param) in zip(keys, data):
+                vmin = param.get_value_min()
+                vmax = param.get_value_max()
+                none = param.get_value_none()
+                namespace = self.get_namespace()
+                namespace.update({
+                    'row' : np.array(columns[(group, track, index)]),
+                    'values' : np.array(values),
+                    'vmin' : vmin,
+                    'vmax' : vmax,
+                    'none' : none,
+                    'group' : group,
+                    'track' : track,
+                    'index' : index,
+                    'n' : n,
+                    })
+                exec code in namespace
+                output = np.zeros(len(values), dtype=int) + np.asarray(namespace['values'], dtype=int)
+                output = np.where(output == none, none, np.clip(output, vmin, vmax))
+                result.append(output.tolist())
+            return result
+        transform_pattern_columns(plugin, pattern, columns, transform)
+
     def transform(self, plugin, pattern, selection):
         try:
             self.read_expressions()
@@ -145,6 +216,11 @@ class Expression():
             else:
                 return
             try:
+                code = self.compile_expression(expr)
+                if not uses_names(code, ('get_value', 'set_value', 'get_param')):
+                    self.transform_columns(code, plugin, pattern, selection)
+                    return
+                # expressions using the per cell functions work on the live pattern
                 def get_value(group, track, index, row):
                     return plugin.get_pattern_value(pattern, group, 
                                                     track, index, row)
@@ -153,18 +229,14 @@ class Expression():
                                              index, row, value)
                 def get_param(group, track, index):
                     return plugin.get_parameter(group, track, index)
-                global_ = globals()
-                new_global = {
-                    '__builtins__' : global_['__builtins__'], 
-                    '__name__' : global_['__name__'], 
-                    '__doc__' : global_['__doc__'], 
-                    '__package__' : global_['__package__'],
+                new_global = self.get_namespace()
+                new_global.update({
                     'get_value' : get_value,
                     'set_value' : set_value,
                     'get_param' : get_param,
                     'n' : plugin.get_pattern_length(pattern),
-                    }
-                exec expr in new_global
+                    })
+                exec code in new_global
             except Exception as e:
                 error(self.dialog, "There was a problem with your expression!", details=str(e))
 
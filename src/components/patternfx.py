@@ -21,12 +21,15 @@ class SimpleRandom():
     name = "Simple Random"
 
     def transform(self, data, parameter):
-        for row in range(len(data)):
+        return self.transform_columns([(data, parameter)])[0]
+
+    def transform_columns(self, columns):
+        result = []
+        for data, parameter in columns:
             a = parameter.get_value_min()
             b = parameter.get_value_max()
-            value = randint(a, b)
-            data[row] = value
-        return data
+            result.append([randint(a, b) for row in xrange(len(data))])
+        return result
 
 class RandomWalk():
     __neil__ = dict(
@@ -39,6 +42,12 @@ class RandomWalk():
     name = "Random Walk"
 
     def transform(self, data, parameter):
+        return self.transform_columns([(data, parameter)])[0]
+
+    def transform_columns(self, columns):
+        # one dialog for all columns, covering the range of all parameters
+        value_min = min([parameter.get_value_min() for data, parameter in columns])
+        value_max = max([parameter.get_value_max() for data, parameter in columns])
         dialog = gtk.Dialog(
             "Random Walk",
             buttons=(gtk.STOCK_OK, True, gtk.STOCK_CANCEL, False)
@@ -48,19 +57,19 @@ class RandomWalk():
         grid.attach(gtk.Label("Min Step:"), 0, 1, 1, 2)
         grid.attach(gtk.Label("Max Step:"), 0, 1, 2, 3)
         start_box = gtk.SpinButton(gtk.Adjustment(
-                parameter.get_value_min(),
-                parameter.get_value_min(),
-                parameter.get_value_max(),
+                value_min,
+                value_min,
+                value_max,
                 1))
         min_box = gtk.SpinButton(gtk.Adjustment(
                 1,
                 1,
-                parameter.get_value_max(),
+                value_max,
                 1))
         max_box = gtk.SpinButton(gtk.Adjustment(
                 1,
                 1,
-                parameter.get_value_max(),
+                value_max,
                 1))
         grid.attach(start_box, 1, 2, 0, 1)
         grid.attach(min_box, 1, 2, 1, 2)
@@ -72,21 +81,26 @@ class RandomWalk():
         min_step = min_box.get_value()
         max_step = max_box.get_value()
         dialog.destroy()
-        value = start
-        if response:
-            for row in range(len(data)):
+        if not response:
+            return [data for data, parameter in columns]
+        result = []
+        for data, parameter in columns:
+            a = parameter.get_value_min()
+            b = parameter.get_value_max()
+            value = min(max(start, a), b)
+            for row in xrange(len(data)):
                 data[row] = int(value)
                 if randint(0, 1) == 0:
                     value += randint(min_step, max_step)
                 else:
                     value -= randint(min_step, max_step)
-                while (value > parameter.get_value_max() or
-                       value < parameter.get_value_min()):
-                    if value > parameter.get_value_max():
-                        value = 2 * parameter.get_value_max() - value
-                    if value < parameter.get_value_min():
-                        value = 2 * parameter.get_value_min() - value
-        return data
+                while value > b or value < a:
+                    if value > b:
+                        value = 2 * b - value
+                    if value < a:
+                        value = 2 * a - value
+            result.append(data)
+        return result
 
 class LinearTransform():
     __neil__ = dict(
@@ -99,6 +113,9 @@ class LinearTransform():
     name = "Linear Transform"
 
     def transform(self, data, parameter):
+        return self.transform_columns([(data, parameter)])[0]
+
+    def transform_columns(self, columns):
         dialog = gtk.Dialog(
             "Linear Transform",
             buttons=(gtk.STOCK_OK, True, gtk.STOCK_CANCEL, False)
@@ -121,15 +138,22 @@ class LinearTransform():
             add = int(add.get_text())
             mul = float(mul.get_text())
         except(ValueError):
-            return data
+            return [data for data, parameter in columns]
         dialog.destroy()
-        if response:
-            for row in range(len(data)):
-                if data[row] != parameter.get_value_none():
-                    data[row] = int(data[row] * mul + add)
-                    data[row] = min(data[row], parameter.get_value_max())
-                    data[row] = max(data[row], parameter.get_value_min())
-        return data
+        if not response:
+            return [data for data, parameter in columns]
+        result = []
+        for data, parameter in columns:
+            none = parameter.get_value_none()
+            a = parameter.get_value_min()
+            b = parameter.get_value_max()
+            values = []
+            for v in data:
+                if v != none:
+                    v = max(min(int(v * mul + add), b), a)
+                values.append(v)
+            result.append(values)
+        return result
 
 class Envelope():
     __neil__ = dict(
@@ -29,6 +29,7 @@ if __name__ == '__main__':
     raise SystemExit
 
 import neil.com as com
+from collections import OrderedDict
 import gtk
 import gobject
 import pango
@@ -39,6 +40,7 @@ from neil.utils import error, get_new_pattern_name
 from neil.utils import Menu, AcceleratorMap
 from neil.utils import new_stock_image_button, show_machine_manual
 from neil.utils import filenameify
+from neil.utils import read_pattern_columns, transform_pattern_columns
 
 import zzub
 import neil.common as common
@@ -521,6 +523,90 @@ t2si = [2, 1, 2, 4]
 t2siofs = [[0, 2], [0], [0, 1], [0, 1, 2, 3]]
 
 
+class ValueTable(dict):
+    """
+    Maps pattern values to their text for one parameter type and none value.
+
+    Note, switch and byte tables are filled for all 256 values up front,
+    word values are formatted on first use and remembered.
+    """
+
+    def __init__(self, paramtype, value_none):
+        dict.__init__(self)
+        self.paramtype = paramtype
+        self.value_none = value_none
+        if paramtype != zzub.zzub_parameter_type_word:
+            for v in xrange(256):
+                try:
+                    self.__missing__(v)
+                except IndexError:
+                    # not a valid note
+                    pass
+
+    def get_value_none(self):
+        # stands in for the parameter when calling the t2c formatters
+        return self.value_none
+
+    def __nonzero__(self):
+        # note2str tests the parameter for truth, even while we're empty
+        return True
+
+    def __missing__(self, v):
+        s = t2c[self.paramtype](self, v)
+        self[v] = s
+        return s
+
+value_tables = {}
+
+
+def get_value_table(paramtype, value_none):
+    """
+    Returns the shared value table for a parameter type and none value.
+    """
+    key = (paramtype, value_none)
+    table = value_tables.get(key)
+    if table is None:
+        table = ValueTable(paramtype, value_none)
+        value_tables[key] = table
+    return table
+
+
+def get_value_table_from_param(p):
+    return get_value_table(p.get_type(), p.get_value_none())
+
+# value tables of plugin parameters by (pluginloader uri, group), dropped
+# whenever the number of pluginloaders changes.
+param_tables = {}
+param_tables_loader_count = [None]
+
+
+def get_param_tables(plugin, group, track=0):
+    """
+    Returns the value tables for all parameters of a group.
+
+    @param plugin: Plugin.
+    @type plugin: zzub.Plugin
+    @return: One value table per parameter.
+    @rtype: [ValueTable, ...]
+    """
+    if group == CONN:
+        # connection parameters depend on the connection, not the loader
+        return [get_value_table_from_param(plugin.get_parameter(group, track, i))
+                for i in xrange(plugin.get_parameter_count(group, track))]
+    player = com.get('neil.core.player')
+    loader_count = player.get_pluginloader_count()
+    if param_tables_loader_count[0] != loader_count:
+        param_tables.clear()
+        param_tables_loader_count[0] = loader_count
+    key = (plugin.get_pluginloader().get_uri(), group)
+    tables = param_tables.get(key)
+    if tables is None:
+        tables = [get_value_table_from_param(plugin.get_parameter(group, 0, i))
+                  for i in xrange(plugin.get_parameter_count(group, 0))]
+        param_tables[key] = tables
+    return tables
+
+
 import config
 
 
@@ -589,7 +675,7 @@ def get_str_from_param(p, v):
     @param v: Value.
     @type v: int
     """
-    return t2c[p.get_type()](p, v)
+    return get_value_table_from_param(p)[v]
 
 
 def get_length_from_param(p):
@@ -615,6 +701,96 @@ def get_subindexcount_from_param(p):
 def get_subindexoffsets_from_param(p):
     return t2siofs[p.get_type()]
 
+
+# number of recently viewed patterns whose text is kept around
+PATTERN_TEXT_CACHE_SIZE = 16
+
+
+class PatternText:
+    """
+    Formatted rows of a pattern, one list of row strings per track.
+
+    Pattern texts are cached by the pattern view and patched in place
+    when cells or rows change, so only the affected cells get formatted.
+    """
+
+    def __init__(self, layout, positions, widths):
+        """
+        @param layout: Row count, track counts, parameter widths.
+        @type layout: tuple
+        @param positions: Parameter positions per group, relative to track start.
+        @type positions: [[int, ...], ...]
+        @param widths: Parameter widths per group.
+        @type widths: [[int, ...], ...]
+        """
+        self.layout = layout
+        self.row_count = layout[0]
+        self.positions = positions
+        self.widths = widths
+        self.lines = [None] * 3
+
+    def get_track_lines(self, group, track):
+        try:
+            return self.lines[group][track]
+        except (IndexError, TypeError):
+            return None
+
+    def set_value(self, plugin, group, track, column, row, value):
+        """
+        Formats a single cell again.
+        """
+        lines = self.get_track_lines(group, track)
+        if not lines or not (0 <= row < len(lines)):
+            return
+        pos = self.positions[group][column]
+        end = pos + self.widths[group][column]
+        text = get_param_tables(plugin, group, track)[column][value]
+        line = lines[row]
+        lines[row] = line[:pos] + text + line[end:]
+
+    def move_rows(self, plugin, row, rows, column_indices, insert):
+        """
+        Shifts the rows of the given columns the same way
+        insert_pattern_rows and remove_pattern_rows shift pattern data.
+
+        @param column_indices: Group, track and column triples.
+        @type column_indices: [int, ...]
+        @param insert: True if rows were inserted, False if removed.
+        @type insert: bool
+        """
+        row_count = self.row_count
+        tracks = {}
+        for i in xrange(0, len(column_indices) - 2, 3):
+            group, track, column = column_indices[i:i + 3]
+            tracks.setdefault((group, track), set()).add(column)
+
+        def shift(items, blank):
+            if insert:
+                items[0:0] = [blank] * rows
+                del items[row_count - row:]
+            else:
+                del items[0:rows]
+                items.extend([blank] * (row_count - row - len(items)))
+            return items
+
+        for (group, track), columns in tracks.iteritems():
+            lines = self.get_track_lines(group, track)
+            if not lines or not (0 <= row < row_count):
+                continue
+            count = len(self.positions[group])
+            nones = [table[table.value_none] for table in get_param_tables(plugin, group, track)]
+            if len(columns) == count:
+                # whole track moves, shift complete row strings
+                lines[row:] = shift(lines[row:], ' '.join(nones))
+                continue
+            for column in columns:
+                pos = self.positions[group][column]
+                end = pos + self.widths[group][column]
+                cells = shift([line[pos:end] for line in lines[row:]], nones[column])
+                for r in xrange(row, row_count):
+                    line = lines[r]
+                    lines[r] = line[:pos] + cells[r - row] + line[end:]
+
 # selection modes: column, track, tracks, all
 SEL_COLUMN = 0
 SEL_TRACK = 1
@@ -642,6 +818,18 @@ class PatternView(gtk.DrawingArea):
         index = 0
         mode = SEL_COLUMN
 
+    class Viewport:
+        """
+        Viewport class.
+
+        Container for the visible part of the pattern: first row, row
+        count, character columns and the visible track range per group.
+        """
+        row = 0
+        rows = 0
+        columns = 0
+        tracks = [(0, 0), (0, 0), (0, 0)]
+
     def __init__(self, panel, hscroll, vscroll):
         """
         Initialization.
@@ -677,6 +865,7 @@ class PatternView(gtk.DrawingArea):
         self.factors = None
         self.play_notes = True
         self.current_plugin = ""
+        self.text_cache = OrderedDict()
         gtk.DrawingArea.__init__(self)
         # "Bitstream Vera Sans Mono"
         self.update_font()
@@ -745,6 +934,8 @@ class PatternView(gtk.DrawingArea):
         eventbus.zzub_pattern_insert_rows += self.on_pattern_insert_rows
         eventbus.zzub_pattern_remove_rows += self.on_pattern_remove_rows
         eventbus.zzub_parameter_changed += self.on_zzub_parameter_changed
+        eventbus.zzub_pre_delete_pattern += self.on_pre_delete_pattern
+        eventbus.zzub_pre_delete_plugin += self.on_pre_delete_plugin
         eventbus.document_loaded += self.update_all
         self.pattern_changed()
 
@@ -756,26 +947,45 @@ class PatternView(gtk.DrawingArea):
         pass
 
     def on_pattern_insert_rows(self, plugin, index, row, rows, column_indices, indices):
-        self.on_pattern_changed(plugin, index)
+        self.move_rows(plugin, index, row, rows, column_indices, indices, True)
 
     def on_pattern_remove_rows(self, plugin, index, row, rows, column_indices, indices):
-        self.on_pattern_changed(plugin, index)
+        self.move_rows(plugin, index, row, rows, column_indices, indices, False)
 
-    def on_edit_pattern(self, plugin, index, group, track, column, row, value):
-        if plugin != self.plugin:
+    def move_rows(self, plugin, index, row, rows, column_indices, indices, insert):
+        text = self.text_cache.get((plugin, index))
+        if not text:
             return
-        if index != self.pattern:
+        column_indices = [column_indices[i] for i in xrange(indices)]
+        text.move_rows(plugin, row, rows, column_indices, insert)
+        if plugin == self.plugin and index == self.pattern:
+            self.redraw()
+
+    def on_edit_pattern(self, plugin, index, group, track, column, row, value):
+        text = self.text_cache.get((plugin, index))
+        if not text:
             return
-        self.update_line(row)
-        self.redraw()
+        text.set_value(plugin, group, track, column, row, value)
+        if plugin == self.plugin and index == self.pattern:
+            self.redraw()
 
     def on_pattern_changed(self, plugin, index):
+        self.text_cache.pop((plugin, index), None)
         if plugin != self.plugin:
             return
         if index != self.pattern:
             return
         self.pattern_changed()
 
+    def on_pre_delete_pattern(self, plugin, index):
+        # pattern indices after the deleted one are shifting
+        for key in self.text_cache.keys():
+            if key[0] == plugin:
+                del self.text_cache[key]
+
+    def on_pre_delete_plugin(self, plugin):
+        self.on_pre_delete_pattern(plugin, -1)
+
     def update_font(self):
         pctx = self.get_pango_context()
         desc = pango.FontDescription(config.get_config().get_pattern_font())  # .get_font_description()
@@ -886,25 +1096,16 @@ class PatternView(gtk.DrawingArea):
         menu.popup(self, event)
 
     def on_pattern_effect(self, item, effect):
-        values = {}
+        columns = {}
         for row, group, track, index in self.selection_range():
-            value = self.plugin.get_pattern_value(self.pattern, group,
-                                                  track, index, row)
-            try:
-                values[(group, track, index)] = (values[(group, track, index)] +
-                                                 [(row, value)])
-            except KeyError:
-                values[(group, track, index)] = [(row, value)]
-        for key in values.iterkeys():
-            group = key[0]
-            track = key[1]
-            index = key[2]
-            param = self.plugin.get_parameter(group, track, index)
-            output = effect.transform([value[1] for value in values[key]],
-                                      param)
-            for (row, value), i in zip(values[key], range(len(output))):
-                self.plugin.set_pattern_value(self.pattern, group, track, index,
-                                              row, output[i])
+            columns.setdefault((group, track, index), []).append(row)
+        # effects may handle all columns at once, otherwise
+        # they are called for each column.
+        transform = getattr(effect, 'transform_columns', None)
+        if not transform:
+            def transform(data):
+                return [effect.transform(values, param) for values, param in data]
+        if transform_pattern_columns(self.plugin, self.pattern, columns, transform):
             player = com.get('neil.core.player')
             player.history_commit('pattern effect')
 
@@ -1171,9 +1372,6 @@ class PatternView(gtk.DrawingArea):
         """
         self.init_values()
         self.show_cursor_left()
-        plugin = self.get_plugin()
-        if plugin:
-            self.plugin_info.get(plugin).reset_patterngfx()
         if self.jump_to_note:
             self.tab_to_note_column()
             self.jump_to_note = False
@@ -2039,22 +2237,15 @@ class PatternView(gtk.DrawingArea):
                 for i in xrange(self.plugin.get_parameter_count(self.group,
                                                                 self.track)):
                     indices += [self.group, self.track, i]
-                self.lines[self.group][self.track].insert(self.row + index, "")
-                self.update_line(self.row + index)
-            del self.lines[self.group][self.track][-1]
             self.plugin.insert_pattern_rows(self.pattern, indices,
                                             len(indices) / 3, self.row, 1)
             player.history_commit("insert row")
         elif k == 'Delete':
-            del self.lines[self.group][self.track][self.row:self.row +\
-                                                   1]
             indices = []
             for index in range(1):
-                self.lines[self.group][self.track].append('')
                 for i in xrange(self.plugin.get_parameter_count(self.group,
                                                                 self.track)):
                     indices += [self.group, self.track, i]
-                self.update_line(self.row_count - 1 + index - 1)
             self.plugin.remove_pattern_rows(self.pattern, indices,
                                             len(indices) / 3, self.row, 1)
             player.history_commit("remove row")
@@ -2347,6 +2538,33 @@ class PatternView(gtk.DrawingArea):
         h -= self.top_margin
         return self.start_col + (w / self.column_width) - 1, self.start_row + (h / self.row_height) - 1
 
+    def get_viewport(self):
+        """
+        Computes the part of the pattern that is visible in the window.
+
+        @return: Visible rows, columns and tracks.
+        @rtype: PatternView.Viewport
+        """
+        w, h = self.get_client_size()
+        vp = self.Viewport()
+        vp.row = self.start_row
+        vp.rows = max(min(self.row_count - self.start_row,
+                          (h - self.row_height) / self.row_height + 1), 0)
+        vp.columns = max((w - PATLEFTMARGIN - 4) / self.column_width + 1, 0)
+        vp.tracks = []
+        for group in range(3):
+            width = self.track_width[group]
+            if not (self.lines and self.lines[group] and width):
+                vp.tracks.append((0, 0))
+                continue
+            # character position of the first track, relative to the view
+            x = self.group_position[group] - self.start_col
+            first = max(-x / width, 0)
+            last = min((vp.columns - x + width - 1) / width,
+                       self.group_track_count[group])
+            vp.tracks.append((first, max(first, last)))
+        return vp
+
     def get_virtual_size(self):
         """
         Returns the size in characters of the virtual view area.
@@ -2426,6 +2644,7 @@ class PatternView(gtk.DrawingArea):
                 self.statuslabels[1].set_label("")
 
     def update_all(self):
+        self.text_cache.clear()
         if self.window and self.window.is_visible():
             self.prepare_textbuffer()
             self.refresh_view()
@@ -2546,29 +2765,53 @@ class PatternView(gtk.DrawingArea):
         for g in range(3):
             if self.lines[g]:
                 tc = self.group_track_count[g]
+                count = self.parameter_count[g]
+                block = read_pattern_columns(self.plugin, self.pattern, g, 0, tc, 0, count, row, 1)
                 for t in range(tc):
-                    s = ' '.join([get_str_from_param(self.plugin.get_parameter(g, t, i),
-                                                     self.plugin.get_pattern_value(self.pattern, g, t, i, row))
-                                                    for i in xrange(self.parameter_count[g])])
-                    # values = [self.plugin.get_pattern_value(self.pattern, g, t, i, row) != self.plugin.get_parameter(g, t, i).get_value_none()
-                    #                                         for i in range(self.parameter_count[g])]
+                    if block:
+                        values = [block[t][i][0] for i in xrange(count)]
+                    else:
+                        values = [self.plugin.get_pattern_value(self.pattern, g, t, i, row)
+                                  for i in xrange(count)]
+                    tables = get_param_tables(self.plugin, g, t)
+                    s = ' '.join([tables[i][values[i]] for i in xrange(count)])
                     try:
                         self.lines[g][t][row] = s
                     except IndexError:
                         pass
 
+    def read_track_columns(self, group, track):
+        """
+        Reads all columns of a track in the current pattern.
+
+        @return: One list of row values per column.
+        @rtype: [[int, ...], ...]
+        """
+        count = self.parameter_count[group]
+        block = read_pattern_columns(self.plugin, self.pattern, group, track, 1, 0, count, 0, self.row_count)
+        if block:
+            return block[0]
+        return [[self.plugin.get_pattern_value(self.pattern, group, track, i, row)
+                 for row in xrange(self.row_count)] for i in xrange(count)]
+
     # This does the same job as update_line, but if we need to
     # update a lot of data at once, it's faster to use update_col.
-    def update_col(self, group, track):
+    def update_col(self, group, track, columns=None):
+        """
+        Updates all lines of a track.
+
+        @param columns: Column values of the track as returned by
+        read_track_columns. Read from the plugin if omitted.
+        @type columns: [[int, ...], ...]
+        """
         count = self.parameter_count[group]
+        if columns is None:
+            columns = self.read_track_columns(group, track)
         cols = [None] * count
-        col_vals = [None] * count
+        tables = get_param_tables(self.plugin, group)
         for i in range(count):
-            param = self.plugin.get_parameter(group, 0, i)
-            cols[i] = [get_str_from_param(param, self.plugin.get_pattern_value(self.pattern, group, track, i, row))
-                    for row in range(self.row_count)]
-            col_vals[i] = [self.plugin.get_pattern_value(self.pattern, group, track, i, row) != param.get_value_none()
-                    for row in range(self.row_count)]
+            table = tables[i]
+            cols[i] = [table[v] for v in columns[i]]
         for row in range(self.row_count):
             try:
                 self.lines[group][track][row] = ' '.join([cols[i][row] for i in range(count)])
@@ -2578,15 +2821,40 @@ class PatternView(gtk.DrawingArea):
     def prepare_textbuffer(self):
         """
         Initializes a buffer to handle the current pattern data.
+
+        The text of recently viewed patterns is kept in a cache that the
+        pattern events patch in place, so it is only formatted in full
+        the first time a pattern is shown or after it has been replaced.
+        """
+        key = (self.plugin, self.pattern)
+        layout = (self.row_count, tuple(self.group_track_count),
+                  tuple([tuple(w) for w in self.parameter_width]))
+        text = self.text_cache.pop(key, None)
+        if not text or text.layout != layout:
+            text = PatternText(layout, self.parameter_position, self.parameter_width)
+            self.lines = text.lines
+            self.format_textbuffer()
+        self.lines = text.lines
+        self.text_cache[key] = text
+        while len(self.text_cache) > PATTERN_TEXT_CACHE_SIZE:
+            self.text_cache.popitem(last=False)
+
+    def format_textbuffer(self):
+        """
+        Formats all rows of the current pattern into self.lines.
         """
-        self.lines = [None] * 3
         for group in range(3):
-            if self.parameter_count[group] > 0:
+            count = self.parameter_count[group]
+            if count > 0:
                 tc = self.group_track_count[group]
                 self.lines[group] = [None] * tc
+                # fetch the whole group at once; fall back to per-track
+                # reads if the tracks don't share a column layout.
+                block = read_pattern_columns(self.plugin, self.pattern, group,
+                                             0, tc, 0, count, 0, self.row_count)
                 for track in range(tc):
                     self.lines[group][track] = [None] * self.row_count
-                    self.update_col(group, track)
+                    self.update_col(group, track, block and block[track])
             else:
                 self.lines[group] = []
 
@@ -2602,7 +2870,7 @@ class PatternView(gtk.DrawingArea):
             3: [12, 4],
             }.get(tpb, [16, 4])
 
-    def draw_pattern_background(self, ctx, layout):
+    def draw_pattern_background(self, ctx, layout, viewport):
         """ Draw the background, lines, borders and row numbers """
         w, h = self.get_client_size()
         gc = self.window.new_gc()
@@ -2619,11 +2887,9 @@ class PatternView(gtk.DrawingArea):
         gc.set_foreground(pen)
         #drawable.draw_rectangle(gc, False, 0, 0, w - 1, h - 1)
         x, y = PATLEFTMARGIN, self.row_height
-        row = self.start_row
-        rows = self.row_count
+        row = viewport.row
         # Draw the row numbers
-        num_rows = min(rows - row, (h - self.row_height) / self.row_height + 1)
-        s = '\n'. join([str(i) for i in xrange(row, row + num_rows)])
+        s = '\n'. join([str(i) for i in xrange(row, row + viewport.rows)])
         layout.set_text(s)
         px, py = layout.get_pixel_size()
         drawable.draw_layout(gc, x - 5 - px, y, layout)
@@ -2636,8 +2902,8 @@ class PatternView(gtk.DrawingArea):
         text_color = cm.alloc_color(cfg.get_color('PE Track Numbers'))
         gc.set_foreground(text_color)
         # Display track numbers in the middle of each track column at the to
-        # For each existing track:
-        for track in range(self.group_track_count[TRACK]):
+        # For each visible track:
+        for track in range(*viewport.tracks[TRACK]):
             # Get x and y positions in the drawable that correspond
             # to a position that's designated for a particular event in
             # the pattern, in this case first row, track group,
@@ -2656,21 +2922,9 @@ class PatternView(gtk.DrawingArea):
             drawable.draw_layout(gc, x + width / 2 - px / 2,
                                  self.row_height / 2 - (py / 2), layout)
 
-    def draw_bar_marks(self, ctx):
+    def draw_bar_marks(self, ctx, viewport):
         "Draw the horizontal bars every each fourth and eighth bar."
-        w, h = self.get_client_size()
-        gc = self.window.new_gc()
-        cm = gc.get_colormap()
-        drawable = self.window
-
-        def draw_bar(row, group, track, color):
-            """Draw a horizontal bar for a specified row in a
-            specified group/track."""
-            x, y = self.pattern_to_pos(row, group, track, 0)
-            width = (self.track_width[group] - 1) * self.column_width
-            height = self.row_height
-            gc.set_foreground(color)
-            drawable.draw_rectangle(gc, True, x, y, width, height)
+        cm = self.get_colormap()
 #        darkest = cm.alloc_color('#b0b0b0')
 #        lighter = cm.alloc_color('#d0d0d0')
 #        lightest = cm.alloc_color('#f0f0f0')
@@ -2689,78 +2943,66 @@ class PatternView(gtk.DrawingArea):
                 return lightest
             else:
                 return None
-        num_rows = min(self.row_count - self.start_row,
-                       (h - self.row_height) / self.row_height + 1)
-        if self.lines and self.lines[CONN]:
-            for track in range(self.group_track_count[CONN]):
-                for row in range(self.start_row, num_rows + self.start_row):
-                    color = get_color(row)
-                    if color != None:
-                        draw_bar(row, CONN, track, color)
-        if self.lines and self.lines[GLOBAL]:
-            for row in range(self.start_row, num_rows + self.start_row):
-                color = get_color(row)
-                if color != None:
-                    draw_bar(row, GLOBAL, 0, color)
-        if self.lines and self.lines[TRACK]:
-            for track in range(self.group_track_count[TRACK]):
-                for row in range(self.start_row, num_rows + self.start_row):
-                    color = get_color(row)
-                    if color != None:
-                        draw_bar(row, TRACK, track, color)
-
-    def draw_parameter_values(self, ctx, layout):
-        """ Draw the parameter values for all tracks, columns and rows."""
-        w, h = self.get_client_size()
+        # horizontal extents of all visible tracks
+        spans = []
+        for group in range(3):
+            width = (self.track_width[group] - 1) * self.column_width
+            for track in range(*viewport.tracks[group]):
+                x, y = self.pattern_to_pos(viewport.row, group, track, 0)
+                spans.append((x, width))
+        if not spans:
+            return
+        # collect one band of rectangles per color and fill each at once
+        bands = {}
+        first = viewport.row + (-viewport.row % 4)
+        for row in range(first, viewport.row + viewport.rows, 4):
+            color = get_color(row)
+            y = self.top_margin + (row - viewport.row) * self.row_height
+            bands.setdefault(color.pixel, (color, []))[1].append(y)
+        for color, ys in bands.itervalues():
+            ctx.set_source_color(color)
+            for y in ys:
+                for x, width in spans:
+                    ctx.rectangle(x, y, width, self.row_height)
+            ctx.fill()
+
+    def draw_parameter_values(self, ctx, layout, viewport):
+        """ Draw the parameter values of all visible tracks, columns and rows."""
         gc = self.window.new_gc()
         cm = gc.get_colormap()
         cfg = config.get_config()
         pen = cm.alloc_color(cfg.get_color('PE Text'))
+        gc.set_foreground(pen)
         drawable = self.window
-
-        def draw_parameters_range(row, num_rows, group, track=0):
-            """Draw the parameter values for a range of rows"""
-            x, y = self.pattern_to_pos(row, group, track, 0)
-            s = '\n'.join([self.lines[group][track][i]
-                           for i in xrange(row, row + num_rows)])
-            # w = self.column_width * len(self.lines[group][track][row])
+        row = viewport.row
+        rows = xrange(row, row + viewport.rows)
+
+        def draw_tracks(group, first, last):
+            """Draw the visible part of a range of neighbouring tracks"""
+            if first >= last:
+                return
+            lines = [self.lines[group][t] for t in xrange(first, last)]
+            x, y = self.pattern_to_charpos(row, group, first, 0)
+            x -= self.start_col
+            # only lay out the characters that fit into the window
+            begin = max(-x, 0)
+            end = max(viewport.columns - x, begin)
+            s = '\n'.join([' '.join([l[i] for l in lines])[begin:end]
+                           for i in rows])
             layout.set_text(s)
-            px, py = layout.get_pixel_size()
-            gc.set_foreground(pen)
-            drawable.draw_layout(gc, x, y, layout)
-            return x + px
-        # Draw the parameter values
-        #i = self.start_row
-        #y = self.row_height
-        row = self.start_row
-        rows = self.row_count
-        # Number of rows is calculated to be either the first row displayed
-        # subtracted from all rows, or the height of the screen divided
-        # by row height, whichever is smaller.
-        num_rows = min(rows - row, (h - self.row_height) / self.row_height + 1)
-        # out_of_bounds will be set to true if we have gone over the right
-        # edge of the screen, which signifies that we don't have to process
-        # the columns that are further to the right.
-        out_of_bounds = False
+            x = PATLEFTMARGIN + 4 + (x + begin) * self.column_width
+            drawable.draw_layout(gc, x, self.top_margin, layout)
         if self.lines != None:
             # Draw connection parameters (volume, pan, etc)
-            for t in range(self.group_track_count[CONN]):
-                connectiontype = self.get_plugin().get_input_connection_type(t)
+            plugin = self.get_plugin()
+            for t in range(*viewport.tracks[CONN]):
+                connectiontype = plugin.get_input_connection_type(t)
                 if connectiontype == zzub.zzub_connection_type_audio:
-                    extent = draw_parameters_range(row, num_rows, CONN, t)
-                    out_of_bounds = extent > w
+                    draw_tracks(CONN, t, t + 1)
             # Draw global parameters.
-            if not out_of_bounds:
-                if self.lines[GLOBAL]:
-                    extent = draw_parameters_range(row, num_rows, GLOBAL, 0)
-                    out_of_bounds = extent > w
+            draw_tracks(GLOBAL, *viewport.tracks[GLOBAL])
             # Draw track parameters.
-            if not out_of_bounds:
-                if self.lines[TRACK]:
-                    for t in range(self.group_track_count[TRACK]):
-                        extent = draw_parameters_range(row, num_rows, TRACK, t)
-                        if extent > w:
-                            break
+            draw_tracks(TRACK, *viewport.tracks[TRACK])
 
     def draw_selection(self, ctx):
         """ Draw selection box."""
@@ -2838,12 +3080,13 @@ class PatternView(gtk.DrawingArea):
         layout = pango.Layout(self.get_pango_context())
         layout.set_font_description(self.fontdesc)
         layout.set_width(-1)
+        viewport = self.get_viewport()
         self.draw_background(ctx)
-        self.draw_bar_marks(ctx)
-        self.draw_parameter_values(ctx, layout)
+        self.draw_bar_marks(ctx, viewport)
+        self.draw_parameter_values(ctx, layout, viewport)
         self.draw_selection(ctx)
         self.draw_cursor_xor()
-        self.draw_pattern_background(ctx, layout)
+        self.draw_pattern_background(ctx, layout, viewport)
         self.draw_playpos_xor()
 
 __all__ = [
@@ -2852,6 +3095,8 @@ __all__ = [
     'PatternToolBar',
     'PatternPanel',
     'get_str_from_param',
+    'get_value_table',
+    'get_param_tables',
     'get_length_from_param',
     'get_subindexcount_from_param',
     'get_subindexoffsets_from_param',
@@ -28,6 +28,14 @@ import sys
 import time
 import zzub
 
+# bounds for the interval in milliseconds at which player events are polled.
+# the interval shrinks while events arrive and grows while the player is idle.
+EVENT_POLL_MIN_INTERVAL = 10
+EVENT_POLL_MAX_INTERVAL = 100
+# number of events in the zzub queue above which it is drained even though
+# events from earlier updates are still waiting. the zzub queue holds 4096.
+EVENT_QUEUE_HIGH_WATER = 2048
+
 DOCUMENT_UI = dict(
         # insert persistent members at this level, in the format
         #
@@ -76,6 +84,107 @@ DOCUMENT_UI = dict(
 )
 
 
+def make_event_unpacker(membername, datatype, arrays):
+    """
+    Returns a function that extracts the arguments of an event bus call
+    from a zzub_event_data_t, so the fields don't have to be looked up
+    again for every event.
+
+    @param membername: Name of the event data union member.
+    @type membername: str
+    @param datatype: Structure type of the union member.
+    @param arrays: Maps array members to the member holding their length.
+    @type arrays: dict
+    """
+    def get_value(argname):
+        def get(specdata):
+            return getattr(specdata, argname)
+        return get
+
+    def get_array(argname, countname):
+        def get(specdata):
+            # copy, the array is only valid during the callback
+            value = getattr(specdata, argname)
+            if not value:
+                return []
+            return value[:getattr(specdata, countname)]
+        return get
+
+    def get_pointer(argname, wrapper):
+        def get(specdata):
+            value = getattr(specdata, argname)
+            if not value:
+                return None
+            if wrapper:
+                return wrapper._new_from_handle(value)
+            return value
+        return get
+
+    getters = []
+    for argname, argtype in datatype._fields_:
+        if argname in arrays:
+            getters.append(get_array(argname, arrays[argname]))
+        elif hasattr(argtype, 'contents'):
+            wrapper = getattr(argtype._type_, '_wrapper_', None)
+            getters.append(get_pointer(argname, wrapper))
+        else:
+            getters.append(get_value(argname))
+
+    def unpack(data):
+        specdata = getattr(data, membername)
+        return [get(specdata) for get in getters]
+    return unpack
+
+
+def coalesce_events(events, keys):
+    """
+    Removes redundant events from a list of (eventname, args) tuples.
+    Of all events with the same name and key, only the last one is kept.
+
+    @param keys: Maps event names to the number of leading arguments
+    that make up the key.
+    @type keys: dict
+    @return: The remaining events, in their original order.
+    @rtype: [(str, list), ...]
+    """
+    latest = {}
+    for i, (eventname, args) in enumerate(events):
+        count = keys.get(eventname)
+        if count is not None:
+            latest[(eventname,) + tuple(args[:count])] = i
+    result = []
+    for i, (eventname, args) in enumerate(events):
+        count = keys.get(eventname)
+        if count is not None and latest[(eventname,) + tuple(args[:count])] != i:
+            continue
+        result.append((eventname, args))
+    return result
+
+
+def deliver_events(events, dispatch, deadline=None):
+    """
+    Takes events off the end of a list of (eventname, args) tuples and
+    passes them to dispatch, until the list is empty or the deadline has
+    passed. At least one event is delivered.
+
+    The list is modified in place, so events that dispatch takes off the
+    same list are not delivered twice.
+
+    @param deadline: time.time() value after which delivery stops, or None
+    to deliver all events.
+    @return: The number of events delivered.
+    @rtype: int
+    """
+    count = 0
+    while events:
+        eventname, args = events.pop()
+        dispatch(eventname, args)
+        count += 1
+        if deadline is not None and time.time() > deadline:
+            break
+    return count
+
+
 class NeilPlayer(Player, PropertyEventHandler):
     __neil__ = dict(
             id='neil.core.player',
@@ -106,8 +215,8 @@ class NeilPlayer(Player, PropertyEventHandler):
             zzub_event_type_pre_delete_pattern = dict(args='delete_pattern'),
             zzub_event_type_edit_pattern = dict(args='edit_pattern'),
             zzub_event_type_pattern_changed = dict(args='pattern_changed'),
-            zzub_event_type_pattern_insert_rows = dict(args='pattern_insert_rows'),
-            zzub_event_type_pattern_remove_rows = dict(args='pattern_remove_rows'),
+            zzub_event_type_pattern_insert_rows = dict(args='pattern_insert_rows', arrays=dict(column_indices='indices')),
+            zzub_event_type_pattern_remove_rows = dict(args='pattern_remove_rows', arrays=dict(column_indices='indices')),
             zzub_event_type_sequencer_add_track = dict(args=None),
             zzub_event_type_sequencer_remove_track = dict(args=None),
             zzub_event_type_sequencer_changed = dict(args=None),
@@ -130,6 +239,13 @@ class NeilPlayer(Player, PropertyEventHandler):
             zzub_event_type_all = dict(args='all'),
     )
 
+    # events queued during one tick that are collapsed into the last one,
+    # mapped to the number of leading arguments that identify them.
+    _coalesced_events_ = dict(
+            zzub_parameter_changed = 4, # plugin, group, track, param
+            zzub_pattern_changed = 2, # plugin, index
+    )
+
     def __init__(self):
         Player.__init__(self, Player.create())
         self._cbtime = time.time()
@@ -138,8 +254,16 @@ class NeilPlayer(Player, PropertyEventHandler):
         self._hevtime = 0
         self.__lazy_commits = False
         self.__event_stats = False
+        # events gathered while the queue is drained, None otherwise
+        self.__event_batch = None
+        # events left over when the last update ran out of time, the next
+        # one last
+        self.__pending_events = []
+        self.event_poll_interval = EVENT_POLL_MIN_INTERVAL
+        self.event_queue_size = 0
         # enumerate zzub_event_types and prepare unwrappers for the different types
         self.event_id_to_name = {}
+        self.event_unpackers = {}
         for enumname, cfg in self._event_types_.iteritems():
             val = getattr(zzub, enumname)
             #assert val not in self.event_id_to_name, "value %s (%s) already registered." % (val, eventname)
@@ -148,17 +272,16 @@ class NeilPlayer(Player, PropertyEventHandler):
             eventname = 'zzub_' + enumname[len('zzub_event_type_'):]
             membername = cfg.get('args', None)
             args = []
+            unpack = None
             if membername:
-                #union = None
-                datatype = None
                 ed = zzub.EventData()
-                for argname in dir(ed):
-                    if argname == membername:
-                        datatype = getattr(ed, argname).__class__
-                assert datatype, "couldn't find member %s in zzub_event_data_t" % membername
+                assert hasattr(ed, membername), "couldn't find member %s in zzub_event_data_t" % membername
+                datatype = getattr(ed, membername).__class__
                 for argname, argtype in datatype._fields_:
                     args.append(argname)
+                unpack = make_event_unpacker(membername, datatype, cfg.get('arrays', {}))
             self.event_id_to_name[val] = (eventname, membername, args)
+            self.event_unpackers[val] = (eventname, unpack)
             #print "'%s', # ( %s )" % (eventname, ','.join(args + ["..."]))
         config = com.get('neil.core.config')
         pluginpath = os.environ.get('NEIL_PLUGIN_PATH', None)
@@ -189,6 +312,7 @@ class NeilPlayer(Player, PropertyEventHandler):
 
         inputname, outputname, samplerate, buffersize = config.get_audiodriver_config()
         self.initialize(samplerate)
+        self.set_thread_count(config.get_audio_threads())
         self.init_lunar()
         self.__stream_ext_uri_mappings = {}
         self.__streamplayer = None
@@ -203,7 +327,7 @@ class NeilPlayer(Player, PropertyEventHandler):
         eventbus.zzub_pre_delete_pattern += self.on_pre_delete_pattern
         self._callback = zzub.zzub_callback_t(self.handle_event)
         self.set_callback(self._callback, None)
-        gobject.timeout_add(int(1000 / 50), self.on_handle_events)
+        gobject.timeout_add(self.event_poll_interval, self.on_handle_events)
         # event queue disabling count for overlapping disable calls
         self.__disable_level = 0
 
@@ -321,6 +445,15 @@ class NeilPlayer(Player, PropertyEventHandler):
             self.active_waves = [wave]
         return res != 0
 
+    def load_wavedata(self, wave, data):
+        """
+        Loads a sample decoded with zzub.Wavedata.decode_file into a wave.
+        """
+        res = wave.load_wavedata(0, 0, 0, data)
+        if res != 0:
+            self.active_waves = [wave]
+        return res != 0
+
     def save_wave(self, wave, filepath):
         stream = zzub.Output.create_file(filepath)
         #res = wave.save_sample(0, stream)
@@ -401,12 +534,23 @@ class NeilPlayer(Player, PropertyEventHandler):
         self.flush(None, None)
         self.history_flush_last()
         zzub.Player.clear(self)
+        # in place, a delivery loop may be running on the list
+        del self.__pending_events[:]
         self.document_path = ''
+        eventbus = com.get('neil.core.eventbus')
+        eventbus.document_cleared()
 
     def on_handle_events(self):
         """
-        Handler triggered by the default timer. Asks the player to fill
+        Handler triggered by the event timer. Asks the player to fill
         the event queue and fetches events from the queue to pass them to handle_event.
+
+        Events are delivered until the configured time budget is used up,
+        the rest is kept for the next update. Until those are delivered,
+        new events stay in the zzub queue. Events that zzub sends right
+        away, such as those of structural edits, are delivered after the
+        kept ones, see handle_event. The timer interval adapts to the
+        amount of events coming in.
         """
         if not self.__loading and not self.__lazy_commits:
             ucopcount = self.history_get_uncomitted_operations()
@@ -418,17 +562,44 @@ class NeilPlayer(Player, PropertyEventHandler):
                 self.history_commit("commit leak")
         player = com.get('neil.core.player')
         t1 = time.time()
-        player.handle_events()
+        budget = com.get('neil.core.config').get_event_poll_budget() / 1000.0
+        self.event_queue_size = player.get_event_queue_size()
+        # gather what is queued once the earlier events are delivered, then
+        # deliver what is left after dropping redundant events.
+        if not self.__pending_events or self.event_queue_size > EVENT_QUEUE_HIGH_WATER:
+            self.__event_batch = []
+            try:
+                player.handle_events()
+            finally:
+                events = self.__pending_events[::-1] + self.__event_batch
+                self.__event_batch = None
+            events = coalesce_events(events, self._coalesced_events_)
+            events.reverse()
+            self.__pending_events[:] = events
+        count = deliver_events(self.__pending_events, self.dispatch_event, t1 + budget)
         t2 = time.time() - t1
         self._hevtime += t2
         self._hevcalls += 1
         t = time.time()
         if self.__event_stats and ((t - self._cbtime) > 1):
-            print self._hevcalls, self._cbcalls, "%.2fms" % (self._hevtime * 1000)
+            print self._hevcalls, self._cbcalls, "%.2fms" % (self._hevtime * 1000),\
+                "interval=%ims queued=%i pending=%i" % (self.event_poll_interval,
+                    self.event_queue_size, len(self.__pending_events))
             self._cbcalls = 0
             self._hevcalls = 0
             self._hevtime = 0
             self._cbtime = t
+        # poll faster while events come in, slow down when idle
+        if self.__pending_events:
+            interval = EVENT_POLL_MIN_INTERVAL
+        elif count:
+            interval = max(self.event_poll_interval / 2, EVENT_POLL_MIN_INTERVAL)
+        else:
+            interval = min(self.event_poll_interval * 3 / 2, EVENT_POLL_MAX_INTERVAL)
+        if interval != self.event_poll_interval:
+            self.event_poll_interval = interval
+            gobject.timeout_add(interval, self.on_handle_events)
+            return False
         return True
 
     def play(self):
@@ -539,25 +710,27 @@ class NeilPlayer(Player, PropertyEventHandler):
         @param data: event data.
         @type data: zzub_event_data_t
         """
-        eventbus = com.get('neil.core.eventbus')
         data = data.contents
         # prepare arguments for the specific callback
-        eventname, membername, argnames = self.event_id_to_name[data.type]
-        args = []
-        if membername:
-            specdata = getattr(data, membername)
-            for argname in argnames:
-                value = getattr(specdata, argname)
-                if hasattr(value, 'contents'):
-                    class_ = value.contents.__class__
-                    if hasattr(class_, '_wrapper_'):
-                        value = class_._wrapper_._new_from_handle(value)
-                elif 'contents' in dir(value):
-                    value = None
-                args.append(value)
-        if not data.type in self._exclude_event_debug_:
-            pass
-            #print "[%s](%s)" % (eventname,','.join([('%s=%r' % (a,b)) for a,b in zip(argnames,args)]))
+        eventname, unpack = self.event_unpackers[data.type]
+        if unpack:
+            args = unpack(data)
+        else:
+            args = []
+        if self.__event_batch is not None:
+            # queued event, delivered by on_handle_events
+            self.__event_batch.append((eventname, args))
+            return False
+        # the events kept from the last update are older, and they may refer
+        # to patterns or plugins the edit behind this event is about to move
+        deliver_events(self.__pending_events, self.dispatch_event)
+        return self.dispatch_event(eventname, args)
+
+    def dispatch_event(self, eventname, args):
+        """
+        Sends an unpacked zzub event to the event bus.
+        """
+        eventbus = com.get('neil.core.eventbus')
         result = getattr(eventbus, eventname)(*args) or False
         self._cbcalls += 1
         if self.__loading:
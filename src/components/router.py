@@ -488,6 +488,208 @@ class VolumeSlider(gtk.Window):
         self.drawingarea.grab_remove()
 
 
+class RouterIndex:
+    """
+    Uniform grid over plugin positions and connection midpoints in router
+    coordinates (-1..1), used to hit-test the router without visiting
+    every plugin and connection.
+    """
+
+    CELLSIZE = 0.125
+
+    def __init__(self):
+        self.valid = False
+        self.clear()
+
+    def clear(self):
+        self.positions = {}
+        self.order = {}
+        self.counter = 0
+        self.plugin_cells = {}
+        self.midpoints = {}
+        self.links = {}
+        self.connection_cells = {}
+
+    def invalidate(self, *args):
+        """
+        Marks the index for a rebuild on next use.
+        """
+        self.valid = False
+
+    def update(self, player):
+        """
+        Rebuilds the index if it has been invalidated.
+        """
+        if self.valid:
+            return
+        self.clear()
+        self.valid = True
+        for plugin in player.get_plugin_list():
+            self.add_plugin(plugin)
+        for plugin in player.get_plugin_list():
+            for index in xrange(plugin.get_input_connection_count()):
+                self.add_connection(plugin.get_input_connection_plugin(index), plugin,
+                                    plugin.get_input_connection_type(index))
+
+    def get_cell(self, (x, y)):
+        return int(x // self.CELLSIZE), int(y // self.CELLSIZE)
+
+    def insert(self, cells, key, pos):
+        cells.setdefault(self.get_cell(pos), set()).add(key)
+
+    def discard(self, cells, key, pos):
+        cell = self.get_cell(pos)
+        items = cells.get(cell)
+        if items:
+            items.discard(key)
+            if not items:
+                del cells[cell]
+
+    def query(self, cells, (x0, y0), (x1, y1)):
+        """
+        Yields all items in cells overlapping a rectangle.
+        """
+        cx0, cy0 = self.get_cell((x0, y0))
+        cx1, cy1 = self.get_cell((x1, y1))
+        for cx in xrange(cx0, cx1 + 1):
+            for cy in xrange(cy0, cy1 + 1):
+                for item in cells.get((cx, cy), ()):
+                    yield item
+
+    def add_plugin(self, plugin):
+        if not self.valid or plugin in self.positions:
+            return
+        pos = plugin.get_position()
+        self.positions[plugin] = pos
+        self.order[plugin] = self.counter
+        self.counter += 1
+        self.insert(self.plugin_cells, plugin, pos)
+
+    def remove_plugin(self, plugin):
+        if not self.valid or plugin not in self.positions:
+            return
+        for key in list(self.links.get(plugin, ())):
+            self.remove_connection(*key)
+        self.discard(self.plugin_cells, plugin, self.positions.pop(plugin))
+        del self.order[plugin]
+
+    def move_plugin(self, plugin):
+        """
+        Updates the position of a plugin and its connections.
+        """
+        if not self.valid or plugin not in self.positions:
+            return
+        pos = plugin.get_position()
+        if pos == self.positions[plugin]:
+            return
+        self.discard(self.plugin_cells, plugin, self.positions[plugin])
+        self.positions[plugin] = pos
+        self.insert(self.plugin_cells, plugin, pos)
+        for key in list(self.links.get(plugin, ())):
+            self.remove_connection(*key)
+            self.add_connection(*key)
+
+    def add_connection(self, from_plugin, to_plugin, type):
+        key = (from_plugin, to_plugin, type)
+        if not self.valid or key in self.midpoints:
+            return
+        if from_plugin not in self.positions or to_plugin not in self.positions:
+            return
+        (fx, fy), (tx, ty) = self.positions[from_plugin], self.positions[to_plugin]
+        pos = (fx + tx) * 0.5, (fy + ty) * 0.5
+        self.midpoints[key] = pos
+        self.insert(self.connection_cells, key, pos)
+        self.links.setdefault(from_plugin, set()).add(key)
+        self.links.setdefault(to_plugin, set()).add(key)
+
+    def remove_connection(self, from_plugin, to_plugin, type):
+        key = (from_plugin, to_plugin, type)
+        if not self.valid or key not in self.midpoints:
+            return
+        self.discard(self.connection_cells, key, self.midpoints.pop(key))
+        for plugin in (from_plugin, to_plugin):
+            links = self.links.get(plugin)
+            if links:
+                links.discard(key)
+                if not links:
+                    del self.links[plugin]
+
+    def get_plugins(self, start, end):
+        """
+        Returns plugins positioned inside a rectangle, topmost first.
+        """
+        return sorted(set(self.query(self.plugin_cells, start, end)),
+                      key=self.order.get, reverse=True)
+
+    def get_connections(self, start, end):
+        """
+        Returns connections whose midpoint may lie inside a rectangle.
+
+        @rtype: [(zzub.Plugin, zzub.Plugin, int), ...]
+        """
+        return list(self.query(self.connection_cells, start, end))
+
+class PluginMeters:
+    """
+    Reads peak levels and cpu load of all plugins in one call and converts
+    them into led heights, so that only plugins whose leds visibly change
+    need to be redrawn.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.values = []
+        self.ids = {}
+
+    def update(self, player):
+        """
+        Fetches the current meters of all plugins.
+        """
+        count, values = player.get_all_plugin_meters(self.size)
+        if count > self.size:
+            self.size = count
+            count, values = player.get_all_plugin_meters(self.size)
+        self.values = values
+
+    def reset(self):
+        """
+        Forgets the ids and meters of all plugins. Called when plugins are
+        added or removed, as ids then no longer map to the same plugins.
+        """
+        self.ids = {}
+        self.values = []
+
+    def get(self, plugin):
+        """
+        Returns the peak levels and cpu load of a plugin.
+
+        @return: Tuple containing left peak, right peak and cpu load.
+        @rtype: (float, float, float)
+        """
+        try:
+            id = self.ids[plugin]
+        except KeyError:
+            id = self.ids[plugin] = plugin.get_id()
+        return tuple(self.values[id * 3:id * 3 + 3]) or (0.0, 0.0, 0.0)
+
+    def get_levels(self, plugin, cpu_scale, max_cpu_scale):
+        """
+        Returns the led and cpu bar of a plugin quantized to pixels.
+
+        @return: Tuple containing the led height (-1 when clipping) and a
+        tuple of cpu bar height and warning state.
+        """
+        maxl, maxr, load = self.get(plugin)
+        amp = min(max(maxl, maxr), 1.0)
+        if amp >= 1:
+            led = -1
+        else:
+            amp = 1.0 - (linear2db(amp, -76.0) / -76.0)
+            led = max(int((LEDHEIGHT - 4) * amp + 0.5), 0)
+        relperc = (min(1.0, load / max_cpu_scale) * cpu_scale)
+        cpu = max(int((CPUHEIGHT - 4) * relperc + 0.5), 0), relperc >= 0.9
+        return led, cpu
+
 class RouteView(gtk.DrawingArea):
     """
     Allows to monitor and control plugins and their connections.
@@ -536,12 +738,19 @@ class RouteView(gtk.DrawingArea):
         gtk.DrawingArea.__init__(self)
         self.panel = parent
         self.routebitmap = None
+        self.layer_moving = []
+        self.layer_positions = {}
+        self.meters = PluginMeters()
+        self.colorcache = {}
+        self.index = RouterIndex()
         # self.peaks = {}
         eventbus = com.get('neil.core.eventbus')
-        eventbus.zzub_connect += self.on_zzub_redraw_event
-        eventbus.zzub_disconnect += self.on_zzub_redraw_event
+        eventbus.zzub_connect += self.on_zzub_connect
+        eventbus.zzub_disconnect += self.on_zzub_disconnect
         eventbus.zzub_plugin_changed += self.on_zzub_plugin_changed
-        eventbus.document_loaded += self.redraw
+        eventbus.zzub_new_plugin += self.on_zzub_new_plugin
+        eventbus.zzub_pre_delete_plugin += self.on_zzub_pre_delete_plugin
+        eventbus.document_loaded += self.on_document_loaded
         eventbus.active_plugins_changed += self.on_active_plugins_changed
         self.autoconnect_target = None
         self.chordnotes = []
@@ -663,18 +872,66 @@ class RouteView(gtk.DrawingArea):
             for name in [x.replace('${PLUGIN}', name) for x in names]:
                 brushes.append(cfg.get_color(name))
             self.flags2brushes[flags] = brushes
+        self.colorcache = {}
         common.get_plugin_infos().reset_plugingfx()
 
+    def alloc_color(self, cm, color):
+        """
+        Allocates a color in the colormap, reusing earlier allocations.
+
+        @param color: Color spec or gtk.gdk.Color.
+        """
+        if isinstance(color, gtk.gdk.Color):
+            key = color.to_string()
+        else:
+            key = color
+        try:
+            return self.colorcache[key]
+        except KeyError:
+            result = self.colorcache[key] = cm.alloc_color(color)
+            return result
+
+    def get_cpu_scale(self):
+        """
+        Returns the factors used to scale plugin cpu loads.
+        """
+        player = com.get('neil.core.player')
+        driver = com.get('neil.core.driver.audio')
+        return driver.get_cpu_load(), 1.0 / max(player.get_plugin_count(), 1)
+
     def on_zzub_plugin_changed(self, plugin):
+        self.index.move_plugin(plugin)
         common.get_plugin_infos().get(plugin).reset_plugingfx()
+        # only moved plugins change the connection layer
+        if plugin.get_position() != self.layer_positions.get(plugin):
+            self.redraw()
+        else:
+            self.repaint()
+
+    def on_zzub_connect(self, from_plugin, to_plugin, type):
+        self.index.add_connection(from_plugin, to_plugin, type)
         self.redraw()
 
-    def on_zzub_redraw_event(self, *args):
+    def on_zzub_disconnect(self, from_plugin, to_plugin, type):
+        self.index.remove_connection(from_plugin, to_plugin, type)
         self.redraw()
 
-    def on_focus(self, event):
+    def on_zzub_new_plugin(self, plugin):
+        self.index.add_plugin(plugin)
+        self.meters.reset()
+
+    def on_zzub_pre_delete_plugin(self, plugin):
+        self.index.remove_plugin(plugin)
+        self.meters.reset()
+
+    def on_document_loaded(self):
+        self.index.invalidate()
+        self.meters.reset()
         self.redraw()
 
+    def on_focus(self, event):
+        self.repaint()
+
     def on_context_menu(self, widget, event):
         """
         Event handler for requests to show the context menu.
@@ -750,15 +1007,20 @@ class RouteView(gtk.DrawingArea):
 
         def get_pixelpos(x, y):
             return cx * (1 + x), cy * (1 + y)
-        for mp in player.get_plugin_list():
+        self.index.update(player)
+        start = self.pixel_to_float((mx - 14, my - 14))
+        end = self.pixel_to_float((mx + 14, my + 14))
+        for from_plugin, mp, type in self.index.get_connections(start, end):
             rx, ry = get_pixelpos(*mp.get_position())
-            for index in xrange(mp.get_input_connection_count()):
-                crx, cry = get_pixelpos(*mp.get_input_connection_plugin(index).get_position())
-                cpx, cpy = (crx + rx) * 0.5, (cry + ry) * 0.5
-                dx, dy = cpx - mx, cpy - my
-                length = (dx * dx + dy * dy) ** 0.5
-                if length <= 14:  # why exactly 14?
-                    return mp, index
+            crx, cry = get_pixelpos(*from_plugin.get_position())
+            cpx, cpy = (crx + rx) * 0.5, (cry + ry) * 0.5
+            dx, dy = cpx - mx, cpy - my
+            length = (dx * dx + dy * dy) ** 0.5
+            if length <= 14:  # why exactly 14?
+                for index in xrange(mp.get_input_connection_count()):
+                    if (mp.get_input_connection_plugin(index) == from_plugin and
+                        mp.get_input_connection_type(index) == type):
+                        return mp, index
 
     def get_plugin_at(self, (x, y)):
         """
@@ -778,7 +1040,11 @@ class RouteView(gtk.DrawingArea):
         PW, PH = PLUGINWIDTH / 2, PLUGINHEIGHT / 2
         area = AREA_ANY
         player = com.get('neil.core.player')
-        for mp in reversed(list(player.get_plugin_list())):
+        self.index.update(player)
+        # one extra pixel for the rounding of plugin positions
+        start = self.pixel_to_float((mx - PW - 1, my - PH - 1))
+        end = self.pixel_to_float((mx + PW + 1, my + PH + 1))
+        for mp in self.index.get_plugins(start, end):
             pi = common.get_plugin_infos().get(mp)
             if not pi.songplugin:
                 continue
@@ -834,7 +1100,7 @@ class RouteView(gtk.DrawingArea):
             mp, (x, y), area = res
             if area == AREA_LED:
                 player.toggle_mute(mp)
-                self.redraw()
+                self.repaint()
             else:
                 if not mp in player.active_plugins:
                     if (event.state & gtk.gdk.SHIFT_MASK):
@@ -899,10 +1165,10 @@ class RouteView(gtk.DrawingArea):
                 pinfo = self.get_plugin_info(plugin)
                 dx, dy = pinfo.dragoffset
                 pinfo.dragpos = self.pixel_to_float((x + dx, y + dy))
-            self.redraw()
+            self.repaint()
         elif self.connecting:
             self.connectpos = int(x), int(y)
-            self.redraw()
+            self.repaint()
         else:
             res = self.get_plugin_at((x, y))
             if res:
@@ -944,7 +1210,7 @@ class RouteView(gtk.DrawingArea):
                         mp.add_input(player.active_plugins[0], zzub.zzub_connection_type_audio)
                         player.history_commit("new nonnection")
         self.connecting = False
-        self.redraw()
+        self.repaint()
         res = self.get_plugin_at((mx, my))
         if res:
             mp, (x, y), area = res
@@ -966,6 +1232,8 @@ class RouteView(gtk.DrawingArea):
         #       return True
         if self.window:
             player = com.get('neil.core.player')
+            if player.is_loading():
+                return True
             rect = self.get_allocation()
             w, h = rect.width, rect.height
             cx, cy = w * 0.5, h * 0.5
@@ -973,25 +1241,47 @@ class RouteView(gtk.DrawingArea):
             def get_pixelpos(x, y):
                 return cx * (1 + x), cy * (1 + y)
             PW, PH = PLUGINWIDTH / 2, PLUGINHEIGHT / 2
-            for mp, (rx, ry) in ((mp, get_pixelpos(*mp.get_position())) for mp in player.get_plugin_list()):
+            self.meters.update(player)
+            cpu_scale, max_cpu_scale = self.get_cpu_scale()
+            plugin_infos = common.get_plugin_infos()
+            # only invalidate plugins whose leds would look different
+            for mp in player.get_plugin_list():
+                pi = plugin_infos.get(mp)
+                if not pi.songplugin:
+                    continue
+                levels = self.meters.get_levels(mp, cpu_scale, max_cpu_scale)
+                if levels == (pi.amp, pi.cpu):
+                    continue
+                rx, ry = get_pixelpos(*mp.get_position())
                 rx, ry = rx - PW, ry - PH
                 self.window.invalidate_rect((int(rx), int(ry), PLUGINWIDTH, PLUGINHEIGHT), False)
         return True
 
     def expose(self, widget, event):
         self.context = widget.window.cairo_create()
-        self.draw(self.context)
+        self.draw(self.context, event.area)
         return False
 
+    def repaint(self):
+        """
+        Repaints the view, keeping the cached connection layer.
+        """
+        if self.window:
+            rect = self.get_allocation()
+            self.window.invalidate_rect((0, 0, rect.width, rect.height), False)
+
     def redraw(self):
         if self.window:
             self.routebitmap = None
             rect = self.get_allocation()
             self.window.invalidate_rect((0, 0, rect.width, rect.height), False)
 
-    def draw_leds(self):
+    def draw_leds(self, area=None):
         """
         Draws only the leds into the offscreen buffer.
+
+        @param area: Only plugins intersecting this rectangle are drawn.
+        @type area: gtk.gdk.Rectangle
         """
         player = com.get('neil.core.player')
         if player.is_loading():
@@ -1010,9 +1300,10 @@ class RouteView(gtk.DrawingArea):
         def get_pixelpos(x, y):
             return cx * (1 + x), cy * (1 + y)
         PW, PH = PLUGINWIDTH / 2, PLUGINHEIGHT / 2
-        driver = com.get('neil.core.driver.audio')
-        cpu_scale = driver.get_cpu_load()
-        max_cpu_scale = 1.0 / player.get_plugin_count()
+        cpu_scale, max_cpu_scale = self.get_cpu_scale()
+        led_draw = config.get_config().get_led_draw()
+        if led_draw:
+            self.meters.update(player)
         for mp, (rx, ry) in ((mp, get_pixelpos(*mp.get_position())) for mp in player.get_plugin_list()):
             pi = common.get_plugin_infos().get(mp)
             if not pi.songplugin:
@@ -1021,6 +1312,9 @@ class RouteView(gtk.DrawingArea):
                 pinfo = self.get_plugin_info(mp)
                 rx, ry = get_pixelpos(*pinfo.dragpos)
             rx, ry = rx - PW, ry - PH
+            if area and (rx + PLUGINWIDTH + 3 < area.x or rx > area.x + area.width or
+                         ry + PLUGINHEIGHT + 3 < area.y or ry > area.y + area.height):
+                continue
             pi = common.get_plugin_infos().get(mp)
             if not pi:
                 continue
@@ -1028,7 +1322,7 @@ class RouteView(gtk.DrawingArea):
                                              self.flags2brushes[GENERATOR_PLUGIN_FLAGS])
 
             def brush2cm(brush):
-                return cm.alloc_color(brush)
+                return self.alloc_color(cm, brush)
 
             def flag2cm(flag):
                 return brush2cm(brushes[flag])
@@ -1037,7 +1331,7 @@ class RouteView(gtk.DrawingArea):
                 pi.plugingfx = gtk.gdk.Pixmap(self.window, PLUGINWIDTH, PLUGINHEIGHT, -1)
                 # adjust colour for muted plugins
                 color = brushes[self.COLOR_MUTED if pi.muted else self.COLOR_DEFAULT]
-                gc.set_foreground(cm.alloc_color(color))
+                gc.set_foreground(brush2cm(color))
 #                if pi.muted:
 #                    gc.set_foreground(cm.alloc_color(brushes[self.COLOR_MUTED]))
 #                else:
@@ -1051,8 +1345,8 @@ class RouteView(gtk.DrawingArea):
                                             PLUGINWIDTH - 1, PLUGINHEIGHT - 1)
 
                 #  inner border
-                border = blend(cm.alloc_color(color), gtk.gdk.Color("#fff"), 0.65)
-                gc.set_foreground(cm.alloc_color(border))
+                border = blend(brush2cm(color), gtk.gdk.Color("#fff"), 0.65)
+                gc.set_foreground(brush2cm(border))
                 pi.plugingfx.draw_rectangle(gc, False, 1, 1, PLUGINWIDTH - 3, PLUGINHEIGHT - 3)
 
                 if (player.solo_plugin and player.solo_plugin != mp
@@ -1070,58 +1364,36 @@ class RouteView(gtk.DrawingArea):
                                                 PLUGINWIDTH / 2 - lw / 2 - 3,
                                                 PLUGINHEIGHT / 2 - lh / 2,
                                                 lw + 6, lh)
-                gc.set_foreground(cm.alloc_color(blend(flag2cm(self.COLOR_MUTED if pi.muted else self.COLOR_DEFAULT), gtk.gdk.Color("#fff"), 0.7)))
+                gc.set_foreground(brush2cm(blend(flag2cm(self.COLOR_MUTED if pi.muted else self.COLOR_DEFAULT), gtk.gdk.Color("#fff"), 0.7)))
                 pi.plugingfx.draw_layout(gc, PLUGINWIDTH / 2 - lw / 2 + 1, PLUGINHEIGHT / 2 - lh / 2 + 1, layout)
 
                 gc.set_foreground(flag2cm(self.COLOR_TEXT))
                 pi.plugingfx.draw_layout(gc, PLUGINWIDTH / 2 - lw / 2, PLUGINHEIGHT / 2 - lh / 2, layout)
-            if config.get_config().get_led_draw() == True:
-                # led border
-                border = blend(flag2cm(self.COLOR_MUTED if pi.muted else self.COLOR_DEFAULT), gtk.gdk.Color("#000"), 0.5)
-                gc.set_foreground(cm.alloc_color(border))
-                pi.plugingfx.draw_rectangle(gc, False, LEDOFSX, LEDOFSY, LEDWIDTH - 1, LEDHEIGHT - 1)
-
-                maxl, maxr = mp.get_last_peak()
-                amp = min(max(maxl, maxr), 1.0)
-                if amp != pi.amp:
-                    if amp >= 1:
-                        # from collections import deque
-                        # if not mp.get_name() in self.peaks:
-                            # self.peaks[mp.get_name()] = deque(maxlen=25)
-                        # dq = self.peaks[mp.get_name()]
-                        # dq.append(LEDHEIGHT - 4)
-
-                        gc.set_foreground(cm.alloc_color(brushes[self.COLOR_LED_WARNING]))
+            if led_draw == True:
+                led, cpu = self.meters.get_levels(mp, cpu_scale, max_cpu_scale)
+                if led != pi.amp:
+                    # led border
+                    border = blend(flag2cm(self.COLOR_MUTED if pi.muted else self.COLOR_DEFAULT), gtk.gdk.Color("#000"), 0.5)
+                    gc.set_foreground(brush2cm(border))
+                    pi.plugingfx.draw_rectangle(gc, False, LEDOFSX, LEDOFSY, LEDWIDTH - 1, LEDHEIGHT - 1)
+                    if led == -1:
+                        gc.set_foreground(flag2cm(self.COLOR_LED_WARNING))
                         pi.plugingfx.draw_rectangle(gc, True, LEDOFSX + 1,
                                                     LEDOFSY + 1, LEDWIDTH - 2,
                                                     LEDHEIGHT - 2)
                     else:
-                        gc.set_foreground(cm.alloc_color(brushes[self.COLOR_LED_OFF]))
+                        gc.set_foreground(flag2cm(self.COLOR_LED_OFF))
                         pi.plugingfx.draw_rectangle(gc, True, LEDOFSX,
                                                     LEDOFSY, LEDWIDTH,
                                                     LEDHEIGHT)
-                        amp = 1.0 - (linear2db(amp, -76.0) / -76.0)
-                        height = int((LEDHEIGHT - 4) * amp + 0.5)
-                        if (height > 0):
+                        if (led > 0):
                             # led fill
-                            gc.set_foreground(cm.alloc_color(brushes[self.COLOR_LED_ON]))
-                            pi.plugingfx.draw_rectangle(gc, True, LEDOFSX + 1, (LEDOFSY + LEDHEIGHT - height - 1), LEDWIDTH - 2, height)
-                            # # peak falloff
-                            # from collections import deque
-                            # if not mp.get_name() in self.peaks:
-                            #     self.peaks[mp.get_name()] = deque(maxlen=25)
-                            # dq = self.peaks[mp.get_name()]
-                            # dq.append(height)
-
-                            # peak_color = cm.alloc_color(blend(cm.alloc_color(brushes[self.COLOR_LED_ON]), gtk.gdk.Color("#fff"), 0.15))
-                            # h = LEDOFSY + LEDHEIGHT - 1 - max(height, sum(dq)/len(dq))
-                            # gc.set_foreground(peak_color)
-                            # pi.plugingfx.draw_line(gc, LEDOFSX + 1, h, LEDOFSX + LEDWIDTH - 2, h)
-
-                    pi.amp = amp
-                relperc = (min(1.0, mp.get_last_cpu_load() / max_cpu_scale) * cpu_scale)
-                if relperc != pi.cpu:
-                    pi.cpu = relperc
+                            gc.set_foreground(flag2cm(self.COLOR_LED_ON))
+                            pi.plugingfx.draw_rectangle(gc, True, LEDOFSX + 1, (LEDOFSY + LEDHEIGHT - led - 1), LEDWIDTH - 2, led)
+                    pi.amp = led
+                if cpu != pi.cpu:
+                    pi.cpu = cpu
+                    height, warning = cpu
 
                     # cpu fill
                     gc.set_foreground(flag2cm(self.COLOR_CPU_OFF))
@@ -1129,13 +1401,12 @@ class RouteView(gtk.DrawingArea):
 
                     # cpu border
                     color = brushes[self.COLOR_MUTED if pi.muted else self.COLOR_DEFAULT]
-                    border = blend(cm.alloc_color(color), gtk.gdk.Color("#000"), 0.5)
-                    gc.set_foreground(cm.alloc_color(border))
+                    border = blend(brush2cm(color), gtk.gdk.Color("#000"), 0.5)
+                    gc.set_foreground(brush2cm(border))
                     pi.plugingfx.draw_rectangle(gc, False, CPUOFSX, CPUOFSY, CPUWIDTH - 1, CPUHEIGHT - 1)
 
-                    height = int((CPUHEIGHT - 4) * relperc + 0.5)
                     if (height > 0):
-                        if relperc >= 0.9:
+                        if warning:
                             gc.set_foreground(flag2cm(self.COLOR_CPU_WARNING))
                         else:
                             gc.set_foreground(flag2cm(self.COLOR_CPU_ON))
@@ -1152,7 +1423,7 @@ class RouteView(gtk.DrawingArea):
             # flip plugin pixmap to screen
             self.window.draw_drawable(gc, pi.plugingfx, 0, 0, int(rx), int(ry), -1, -1)
 
-    def draw(self, ctx):
+    def draw(self, ctx, area=None):
         """
         Draws plugins, connections and arrows to an offscreen buffer.
         """
@@ -1278,8 +1549,41 @@ class RouteView(gtk.DrawingArea):
 
             bmpctx.restore()
 
-        if not self.routebitmap:
+        def draw_connection(bmpctx, cm, mp, index):
+            rx, ry = get_pixelpos(*mp.get_position())
+            if self.dragging and mp in player.active_plugins:
+                pinfo = self.get_plugin_info(mp)
+                rx, ry = get_pixelpos(*pinfo.dragpos)
+            targetmp = mp.get_input_connection_plugin(index)
+            pi = common.get_plugin_infos().get(targetmp)
+            if not pi.songplugin:
+                return
+            tmppos = targetmp.get_position()
+            if self.dragging and targetmp in player.active_plugins:
+                pinfo = self.get_plugin_info(targetmp)
+                tmppos = pinfo.dragpos
+            crx, cry = get_pixelpos(*tmppos)
+            if (mp.get_input_connection_type(index) !=
+                zzub.zzub_connection_type_event):
+                amp = mp.get_parameter_value(0, index, 0)
+                amp /= 16384.0
+                amp = amp ** 0.5
+                #color = [amp, amp, amp]
+                #arrowcolors[zzub.zzub_connection_type_audio][0] = color
+                c = blend(cm.alloc_color(cfg.get_color("MV Arrow")), gtk.gdk.Color("#000"), amp)
+                arrowcolors[zzub.zzub_connection_type_audio][0] = [c.red_float, c.green_float, c.blue_float]
+
+            draw_line_arrow(bmpctx, arrowcolors[mp.get_input_connection_type(index)], int(crx), int(cry), int(rx), int(ry))
+
+        # connections of plugins being dragged are drawn on top of the
+        # cached layer, so that the layer survives the drag.
+        moving = []
+        if self.dragging:
+            moving = list(player.active_plugins)
+        if not self.routebitmap or self.layer_moving != moving:
             self.routebitmap = gtk.gdk.Pixmap(self.window, w, h, -1)
+            self.layer_moving = moving
+            self.layer_positions = {}
             gc = self.routebitmap.new_gc()
             cm = gc.get_colormap()
             drawable = self.routebitmap
@@ -1291,42 +1595,39 @@ class RouteView(gtk.DrawingArea):
             bmpctx = self.routebitmap.cairo_create()
             bmpctx.translate(0.5, 0.5)
             bmpctx.set_line_width(1)
-            mplist = [(mp, get_pixelpos(*mp.get_position()))
-                      for mp in player.get_plugin_list()]
-
-            for mp, (rx, ry) in mplist:
-                if self.dragging and mp in player.active_plugins:
-                    pinfo = self.get_plugin_info(mp)
-                    rx, ry = get_pixelpos(*pinfo.dragpos)
+            for mp in player.get_plugin_list():
+                self.layer_positions[mp] = mp.get_position()
+                if mp in moving:
+                    continue
                 for index in xrange(mp.get_input_connection_count()):
-                    targetmp = mp.get_input_connection_plugin(index)
-                    pi = common.get_plugin_infos().get(targetmp)
-                    if not pi.songplugin:
+                    if mp.get_input_connection_plugin(index) in moving:
                         continue
-                    tmppos = targetmp.get_position()
-                    if self.dragging and targetmp in player.active_plugins:
-                        pinfo = self.get_plugin_info(targetmp)
-                        tmppos = pinfo.dragpos
-                    crx, cry = get_pixelpos(*tmppos)
-                    if (mp.get_input_connection_type(index) !=
-                        zzub.zzub_connection_type_event):
-                        amp = mp.get_parameter_value(0, index, 0)
-                        amp /= 16384.0
-                        amp = amp ** 0.5
-                        #color = [amp, amp, amp]
-                        #arrowcolors[zzub.zzub_connection_type_audio][0] = color
-                        c = blend(cm.alloc_color(cfg.get_color("MV Arrow")), gtk.gdk.Color("#000"), amp)
-                        arrowcolors[zzub.zzub_connection_type_audio][0] = [c.red_float, c.green_float, c.blue_float]
-
-                    draw_line_arrow(bmpctx, arrowcolors[mp.get_input_connection_type(index)], int(crx), int(cry), int(rx), int(ry))
+                    draw_connection(bmpctx, cm, mp, index)
         gc = self.window.new_gc()
         self.window.draw_drawable(gc, self.routebitmap, 0, 0, 0, 0, -1, -1)
+        if moving:
+            cm = gc.get_colormap()
+            connections = set()
+            for mp in moving:
+                for index in xrange(mp.get_input_connection_count()):
+                    connections.add((mp, index))
+                for index in xrange(mp.get_output_connection_count()):
+                    targetmp = mp.get_output_connection_plugin(index)
+                    conntype = mp.get_output_connection_type(index)
+                    connections.add((targetmp, targetmp.get_input_connection_by_type(mp, conntype)))
+            ctx.save()
+            ctx.translate(0.5, 0.5)
+            ctx.set_line_width(1)
+            for mp, index in connections:
+                if index != -1:
+                    draw_connection(ctx, cm, mp, index)
+            ctx.restore()
         if self.connecting:
             ctx.set_line_width(1)
             crx, cry = get_pixelpos(*player.active_plugins[0].get_position())
             rx, ry = self.connectpos
             draw_line(ctx, int(crx), int(cry), int(rx), int(ry))
-        self.draw_leds()
+        self.draw_leds(area)
 
     # This method is not *just* for key-jazz, it handles all key-events in router. Rename?
     def on_key_jazz(self, widget, event, plugin):
@@ -39,8 +39,11 @@ from neil.utils import prepstr, get_item_count
 from neil.utils import get_clipboard_text, set_clipboard_text, add_scrollbars
 from neil.utils import is_effect, is_generator, is_controller
 from neil.utils import is_root, get_new_pattern_name
+from neil.utils import read_pattern_columns
 from neil.utils import Menu, wave_names_generator
 import random
+import time
+from collections import OrderedDict
 import config
 import neil.common as common
 MARGIN = common.MARGIN
@@ -393,8 +396,7 @@ class SequencerPanel(gtk.VBox):
         """
         self.update_list()
         self.toolbar.update_all()
-        for k, v in self.view.plugin_info.iteritems():
-            v.patterngfx = {}
+        self.seqview.thumbnails.clear()
         self.view.update()
         self.seqview.set_cursor_pos(0, 0)
         self.seqview.adjust_scrollbars()
@@ -455,6 +457,107 @@ class SequencerPanel(gtk.VBox):
 # end of class SequencerFrame
 
 
+# memory in bytes that pattern thumbnails may use
+THUMBNAIL_MEMORY_BUDGET = 32 * 1024 * 1024
+# time in seconds spent rendering thumbnails per idle call
+THUMBNAIL_IDLE_TIME = 0.01
+
+
+class PatternThumbnailCache:
+    """
+    Pattern thumbnails for the sequencer view.
+
+    Thumbnails are keyed by (plugin, index, step, rows, width, height) and
+    rendered by idle callbacks, so drawing never waits for them. They are
+    evicted least recently used first once the memory budget is exceeded.
+    Invalidated thumbnails are kept and shown until they are rendered again.
+    """
+
+    def __init__(self, render, done, budget=THUMBNAIL_MEMORY_BUDGET):
+        """
+        @param render: Called as render(plugin, index, rows, width, height),
+        returns a gtk.gdk.Pixmap.
+        @param done: Called after a batch of thumbnails has been rendered.
+        @param budget: Memory budget in bytes.
+        """
+        self.render = render
+        self.done = done
+        self.budget = budget
+        self.memory = 0
+        # key => [pixmap, size in bytes, stale]
+        self.entries = OrderedDict()
+        self.queue = OrderedDict()
+        self.idle_id = None
+
+    def get(self, plugin, index, step, rows, width, height):
+        """
+        Returns the thumbnail for the first rows of a pattern, or None if it
+        still has to be rendered. Missing and stale thumbnails are queued
+        for rendering.
+        """
+        key = (plugin, index, step, rows, width, height)
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.entries[key] = entry
+            if not entry[2]:
+                return entry[0]
+        self.queue[key] = True
+        if self.idle_id is None:
+            self.idle_id = gobject.idle_add(self.on_idle)
+        return entry and entry[0]
+
+    def invalidate(self, plugin, index=None):
+        """
+        Marks the thumbnails of a pattern, or of all patterns of a plugin
+        if index is None, as stale.
+        """
+        for key, entry in self.entries.iteritems():
+            if key[0] == plugin and (index is None or key[1] == index):
+                entry[2] = True
+
+    def remove(self, plugin):
+        """
+        Drops all thumbnails of a plugin.
+        """
+        for key in self.entries.keys():
+            if key[0] == plugin:
+                self.memory -= self.entries.pop(key)[1]
+        for key in self.queue.keys():
+            if key[0] == plugin:
+                del self.queue[key]
+
+    def clear(self):
+        self.entries.clear()
+        self.queue.clear()
+        self.memory = 0
+
+    def on_idle(self):
+        t = time.time()
+        rendered = False
+        while self.queue and (time.time() - t) < THUMBNAIL_IDLE_TIME:
+            key, _ = self.queue.popitem(last=False)
+            plugin, index, step, rows, width, height = key
+            if index >= plugin.get_pattern_count():
+                continue
+            pixmap = self.render(plugin, index, rows, width, height)
+            old = self.entries.pop(key, None)
+            if old:
+                self.memory -= old[1]
+            size = width * height * max(pixmap.get_depth() / 8, 1)
+            self.entries[key] = [pixmap, size, False]
+            self.memory += size
+            rendered = True
+        while self.memory > self.budget and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            self.memory -= entry[1]
+        if rendered:
+            self.done()
+        if self.queue:
+            return True
+        self.idle_id = None
+        return False
+
+
 class SequencerView(gtk.DrawingArea):
     """
     Sequence viewer class.
@@ -479,6 +582,8 @@ class SequencerView(gtk.DrawingArea):
         self.seq_row_size = 38
 
         self.plugin_info = common.get_plugin_infos()
+        self.thumbnails = PatternThumbnailCache(self.render_pattern_thumbnail,
+                                                self.redraw)
         player = com.get('neil.core.player')
         self.playpos = player.get_position()
         self.row = 0
@@ -507,9 +612,29 @@ class SequencerView(gtk.DrawingArea):
         eventbus = com.get('neil.core.eventbus')
         eventbus.zzub_sequencer_changed += self.redraw
         eventbus.zzub_set_sequence_event += self.redraw
-        eventbus.document_loaded += self.redraw
+        eventbus.document_loaded += self.on_document_loaded
+        eventbus.zzub_edit_pattern += self.on_pattern_edited
+        eventbus.zzub_pattern_changed += self.on_pattern_edited
+        eventbus.zzub_pattern_insert_rows += self.on_pattern_edited
+        eventbus.zzub_pattern_remove_rows += self.on_pattern_edited
+        eventbus.zzub_pre_delete_pattern += self.on_pre_delete_pattern
+        eventbus.zzub_pre_delete_plugin += self.on_pre_delete_plugin
         set_clipboard_text("invalid_clipboard_data")
 
+    def on_document_loaded(self):
+        self.thumbnails.clear()
+        self.redraw()
+
+    def on_pattern_edited(self, plugin, index, *args):
+        self.thumbnails.invalidate(plugin, index)
+
+    def on_pre_delete_pattern(self, plugin, index):
+        # indices of the following patterns shift
+        self.thumbnails.invalidate(plugin)
+
+    def on_pre_delete_plugin(self, plugin):
+        self.thumbnails.remove(plugin)
+
     def track_row_to_pos(self, (track, row)):
         """
         Converts track and row to a pixel coordinate.
@@ -768,13 +893,13 @@ class SequencerView(gtk.DrawingArea):
             patternsize = 0
             eventlist = []
             m = t.get_plugin()
-            for time, value in t.get_event_list():
-                if (time >= start[1]) and (time < (end[1] + self.step)):
+            for pos, value in t.get_event_list():
+                if (pos >= start[1]) and (pos < (end[1] + self.step)):
                     if value >= 0x10:
                         value -= 0x10
                         # copy contents between patterns
-                        eventlist.append((time, m.get_pattern(value)))
-                        patternsize = max(patternsize, time - start[1] +
+                        eventlist.append((pos, m.get_pattern(value)))
+                        patternsize = max(patternsize, pos - start[1] +
                                           m.get_pattern(value).get_row_count())
             if patternsize:
                 name = get_new_pattern_name(m)
@@ -783,10 +908,10 @@ class SequencerView(gtk.DrawingArea):
                 #m.add_pattern(p)
                 group_track_count = [m.get_input_connection_count(),
                                      1, m.get_track_count()]
-                for time, pattern in eventlist:
-                    t.set_event(time, -1)
+                for pos, pattern in eventlist:
+                    t.set_event(pos, -1)
                     for r in xrange(pattern.get_row_count()):
-                        rowtime = time - start[1] + r
+                        rowtime = pos - start[1] + r
                         for g in range(3):
                             for ti in xrange(group_track_count[g]):
                                 for i in xrange(m.get_pluginloader().\
@@ -1208,24 +1333,21 @@ class SequencerView(gtk.DrawingArea):
         if not track:
             return None, None, -1
         plugin = track.get_plugin()
-        bestmatch = None
-        bestpos = row
-        event_list = track.get_event_list()
-        for pos, value in event_list:
-            if pos > row:
-                break
+        index = track.find_event(row)
+        while index >= 0:
+            pos, value = track.get_event(index)
+            if value >= 0x10:
+                if pos + plugin.get_pattern_length(value - 0x10) < row + 1:
+                    break
+                if includespecial:
+                    return plugin, value, pos
+                return plugin, value - 0x10, pos
             elif includespecial:
-                bestpos = pos
-                bestmatch = value
-            elif (value >= 0x10):
-                bestpos = pos
-                bestmatch = value - 0x10
-        pattern = plugin.get_pattern(value - 0x10)
-        nrows = pattern.get_row_count()
-        if pos + nrows < row + 1:
-            return plugin, None, -1
-        else:
-            return plugin, bestmatch, bestpos
+                if pos + self.step < row + 1:
+                    break
+                return plugin, value, pos
+            index -= 1
+        return plugin, None, -1
 
     def deselect(self):
         """
@@ -1610,6 +1732,76 @@ class SequencerView(gtk.DrawingArea):
         drawable.draw_rectangle(ctx, True, 0, 0,
                                 self.seq_left_margin, height)
 
+    def render_pattern_thumbnail(self, plugin, index, length, gfx_w, gfx_h):
+        """
+        Renders the box of a pattern as shown in the sequencer.
+
+        @param length: Number of rows the box shows.
+        @type length: int
+        @return: Pixmap of size gfx_w * gfx_h.
+        @rtype: gtk.gdk.Pixmap
+        """
+        drawable = self.window
+        ctx = drawable.new_gc()
+        colormap = ctx.get_colormap()
+        cfg = config.get_config()
+        layout = pango.Layout(self.get_pango_context())
+        layout.set_width(-1)
+        layout.set_font_description(pango.FontDescription("sans 8"))
+        name = prepstr(plugin.get_pattern_name(index))
+        gfx = gtk.gdk.Pixmap(drawable, gfx_w, gfx_h, -1)
+        pattern_color = self.get_random_color(plugin.get_name() + name)
+        ctx.set_foreground(colormap.alloc_color(pattern_color))
+        gfx.draw_rectangle(ctx, True, 0, 0, gfx_w, gfx_h)
+        rows = max(length, 0)
+        ctx.set_foreground(colormap.alloc_color('#404040'))
+        if plugin.get_pluginloader().get_uri() == '@neil/lunar/controller/Control;1':
+            block = read_pattern_columns(plugin, index, 1, 0, 1, 0, 1, 0, rows)
+            values = block and block[0][0] or []
+            param = plugin.get_parameter(1, 0, 0)
+            none = param.get_value_none()
+            vmin = param.get_value_min()
+            scale = 1.0 / (param.get_value_max() - vmin)
+            for row in range(len(values) - 1):
+                val1 = values[row]
+                val2 = values[row]
+                if val1 != none and val2 != none:
+                    scaled1 = (val1 - vmin) * scale
+                    scaled2 = (val2 - vmin) * scale
+                    gfx.draw_line(ctx,
+                                  int(1 + gfx_w * (row / float(length))),
+                                  int(1 + (gfx_h - 2) * (1.0 - scaled1)),
+                                  int(1 + gfx_w * ((row + 1) / float(length))),
+                                  int(1 + (gfx_h - 2) * (1.0 - scaled2)))
+        else:
+            for group in range(3):
+                for track in range(plugin.get_group_track_count(group)):
+                    cols = plugin.get_parameter_count(group, track)
+                    # one call per track instead of one per cell
+                    block = read_pattern_columns(plugin, index, group, track,
+                                                 1, 0, cols, 0, rows)
+                    if not block:
+                        continue
+                    for col, values in enumerate(block[0]):
+                        param = plugin.get_parameter(group, track, col)
+                        if param.get_type() not in [0, 2, 3]:
+                            continue
+                        none = param.get_value_none()
+                        vmin = param.get_value_min()
+                        scale = 1.0 / (param.get_value_max() - vmin)
+                        for row, val in enumerate(values):
+                            if val != none:
+                                scaled = (val - vmin) * scale
+                                gfx.draw_rectangle(ctx, True,
+                                                   int(1 + gfx_w * (row / float(length))),
+                                                   int(1 + (gfx_h - 2) * (1.0 - scaled)), 2, 2)
+        ctx.set_foreground(colormap.alloc_color(cfg.get_color('SE Border')))
+        gfx.draw_rectangle(ctx, False, 0, 0, gfx_w - 1, gfx_h - 1)
+        layout.set_markup("<small>%s</small>" % name)
+        ctx.set_foreground(colormap.alloc_color(cfg.get_color('SE Text')))
+        gfx.draw_layout(ctx, 2, 2, layout)
+        return gfx
+
     def draw_tracks(self, ctx, colors):
         """
         Draw tracks and pattern boxes.
@@ -1624,82 +1816,44 @@ class SequencerView(gtk.DrawingArea):
         # cfg = config.get_config()
         sequencer = player.get_current_sequencer()
         tracks = sequencer.get_track_list()
+        width_in_bars = (width / self.seq_row_size) * self.step
         for track_index in range(self.starttrack, len(tracks)):
             track = tracks[track_index]
             plugin = track.get_plugin()
-            plugin_info = self.plugin_info.get(plugin)
-            # Draw the pattern boxes
-            event_list = list(track.get_event_list())
+            # Draw the pattern boxes. Only the visible events are fetched,
+            # plus the one after them to clip the last pattern.
+            first, last = track.get_event_range(self.startseqtime,
+                                                self.startseqtime + width_in_bars)
+            last = min(last + 1, track.get_event_count())
+            event_list = [track.get_event(i) for i in range(first, last)]
             for (position, value), index in zip(event_list, range(len(event_list))):
-                pattern = None
                 if value >= 0x10:
-                    pattern = plugin.get_pattern(value - 0x10)
-                    length = pattern.get_row_count()
+                    length = plugin.get_pattern_length(value - 0x10)
                     end = position + length
-                    width_in_bars = (width / self.seq_row_size) * self.step
                     if ((end >= self.startseqtime) and
                         (position < self.startseqtime + width_in_bars)):
+                        # Handle the case where the pattern overlaps with the next one.
+                        # This is done by shortening the current pattern so they display nice.
                         try:
-                            gfx = plugin_info.patterngfx[value]
-                        except KeyError:
-                            name = prepstr(pattern.get_name())
-                            # Handle the case where the pattern overlaps with the next one.
-                            # This is done by shortening the current pattern so they display nice.
-                            try:
-                                if position + length > event_list[index + 1][0]:
-                                    length -= position + length - event_list[index + 1][0]
-                            except IndexError:
-                                pass
-                            box_size = max(int(((self.seq_row_size * length) / self.step) + 0.5), 4)
-                            gfx_w, gfx_h = box_size - 3, self.seq_track_size - 3
-                            gfx = gtk.gdk.Pixmap(drawable, gfx_w, gfx_h, -1)
-                            pattern_color = self.get_random_color(plugin.get_name() + name)
+                            if position + length > event_list[index + 1][0]:
+                                length -= position + length - event_list[index + 1][0]
+                        except IndexError:
+                            pass
+                        box_size = max(int(((self.seq_row_size * length) / self.step) + 0.5), 4)
+                        gfx_w, gfx_h = box_size - 3, self.seq_track_size - 3
+                        x = self.seq_left_margin + ((position - self.startseqtime) * self.seq_row_size / self.step)
+                        gfx = self.thumbnails.get(plugin, value - 0x10, self.step,
+                                                  length, gfx_w, gfx_h)
+                        if gfx:
+                            drawable.draw_drawable(ctx, gfx, 0, 0, x + 2, y + 2, -1, -1)
+                        else:
+                            # not rendered yet, draw a plain box for now
+                            name = plugin.get_pattern_name(value - 0x10)
+                            pattern_color = self.get_random_color(plugin.get_name() + prepstr(name))
                             ctx.set_foreground(ctx.get_colormap().alloc_color(pattern_color))
-                            gfx.draw_rectangle(ctx, True, 0, 0, gfx_w, gfx_h)
-                            if plugin.get_pluginloader().get_uri() == '@neil/lunar/controller/Control;1':
-                                ctx.set_foreground(ctx.get_colormap().alloc_color('#404040'))
-                                for row in range(length - 1):
-                                    val1 = pattern.get_value(row, 1, 0, 0)
-                                    val2 = pattern.get_value(row, 1, 0, 0)
-                                    param = plugin.get_parameter(1, 0, 0)
-                                    scale = 1.0 / (param.get_value_max() - param.get_value_min())
-                                    if val1 != param.get_value_none() and val2 != param.get_value_none:
-                                        scaled1 = (val1 - param.get_value_min()) * scale
-                                        scaled2 = (val2 - param.get_value_min()) * scale
-                                        gfx.draw_line(ctx,
-                                                      int(1 + gfx_w * (row / float(length))),
-                                                      int(1 + (gfx_h - 2) * (1.0 - scaled1)),
-                                                      int(1 + gfx_w * ((row + 1) / float(length))),
-                                                      int(1 + (gfx_h - 2) * (1.0 - scaled2)))
-                            else:
-                                ctx.set_foreground(ctx.get_colormap().alloc_color('#404040'))
-                                for row in range(length):
-                                    groups = pattern.get_group_count()
-                                    for group in range(groups):
-                                        tracks_ = pattern.get_track_count(group)
-                                        for track in range(tracks_):
-                                            cols = pattern.get_column_count(group, track)
-                                            for col in range(cols):
-                                                val = pattern.get_value(row, group, track, col)
-                                                param = plugin.get_parameter(group, track, col)
-                                                if param.get_type() in [0, 2, 3]:
-                                                    if val != param.get_value_none():
-                                                        scale = 1.0 / (param.get_value_max() - param.get_value_min())
-                                                        scaled = (val - param.get_value_min()) * scale
-                                                        gfx.draw_rectangle(ctx, True,
-                                                                           int(1 + gfx_w * (row / float(length))),
-                                                                           int(1 + (gfx_h - 2) * (1.0 - scaled)), 2, 2)
+                            drawable.draw_rectangle(ctx, True, x + 2, y + 2, gfx_w, gfx_h)
                             ctx.set_foreground(colors['Border'])
-                            gfx.draw_rectangle(ctx, False, 0, 0, gfx_w - 1, gfx_h - 1)
-                            layout.set_markup("<small>%s</small>" % name)
-                            px, py = layout.get_pixel_size()
-                            ctx.set_foreground(colors['Text'])
-                            gfx.draw_layout(ctx, 2, 2, layout)
-                            plugin_info.patterngfx[value] = gfx
-                        x = self.seq_left_margin + ((position - self.startseqtime) * self.seq_row_size / self.step)
-                        drawable.draw_drawable(ctx, gfx, 0, 0, x + 2, y + 2, -1, -1)
-                    if pattern != None:
-                        pattern.destroy()
+                            drawable.draw_rectangle(ctx, False, x + 2, y + 2, gfx_w - 1, gfx_h - 1)
                 elif value == 0x00 or value == 0x01:
                     x = (self.seq_left_margin +
                          ((position - self.startseqtime) * self.seq_row_size) /
@@ -30,6 +30,9 @@ if __name__ == '__main__':
 import gtk
 import gobject
 import os, sys, stat
+import thread
+import threading
+import Queue
 from neil.utils import prepstr, db2linear, linear2db, note2str, filepath, \
      new_listview, new_image_button, add_scrollbars, file_filter, question, \
      format_filesize, error, new_stock_image_button, \
@@ -44,6 +47,132 @@ from neil.common import MARGIN, MARGIN2, MARGIN3
 import neil.com as com
 from neil.utils import Menu
 
+def get_import_worker_count():
+    """
+    Returns the number of threads used to decode sample files.
+    """
+    try:
+        import multiprocessing
+        return max(multiprocessing.cpu_count(), 1)
+    except (ImportError, NotImplementedError):
+        return 2
+
+class SampleImporter:
+    """
+    Decodes sample files on a pool of worker threads and loads them into
+    wave slots on the GTK thread, in the order they were given. Each file
+    is committed as soon as it and all files before it are decoded.
+    Workers stay at most a few files ahead of the files loaded so far,
+    so decoded files do not pile up in memory.
+    """
+
+    def __init__(self, jobs, progress, done):
+        """
+        Starts the import.
+
+        @param jobs: (path, wave index) tuples.
+        @type jobs: list
+        @param progress: called with the number of files handled and the total.
+        @type progress: callable
+        @param done: called with the list of paths that failed to load.
+        @type done: callable
+        """
+        self.jobs = jobs
+        self.progress = progress
+        self.done = done
+        self.position = 0
+        self.failed = []
+        self.results = {}
+        self.cancelled = False
+        self.lock = threading.Condition()
+        self.pending = Queue.Queue()
+        for index in range(len(jobs)):
+            self.pending.put(index)
+        workers = min(get_import_worker_count(), len(jobs))
+        self.lookahead = workers * 2
+        for i in range(workers):
+            thread.start_new_thread(self.decode_files, ())
+        gobject.timeout_add(50, self.on_timer)
+
+    def decode_files(self):
+        """
+        Worker thread, decodes files until none are left.
+        """
+        while not self.cancelled:
+            try:
+                index = self.pending.get_nowait()
+            except Queue.Empty:
+                return
+            self.lock.acquire()
+            while not self.cancelled and index >= self.position + self.lookahead:
+                self.lock.wait()
+            self.lock.release()
+            if self.cancelled:
+                return
+            data = zzub.Wavedata.decode_file(self.jobs[index][0])
+            self.lock.acquire()
+            if self.cancelled:
+                if data:
+                    data.destroy()
+            else:
+                self.results[index] = data
+            self.lock.release()
+
+    def cancel(self):
+        """
+        Stops the import. Files already loaded are kept.
+        """
+        self.lock.acquire()
+        self.cancelled = True
+        for data in self.results.values():
+            if data:
+                data.destroy()
+        self.results = {}
+        self.lock.notifyAll()
+        self.lock.release()
+
+    def load(self, player, data, path, target):
+        """
+        Loads a decoded file into a wave slot as its own undo step.
+        """
+        w = player.get_wave(target)
+        w.clear()
+        w.set_volume(1.0)
+        res = player.load_wavedata(w, data)
+        data.destroy()
+        if not res:
+            player.history_flush()
+            return False
+        w.set_name(os.path.splitext(os.path.basename(path))[0])
+        w.set_path(path)
+        player.history_commit("load instrument")
+        return True
+
+    def on_timer(self):
+        """
+        Loads decoded files that are next in line.
+        """
+        if self.cancelled:
+            return False
+        player = com.get('neil.core.player')
+        while self.position < len(self.jobs):
+            self.lock.acquire()
+            if self.position not in self.results:
+                self.lock.release()
+                break
+            data = self.results.pop(self.position)
+            path, target = self.jobs[self.position]
+            self.position += 1
+            self.lock.notifyAll()
+            self.lock.release()
+            if not (data and self.load(player, data, path, target)):
+                self.failed.append(path)
+        self.progress(self.position, len(self.jobs))
+        if self.position == len(self.jobs):
+            self.done(self.failed)
+            return False
+        return True
+
 class WavetablePanel(gtk.VBox):
     """
     Wavetable editor.
@@ -73,6 +202,7 @@ class WavetablePanel(gtk.VBox):
         Initialization.
         """
         self.ohg = ObjectHandlerGroup()
+        self.importer = None
         self.working_directory = ''
         self.files = []
         self.needfocus = True
@@ -205,8 +335,17 @@ class WavetablePanel(gtk.VBox):
         samplebuttons.pack_start(self.btnstoresample, expand=False)
         samplebuttons.pack_start(self.btnrename, expand=False)
         samplebuttons.pack_start(self.btnclear, expand=False)
+        self.importprogress = gtk.ProgressBar()
+        self.btncancelimport = new_stock_image_button(gtk.STOCK_CANCEL, "Cancel Import")
+        self.importbox = gtk.HBox(False, MARGIN)
+        self.importbox.pack_start(self.importprogress)
+        self.importbox.pack_start(self.btncancelimport, expand=False)
+        self.importprogress.show()
+        self.btncancelimport.show_all()
+        self.importbox.set_no_show_all(True)
         samplesel = gtk.VBox(False, MARGIN)
         samplesel.pack_start(samplebuttons, expand=False)
+        samplesel.pack_end(self.importbox, expand=False)
         samplesel.pack_end(add_scrollbars(self.samplelist))
         loopprops = gtk.HBox(False, MARGIN)
         loopprops.pack_start(self.btnplay, expand=False)
@@ -249,6 +388,7 @@ class WavetablePanel(gtk.VBox):
         self.ohg.connect(self.samplelist, 'key-press-event', self.on_samplelist_key_down)
 
         self.ohg.connect(self.btnloadsample, 'clicked', self.on_load_sample)
+        self.ohg.connect(self.btncancelimport, 'clicked', self.on_cancel_import)
         self.ohg.connect(self.btnstoresample, 'clicked', self.on_save_sample)
         self.ohg.connect(self.btnplay, 'clicked', self.on_play_wave)
         self.ohg.connect(self.btnstop, 'clicked', self.on_stop_wave)
@@ -300,6 +440,8 @@ class WavetablePanel(gtk.VBox):
         eventbus.document_loaded += self.update_sampleprops
         eventbus.document_loaded += self.envelope.update
         eventbus.document_loaded += self.waveedit.update
+        eventbus.document_loaded += self.cancel_import
+        eventbus.document_cleared += self.cancel_import
 
         self.update_samplelist()
         self.update_sampleprops()
@@ -704,7 +846,8 @@ class WavetablePanel(gtk.VBox):
 
     def load_samples(self, samplepaths):
         """
-        Loads a list of samples into the sample list of the song.
+        Loads a list of samples into the sample list of the song. Files are
+        decoded in the background and appear in their slots as they finish.
         """
         if not samplepaths:
             return
@@ -720,23 +863,49 @@ class WavetablePanel(gtk.VBox):
         elif len(selects) > len(samplepaths):
             selects = selects[:len(samplepaths)]
         assert len(selects) == len(samplepaths)
-        player = com.get('neil.core.player')
-        for source, target in zip(samplepaths, selects):
-            w = player.get_wave(target)
-            w.clear()
-            w.set_volume(1.0)
-            if not player.load_wave(w, source):
-                player.history_flush()
-                error(self, "<b><big>Unable to load <i>%s</i>.</big></b>\n\nThe file may be corrupt or the file type is not supported." % source)
-                return
-            else:
-                w.set_name(os.path.splitext(os.path.basename(source))[0])
-                w.set_path(source)
-        player.history_commit("load instrument")
+        if self.importer:
+            self.importer.cancel()
+        self.importer = SampleImporter(zip(samplepaths, selects),
+                                       self.on_import_progress,
+                                       self.on_import_done)
+        self.on_import_progress(0, len(samplepaths))
+        self.importbox.show()
         #self.set_current_page(0)
         self.samplelist.grab_focus()
         self.samplelist.set_cursor(selects[0])
 
+    def on_import_progress(self, loaded, total):
+        """
+        Called by the sample importer after loading files.
+        """
+        self.importprogress.set_fraction(float(loaded) / total)
+        self.importprogress.set_text("Loading %i of %i" % (min(loaded + 1, total), total))
+
+    def on_import_done(self, failed):
+        """
+        Called by the sample importer when all files are loaded.
+        """
+        self.importer = None
+        self.importbox.hide()
+        if failed:
+            names = ', '.join([os.path.basename(path) for path in failed])
+            error(self, "<b><big>Unable to load <i>%s</i>.</big></b>\n\nThe file may be corrupt or the file type is not supported." % names)
+
+    def cancel_import(self, *args):
+        """
+        Stops a running import, also when the song is cleared or replaced.
+        """
+        if self.importer:
+            self.importer.cancel()
+            self.importer = None
+        self.importbox.hide()
+
+    def on_cancel_import(self, widget):
+        """
+        Callback that responds to clicking the cancel import button.
+        """
+        self.cancel_import()
+
     def on_load_sample(self, widget):
         """
         Callback that responds to clicking the load sample button.
@@ -43,13 +43,9 @@ class PluginInfo(object):
 		self.selection = None
 		self.songplugin = True
 		self.plugingfx = None
-		self.patterngfx = {}
 		self.amp = -9999.0
 		self.octave = 3
 		
-	def reset_patterngfx(self):
-		self.patterngfx = {}
-		
 	def reset_plugingfx(self):
 		self.plugingfx = None
 		self.amp = -9999.0
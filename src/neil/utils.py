@@ -931,6 +931,105 @@ def get_new_pattern_name(plugin):
                         break
         return s
 
+def read_pattern_columns(plugin, pattern, group, track, tracks, column, columns, row, rows):
+        """
+        Reads a block of values from a live pattern in one call into
+        libzzub instead of one call per cell.
+
+        @param plugin: Plugin owning the pattern.
+        @type plugin: zzub.Plugin
+        @param pattern: Pattern index.
+        @type pattern: int
+        @return: A list with one entry per track, each holding one
+        list of row values per column, or None if the block is out
+        of range.
+        @rtype: [[[int, ...], ...], ...]
+        """
+        size = tracks * columns * rows
+        if not size:
+                return [[[] for c in xrange(columns)] for t in xrange(tracks)]
+        count, values = plugin.get_pattern_columns(pattern, group, track, tracks,
+                                                   column, columns, row, rows, size)
+        if count != size:
+                return None
+        return [[values[(t * columns + c) * rows:(t * columns + c + 1) * rows]
+                 for c in xrange(columns)] for t in xrange(tracks)]
+
+def write_pattern_columns(plugin, pattern, group, track, column, row, data):
+        """
+        Writes a block of values back to a live pattern as a single
+        undoable operation. data uses the layout returned by
+        read_pattern_columns; all columns must have the same length.
+
+        @param plugin: Plugin owning the pattern.
+        @type plugin: zzub.Plugin
+        @param pattern: Pattern index.
+        @type pattern: int
+        """
+        tracks = len(data)
+        columns = tracks and len(data[0]) or 0
+        rows = columns and len(data[0][0]) or 0
+        values = [v for trackdata in data for coldata in trackdata for v in coldata]
+        if not values:
+                return
+        plugin.set_pattern_columns(pattern, group, track, tracks, column, columns,
+                                   row, rows, values, len(values))
+
+def transform_pattern_columns(plugin, pattern, columns, transform):
+        """
+        Applies a transform to columns of a pattern. The transform works
+        on an offline copy of the pattern which then replaces the live
+        pattern in a single operation, so it can be undone in one step.
+
+        @param plugin: Plugin owning the pattern.
+        @type plugin: zzub.Plugin
+        @param pattern: Pattern index.
+        @type pattern: int
+        @param columns: Maps (group, track, column) to the rows to transform.
+        @type columns: {(int, int, int): [int, ...]}
+        @param transform: Called with a list of (values, parameter) tuples,
+        one per column in sorted (group, track, column) order. Returns a
+        list of new values for each column.
+        @type transform: callable
+        @return: True if the pattern has been changed.
+        @rtype: bool
+        """
+        keys = sorted(columns.keys())
+        data = []
+        offline = plugin.get_pattern(pattern)
+        try:
+                # each column is read and written as one block spanning its rows
+                blocks = []
+                for group, track, column in keys:
+                        rows = columns[(group, track, column)]
+                        first = min(rows)
+                        count = max(rows) - first + 1
+                        result, block = offline.get_columns(group, track, 1, column, 1, first, count, count)
+                        if result != count:
+                                # out of range, the block was not filled in
+                                return False
+                        values = [block[row - first] for row in rows]
+                        param = plugin.get_parameter(group, track, column)
+                        blocks.append((first, block))
+                        data.append((values, param))
+                output = transform([(list(values), param) for values, param in data])
+                changed = False
+                for key, (first, block), (values, param), newvalues in zip(keys, blocks, data, output or []):
+                        group, track, column = key
+                        modified = False
+                        for row, old, new in zip(columns[key], values, newvalues):
+                                if new != old:
+                                        block[row - first] = int(new)
+                                        modified = True
+                        if modified:
+                                offline.set_columns(group, track, 1, column, 1, first, len(block), block, len(block))
+                                changed = True
+                if changed:
+                        plugin.update_pattern(pattern, offline)
+                return changed
+        finally:
+                offline.destroy()
+
 class CancelException(Exception):
         """
         Is being thrown when the user hits cancel in a sequence of
@@ -1345,6 +1444,9 @@ __all__ = [
         'is_root',
         'is_streamer',
         'get_new_pattern_name',
+        'read_pattern_columns',
+        'write_pattern_columns',
+        'transform_pattern_columns',
         'new_theme_image',
         'add_accelerator',
         'camelcase_to_unixstyle',
@@ -24,6 +24,7 @@ Provides dialogs, classes and controls to edit samples.
 
 import gtk
 import pango
+import cairo
 import pangocairo
 import os, sys
 from utils import prepstr, db2linear, linear2db, note2str, file_filter
@@ -117,6 +118,11 @@ class WaveEditView(gtk.DrawingArea):
         self.right_dragging = False
         self.right_drag_start = 0
         self.stretching = False
+        # waveform, grid and labels are rendered into wavesurface and only
+        # rebuilt when wavekey changes, overlays are drawn on top
+        self.digest = []
+        self.wavesurface = None
+        self.wavekey = None
         gtk.DrawingArea.__init__(self)
         self.add_events(gtk.gdk.ALL_EVENTS_MASK)
         self.connect('button-press-event', self.on_button_down)
@@ -167,12 +173,19 @@ class WaveEditView(gtk.DrawingArea):
             w, h = self.get_client_size()
             self.window.invalidate_rect((0, 0, w, h), False)
 
-    def update_digest(self, channel=0):
+    def get_channels(self):
+        if self.wave.get_flags() & zzub.zzub_wave_flag_stereo:
+            return 2
+        return 1
+
+    def update_digest(self):
+        self.wavesurface = None
         if self.level == None:
             return
         w, h = self.get_client_size()
-        self.minbuffer, self.maxbuffer, self.ampbuffer = \
-            self.level.get_samples_digest(channel, self.range[0], self.range[1],  w)
+        begin, end = self.range
+        self.digest = [self.level.get_samples_digest(channel, begin, end, w)
+                       for channel in range(self.get_channels())]
 
     def fix_range(self):
         begin,end = self.range
@@ -538,7 +551,6 @@ class WaveEditView(gtk.DrawingArea):
         width, height = self.get_client_size()
         begin, end = self.range
         if self.level.get_wave().get_flags() & zzub.zzub_wave_flag_loop:
-            print self.loop_start, self.loop_end
             if self.start_loop_dragging:
                 loop_start = self.loop_start
             else:
@@ -570,53 +582,34 @@ class WaveEditView(gtk.DrawingArea):
                 ctx.stroke_preserve()
                 ctx.fill()
 
-    def draw(self, ctx):
+    def draw_waveform(self, ctx, w, h, colors):
         """
-        Overriding a L{Canvas} method that paints onto an offscreen buffer.
-        Draws the envelope view graphics.
+        Draws the grid, time labels, file name and waveform, which only
+        change with range, size, sample data and colors.
         """
-        w, h = self.get_client_size()
-        cfg = config.get_config()
-
-        bgbrush = cfg.get_float_color('WE BG')
-        pen = cfg.get_float_color('WE Line')
-        brush = cfg.get_float_color('WE Fill')
-        brush2 = cfg.get_float_color('WE Peak Fill')
-        gridpen = cfg.get_float_color('WE Grid')
-        selbrush = cfg.get_float_color('WE Selection')
-        stretchbrush = cfg.get_float_color('WE Stretch Cue')
-        splitbar = cfg.get_float_color('WE Split Bar')
-        slicebar = cfg.get_float_color('WE Slice Bar')
-        onpeak = cfg.get_float_color('WE Wakeup Peaks')
-        offpeak = cfg.get_float_color('WE Sleep Peaks')
-
+        bgbrush, pen, gridpen = colors
         ctx.translate(0.5, 0.5)
         ctx.set_source_rgb(*bgbrush)
         ctx.rectangle(0, 0, w, h)
         ctx.fill()
         ctx.set_line_width(1)
 
-        if self.level == None:
-            return
-
-        player = com.get('neil.core.player')
-        ctx.set_source_rgb(*gridpen)
         rb, re = self.range
         rsize = re - rb
         x = 0
         y = 0
-        ctx.set_source_rgba(*(gridpen))
+        ctx.set_source_rgb(*gridpen)
+        pango_ctx = pangocairo.CairoContext(ctx)
+        layout = pango_ctx.create_layout()
+        layout.set_width(-1)
+        layout.set_font_description(pango.FontDescription("sans 8"))
+        samples_per_second = float(self.level.get_samples_per_second())
         for i in range(8):
             ctx.move_to(x, 0)
             ctx.line_to(x, h)
             ctx.move_to(x + 2, 0)
-            pango_ctx = pangocairo.CairoContext(ctx)
-            layout = pango_ctx.create_layout()
-            layout.set_width(-1)
-            layout.set_font_description(pango.FontDescription("sans 8"))
             sample_number = rb + i * (rsize / 8)
-            second = sample_number / float(self.level.get_samples_per_second())
-            layout.set_markup("<small>%.3fs</small>" % second)
+            layout.set_markup("<small>%.3fs</small>" % (sample_number / samples_per_second))
             pango_ctx.update_layout(layout)
             pango_ctx.show_layout(layout)
             x += (w / 8)
@@ -629,34 +622,69 @@ class WaveEditView(gtk.DrawingArea):
         # Show wave file name at the top left corner
         ctx.move_to(2, 14)
         ctx.set_source_rgba(0.4, 0.4, 0.4, 1.0)
-        pango_ctx = pangocairo.CairoContext(ctx)
-        layout = pango_ctx.create_layout()
-        layout.set_width(-1)
-        layout.set_font_description(pango.FontDescription("sans 8"))
         layout.set_markup("<b>%s</b>" % self.wave.get_path())
         pango_ctx.update_layout(layout)
         pango_ctx.show_layout(layout)
         ctx.stroke()
 
-        channels = 1
-        if self.wave.get_flags() & zzub.zzub_wave_flag_stereo:
-            channels = 2
-                
-        for channel in range(channels):
-            #self.update_digest(channel)
-            minbuffer, maxbuffer, ampbuffer = \
-                self.minbuffer, self.maxbuffer, self.ampbuffer
+        channels = len(self.digest)
+        for channel, (minbuffer, maxbuffer, ampbuffer) in enumerate(self.digest):
             # Draw the waveform.
             ctx.set_source_rgb(0.7, 0.9, 0.7)
             hm = (h / (2 * channels) - 1) * (1 + channel * 2)
+            scale = (h / channels) * 0.4
             ctx.move_to(0, hm)
             for x in xrange(0, w):
-                ctx.line_to(x, hm - (h / channels) * maxbuffer[x] * 0.4)
+                ctx.line_to(x, hm - scale * maxbuffer[x])
             for x in xrange(0, w):
-                ctx.line_to(w - x, hm - (h / channels) * minbuffer[w - x - 1] * 0.4)
+                ctx.line_to(w - x, hm - scale * minbuffer[w - x - 1])
             ctx.fill_preserve()
             ctx.set_source_rgb(*pen)
             ctx.stroke()
+
+    def get_waveform(self, ctx, w, h):
+        """
+        Returns the cached waveform surface, rendering it again if range,
+        size, channels or colors changed since the last call.
+        """
+        cfg = config.get_config()
+        colors = (cfg.get_float_color('WE BG'),
+                  cfg.get_float_color('WE Line'),
+                  cfg.get_float_color('WE Grid'))
+        key = (tuple(self.range), w, h, self.get_channels(), colors)
+        if self.wavesurface and (key == self.wavekey):
+            return self.wavesurface
+        if (not self.digest) or (len(self.digest[0][0]) != w) or \
+                (len(self.digest) != self.get_channels()):
+            self.update_digest()
+        surface = ctx.get_target().create_similar(cairo.CONTENT_COLOR, w, h)
+        self.draw_waveform(cairo.Context(surface), w, h, colors)
+        self.wavesurface = surface
+        self.wavekey = key
+        return surface
+
+    def draw(self, ctx):
+        """
+        Overriding a L{Canvas} method that paints onto an offscreen buffer.
+        Draws the envelope view graphics.
+
+        The waveform comes from a cached surface, so selection and loop
+        marker changes only repaint the overlays.
+        """
+        w, h = self.get_client_size()
+
+        if (self.level == None) or (w <= 0) or (h <= 0):
+            cfg = config.get_config()
+            ctx.set_source_rgb(*cfg.get_float_color('WE BG'))
+            ctx.rectangle(0, 0, w, h)
+            ctx.fill()
+            return
+
+        ctx.set_source_surface(self.get_waveform(ctx, w, h), 0, 0)
+        ctx.paint()
+        ctx.translate(0.5, 0.5)
+        ctx.set_line_width(1)
+
         # Draw the selection rectangle.
         if self.selection:
             begin, end = self.selection
@@ -0,0 +1,88 @@
+"""
+Tests for the event delivery of the Neil player component
+"""
+
+import os
+import sys
+sys.path = ['../src', '../src/components'] + sys.path
+
+import time
+from unittest import TestCase, main
+from player import coalesce_events, deliver_events
+
+class Test(TestCase):
+	def test_coalesce_events(self):
+		"""
+		only the last of several events with the same key is kept, in the
+		place of the last one. other events keep their order.
+		"""
+		keys = dict(zzub_parameter_changed=4, zzub_pattern_changed=2)
+		events = [
+			('zzub_parameter_changed', ['a', 1, 0, 2, 10]),
+			('zzub_pattern_changed', ['a', 0]),
+			('zzub_new_plugin', ['b']),
+			('zzub_parameter_changed', ['a', 1, 0, 3, 20]),
+			('zzub_parameter_changed', ['a', 1, 0, 2, 30]),
+			('zzub_pattern_changed', ['a', 1]),
+			('zzub_new_plugin', ['b']),
+			('zzub_pattern_changed', ['a', 0]),
+		]
+		self.assertTrue(coalesce_events(events, keys) == [
+			('zzub_new_plugin', ['b']),
+			('zzub_parameter_changed', ['a', 1, 0, 3, 20]),
+			('zzub_parameter_changed', ['a', 1, 0, 2, 30]),
+			('zzub_pattern_changed', ['a', 1]),
+			('zzub_new_plugin', ['b']),
+			('zzub_pattern_changed', ['a', 0]),
+		])
+		self.assertTrue(coalesce_events([], keys) == [])
+
+	def test_deliver_events(self):
+		"""
+		events are delivered from the end of the list, all of them without
+		a deadline.
+		"""
+		delivered = []
+		def dispatch(eventname, args):
+			delivered.append(eventname)
+		events = [('c', []), ('b', []), ('a', [])]
+		self.assertTrue(deliver_events(events, dispatch) == 3)
+		self.assertTrue(delivered == ['a', 'b', 'c'])
+		self.assertTrue(events == [])
+		self.assertTrue(deliver_events(events, dispatch) == 0)
+
+	def test_deliver_events_budget(self):
+		"""
+		delivery stops once the deadline has passed and the rest stays in
+		the list, but at least one event is delivered.
+		"""
+		delivered = []
+		def dispatch(eventname, args):
+			delivered.append(eventname)
+			time.sleep(0.02)
+		events = [(str(i), []) for i in range(10)]
+		self.assertTrue(deliver_events(events, dispatch, time.time() - 1) == 1)
+		self.assertTrue(delivered == ['9'])
+		count = deliver_events(events, dispatch, time.time() + 0.05)
+		self.assertTrue(0 < count < 9)
+		self.assertTrue(len(events) == 9 - count)
+		self.assertTrue(delivered == [str(i) for i in range(9, 9 - count - 1, -1)])
+
+	def test_deliver_events_reentrant(self):
+		"""
+		a handler that delivers the remaining events itself, as the player
+		does before an event zzub sends right away, leaves nothing to be
+		delivered twice.
+		"""
+		delivered = []
+		events = [('c', []), ('b', []), ('a', [])]
+		def dispatch(eventname, args):
+			delivered.append(eventname)
+			if eventname == 'a':
+				deliver_events(events, dispatch)
+				delivered.append('edit')
+		self.assertTrue(deliver_events(events, dispatch) == 1)
+		self.assertTrue(delivered == ['a', 'b', 'c', 'edit'])
+
+if __name__ == '__main__':
+    main()